@@ -0,0 +1,117 @@
+"""
+Shows the adaptive concurrency limit converging on a simulated scorer whose capacity changes part way through.
+
+A producer thread feeds requests through a bounded RequestQueue while the service streams them to a CapacityScorer,
+whose capacity steps through --capacities (e.g. a deploy halving it, then a scale-up). For each phase, throughput is
+reported against the best the scorer can do (capacity / latency), next to the same run with fixed max_in_flight
+settings for comparison.
+
+Usage (from the repository root):
+    python -m benchmarks.adaptive_concurrency
+    python -m benchmarks.adaptive_concurrency --capacities 8 2 16 --phase-seconds 2 --fixed 2 32
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import typing
+
+import task_one.common
+import task_one.concurrency
+import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.resilience
+
+# using absolute imports for better immediate readability
+
+
+def run(args: argparse.Namespace, max_in_flight: typing.Optional[int]) -> typing.Iterator[dict]:
+    scorer = task_one.fake_scorers.CapacityScorer(args.capacities[0], args.latency, args.max_queue_time)
+    limit = None
+    if max_in_flight is None:
+        limit = task_one.concurrency.AdaptiveLimit(initial=1, maximum=args.max_limit)
+
+    # the resilience wrapper turns the scorer's overload errors into ScorerUnavailable, so that rejected requests
+    # are counted as unscored rather than ending the run
+    service = task_one.evaluation_service.EvaluationService(
+        max_in_flight=max_in_flight or 1,
+        batch_size=1,
+        concurrency=limit,
+        resilience=task_one.resilience.ResiliencePolicy(),
+        unscored='separate',
+    )
+    service.scorer = scorer
+
+    feed = task_one.concurrency.RequestQueue(args.queue_size)
+    phase_length = [int(capacity / args.latency * args.phase_seconds) for capacity in args.capacities]
+    stop = threading.Event()
+
+    def produce():
+        for i in range(sum(phase_length)):
+            if stop.is_set():
+                break
+            feed.put(task_one.common.Request(f'/request/{i}', 'GET', ''))
+        feed.close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    results = service.evaluate_iter(feed)
+    try:
+        for capacity, length in zip(args.capacities, phase_length):
+            scorer.set_capacity(capacity)
+            started = time.perf_counter()
+            limits = []
+            unscored = 0
+            for _, score, _ in (next(results) for _ in range(length)):
+                unscored += score is None
+                limits.append(max_in_flight if limit is None else limit.limit)
+
+            elapsed = time.perf_counter() - started
+            tail = limits[len(limits) // 2:]  # once it has had half the phase to settle
+            yield {
+                'mode': f'fixed {max_in_flight}' if limit is None else 'adaptive',
+                'capacity': capacity,
+                # only requests which were actually scored count, not those the scorer turned away
+                'throughput': round((length - unscored) / elapsed, 1),
+                'optimal_throughput': round(capacity / args.latency, 1),
+                'efficiency': round((length - unscored) / elapsed / (capacity / args.latency), 3),
+                'limit': round(sum(tail) / len(tail), 2),
+                'failed': unscored,
+                'queued': feed.qsize(),
+            }
+    finally:
+        stop.set()
+        results.close()
+        for _ in feed:  # unblock the producer if it is still waiting for room
+            pass
+        producer.join()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.adaptive_concurrency', description=__doc__.split('\n')[1],
+    )
+    parser.add_argument('--capacities', nargs='+', type=int, default=[8, 2, 16], help="scorer capacity per phase")
+    parser.add_argument('--phase-seconds', type=float, default=2.0)
+    parser.add_argument('--latency', type=float, default=0.005, help="seconds per request at the scorer")
+    parser.add_argument('--max-queue-time', type=float, default=0.05, help="scorer rejects calls queued this long")
+    parser.add_argument('--max-limit', type=int, default=64)
+    parser.add_argument('--queue-size', type=int, default=100, help="bound on the producer -> service queue")
+    parser.add_argument('--fixed', nargs='*', type=int, default=[2, 32], help="fixed max_in_flight runs to compare")
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    for max_in_flight in [None] + args.fixed:
+        for result in run(args, max_in_flight):
+            print(json.dumps(result))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Throughput, latency and memory benchmarks for the task_one and task_two evaluation services.
+
+Drives each service with an in-process fake scorer of configurable per-call latency and CPU cost, over a range of
+batch sizes, repeated evaluate() calls on one long-lived service (which is where a history-dependent cost, in time
+or in retained memory, would show up), and a range of request body sizes. Results are written as JSON so that runs
+from different releases can be compared.
+
+Usage (from the repository root):
+    python -m benchmarks.evaluation_service --output bench_results.json
+    python -m benchmarks.evaluation_service --quick
+    python -m benchmarks.evaluation_service --batch-sizes 1 1000 1000000 --scorer-latency 0.001 --max-in-flight 16
+    python -m benchmarks.evaluation_service --processes 4 --scorer-cpu-rounds 1000
+
+With --processes, scoring moves to a pool of worker processes each running task_one.fake_scorers.CpuBoundScorer, so
+comparing runs with 1, 2, 4... processes on a multi-core host shows how throughput scales with cores.
+"""
+import argparse
+import datetime
+import decimal
+import functools
+import gc
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+import task_one.common
+import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.instrumentation
+import task_one.score_cache
+import task_one.score_store
+import task_one.scorer_http_client
+import task_two.evaluation_service
+
+# using absolute imports for better immediate readability
+
+SERVICES = {
+    'task_one': task_one.evaluation_service.EvaluationService,
+    'task_two': task_two.evaluation_service.EvaluationService,
+}
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+QUICK_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_BODY_SIZES = [0, 100, 10000]
+# sha256 rounds per request for the worker processes' scorer, unless --scorer-cpu-rounds says otherwise
+CPU_BOUND_ROUNDS = 1000
+
+
+class BenchmarkScorer(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    Fake scorer: every call (single or batch) sleeps for `latency` seconds to stand in for the network round-trip,
+    and every request costs `cpu_rounds` sha256 rounds to stand in for model work. Scores alternate in sign.
+    """
+
+    def __init__(self, latency: float = 0.0, cpu_rounds: int = 0):
+        self.latency = latency
+        self.cpu_rounds = cpu_rounds
+        self._scores = (decimal.Decimal('0.5'), decimal.Decimal('-0.25'))
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        return self.evaluate_batch([task_one.common.Request(path, method, body)])[0]
+
+    def evaluate_batch(self, requests: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        if self.latency:
+            time.sleep(self.latency)
+
+        scores = []
+        for request in requests:
+            if self.cpu_rounds:
+                digest = request.path.encode('utf-8')
+                for _ in range(self.cpu_rounds):
+                    digest = hashlib.sha256(digest).digest()
+
+            scores.append(self._scores[len(request.path) & 1])
+
+        return scores
+
+
+def make_requests(num: int, body_size: int, offset: int = 0) -> typing.List[task_one.common.Request]:
+    """Requests with distinct bodies of roughly body_size characters, so none of them can share a body object"""
+    return [
+        task_one.common.Request(f'https://bench-request/{i}', 'POST', {'payload': str(i).ljust(body_size, 'x')})
+        if body_size else task_one.common.Request(f'https://bench-request/{i}', 'GET', '')
+        for i in range(offset, offset + num)
+    ]
+
+
+def percentile(sorted_values: typing.Sequence[float], fraction: float) -> float:
+    if not sorted_values:
+        return float('nan')
+
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def time_streaming(service: task_one.evaluation_service.EvaluationServiceInterface, requests: list) -> dict:
+    """
+    Run the batch through evaluate_iter, timing the gap between consecutive results - the per-request cost as seen
+    by a consumer, including the service's own overhead and the scorer's share of each batch
+    """
+    gaps = []
+    gc.collect()
+    start = previous = time.perf_counter()
+    for _ in service.evaluate_iter(requests):
+        now = time.perf_counter()
+        gaps.append(now - previous)
+        previous = now
+
+    elapsed = time.perf_counter() - start
+    gaps.sort()
+
+    return {
+        'seconds': elapsed,
+        'requests_per_second': len(requests) / elapsed if elapsed > 0 else None,
+        'p50_request_us': percentile(gaps, 0.50) * 1e6,
+        'p99_request_us': percentile(gaps, 0.99) * 1e6,
+    }
+
+
+def peak_memory(service: task_one.evaluation_service.EvaluationServiceInterface, requests: list) -> int:
+    """Peak memory allocated while evaluate() runs, over and above the requests themselves"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        service.evaluate(requests)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def service_memory() -> int:
+    """Memory currently traced to the services' own code, leaving out the benchmark's bookkeeping (e.g. results)"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(True, os.path.join('*', package, '*')) for package in ('task_one', 'task_two')
+    ])
+    return sum(stat.size for stat in snapshot.statistics('filename'))
+
+
+def build_service(name: str, args: argparse.Namespace, **kwargs):
+    cache = task_one.score_cache.ScoreCache(max_entries=args.cache_entries) if args.cache_entries else None
+
+    if args.processes is None:
+        service = SERVICES[name](
+            max_in_flight=args.max_in_flight, batch_size=args.scorer_batch_size, cache=cache, **kwargs,
+        )
+        service.scorer = BenchmarkScorer(args.scorer_latency, args.scorer_cpu_rounds)
+        return service
+
+    # the factory is pickled to each worker, which builds its own scorer from it
+    rounds = args.scorer_cpu_rounds or CPU_BOUND_ROUNDS
+    return SERVICES[name](
+        max_in_flight=args.max_in_flight,
+        batch_size=args.scorer_batch_size,
+        cache=cache,
+        processes=args.processes,
+        scorer_factory=functools.partial(task_one.fake_scorers.CpuBoundScorer, rounds),
+        **kwargs,
+    )
+
+
+def bench_batch_sizes(name: str, args: argparse.Namespace) -> typing.Iterator[dict]:
+    for batch_size in args.batch_sizes:
+        requests = make_requests(batch_size, 0)
+        with build_service(name, args) as service:
+            result = time_streaming(service, requests)
+        if not args.skip_memory:
+            with build_service(name, args) as service:
+                result['peak_memory_bytes'] = peak_memory(service, requests)
+
+        yield {'scenario': 'batch_size', 'requests': batch_size, 'body_size': 0, **result}
+
+
+def bench_long_lived(name: str, args: argparse.Namespace) -> typing.Iterator[dict]:
+    """
+    The same service evaluating many batches in a row, through evaluate() so that every call also summarises (and,
+    with --store, persists) the statistics - the cost which used to grow with the score history. Per-call time,
+    statistics time and peak memory should all stay flat, and memory retained between calls shouldn't creep up
+    """
+    store = None
+    if args.store:
+        store = task_one.score_store.ScoreStore(os.path.join(tempfile.mkdtemp(), 'scores.db'))
+
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = build_service(name, args, store=store, instrumentation=recorder)
+    batch = args.long_lived_batch
+
+    if not args.skip_memory:
+        gc.collect()
+        tracemalloc.start()
+        baseline = service_memory()
+
+    try:
+        for call in range(args.long_lived_calls):
+            # with a store, fresh requests every call - otherwise it would serve every call after the first
+            requests = make_requests(batch, 0, offset=call * batch if store is not None else 0)
+            statistics_before = recorder.snapshot().statistics_seconds
+            if not args.skip_memory:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+
+            started = time.perf_counter()
+            service.evaluate(requests)
+            elapsed = time.perf_counter() - started
+            del requests
+
+            if not (call == 0 or (call + 1) % max(1, args.long_lived_calls // 10) == 0):
+                continue
+
+            result = {
+                'seconds': elapsed,
+                'requests_per_second': batch / elapsed if elapsed > 0 else None,
+                'statistics_us': (recorder.snapshot().statistics_seconds - statistics_before) * 1e6,
+            }
+            if not args.skip_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                gc.collect()
+                # over and above the call's requests, and whatever the service holds on to between calls
+                result['peak_memory_bytes'] = peak - before
+                result['retained_memory_bytes'] = service_memory() - baseline
+
+            yield {'scenario': 'long_lived', 'call': call + 1, 'requests': batch, 'body_size': 0, **result}
+
+    finally:
+        if not args.skip_memory:
+            tracemalloc.stop()
+        service.close()
+        if store is not None:
+            store.close()
+
+
+def bench_body_sizes(name: str, args: argparse.Namespace) -> typing.Iterator[dict]:
+    for body_size in args.body_sizes:
+        requests = make_requests(args.body_batch, body_size)
+        with build_service(name, args) as service:
+            result = time_streaming(service, requests)
+        if not args.skip_memory:
+            with build_service(name, args) as service:
+                result['peak_memory_bytes'] = peak_memory(service, requests)
+
+        yield {'scenario': 'body_size', 'requests': len(requests), 'body_size': body_size, **result}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.evaluation_service', description=__doc__.split('\n')[1])
+    parser.add_argument('--output', default='bench_results.json', help="where to write the JSON results")
+    parser.add_argument('--services', nargs='+', choices=sorted(SERVICES), default=sorted(SERVICES))
+    parser.add_argument('--quick', action='store_true', help="smaller batch sizes and fewer repeats, for a smoke run")
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=None)
+    parser.add_argument('--body-sizes', nargs='+', type=int, default=DEFAULT_BODY_SIZES)
+    parser.add_argument('--body-batch', type=int, default=10000, help="requests per run in the body size scenario")
+    parser.add_argument('--long-lived-calls', type=int, default=None)
+    parser.add_argument('--long-lived-batch', type=int, default=1000)
+    parser.add_argument('--scorer-latency', type=float, default=0.0, help="seconds slept per scorer call")
+    parser.add_argument('--scorer-cpu-rounds', type=int, default=0, help="sha256 rounds per scored request")
+    parser.add_argument('--scorer-batch-size', type=int, default=task_one.evaluation_service.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--max-in-flight', type=int, default=1)
+    parser.add_argument(
+        '--processes', type=int, default=None,
+        help="score in this many worker processes with fake_scorers.CpuBoundScorer (--scorer-cpu-rounds rounds per "
+             f"request, {CPU_BOUND_ROUNDS} if that's 0) in place of the in-process fake scorer, to see scaling with "
+             "cores. --scorer-latency doesn't apply",
+    )
+    parser.add_argument(
+        '--cache-entries', type=int, default=0, help="put a ScoreCache of this size in front of the scorer",
+    )
+    parser.add_argument('--skip-memory', action='store_true', help="skip the (slower) tracemalloc runs")
+    parser.add_argument(
+        '--store', action='store_true',
+        help="give the long-lived service a ScoreStore in a temporary directory, so persistence is measured too",
+    )
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.batch_sizes is None:
+        args.batch_sizes = QUICK_BATCH_SIZES if args.quick else DEFAULT_BATCH_SIZES
+    if args.long_lived_calls is None:
+        args.long_lived_calls = 20 if args.quick else 200
+    if args.quick:
+        args.body_batch = min(args.body_batch, 1000)
+
+    results = []
+    for name in args.services:
+        for scenario in (bench_batch_sizes, bench_long_lived, bench_body_sizes):
+            for result in scenario(name, args):
+                result = {'service': name, **result}
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': sys.version,
+            'platform': platform.platform(),
+            'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
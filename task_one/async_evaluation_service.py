@@ -0,0 +1,80 @@
+import abc
+import asyncio
+import decimal
+import typing
+
+import task_one.async_scorer_http_client
+import task_one.common
+import task_one.evaluation
+import task_one.evaluation_service
+
+# using absolute imports for better immediate readability
+
+DEFAULT_MAX_IN_FLIGHT = 32
+
+
+class AsyncEvaluationServiceInterface(abc.ABC):
+    """
+    asyncio counterpart to task_one.evaluation_service.EvaluationServiceInterface, for callers which are already
+    running an event loop and would otherwise have to push the synchronous service into executor threads.
+
+    Requests are validated, scored and partitioned exactly as in the synchronous service, and the same
+    Evaluation objects are returned.
+    """
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        """
+        :param max_in_flight: maximum number of scorer coroutines allowed to be awaiting a response at once
+        """
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+
+        self.scorer = task_one.async_scorer_http_client.AsyncScorerHttpClient()
+        self.max_in_flight = max_in_flight
+
+    @abc.abstractmethod
+    async def evaluate(
+            self, requests: typing.List[task_one.evaluation_service.AnyRequest]
+    ) -> task_one.evaluation.Evaluation:
+        pass
+
+    async def _scored(
+            self, requests: typing.Iterable[task_one.evaluation_service.AnyRequest]
+    ) -> typing.List[typing.Tuple[task_one.evaluation_service.AnyRequest, decimal.Decimal]]:
+        """
+        Score every request concurrently, with at most max_in_flight scorer calls outstanding, and return
+        (request, score) pairs in input order.
+
+        All requests are validated before any are sent to the scorer, so a bad object raises TypeError without
+        generating scorer traffic. If any call fails the remaining ones are cancelled.
+        """
+        requests = list(requests)
+        adapted = task_one.evaluation_service.as_common_requests(requests)
+
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def score(request: task_one.common.Request) -> decimal.Decimal:
+            async with semaphore:
+                result = await self.scorer.evaluate(*request)
+            task_one.evaluation_service.check_score(result)
+            return result
+
+        tasks = [asyncio.ensure_future(score(request)) for request in adapted]
+        try:
+            scores = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return list(zip(requests, scores))
+
+
+class AsyncEvaluationService(AsyncEvaluationServiceInterface):
+
+    async def evaluate(
+            self, requests: typing.List[task_one.evaluation_service.AnyRequest]
+    ) -> task_one.evaluation.Evaluation:
+        evaluation = task_one.evaluation.Evaluation([], [])
+        for request, score in await self._scored(requests):
+            task_one.evaluation_service.partition(evaluation, request, score <= 0)
+
+        return evaluation
@@ -0,0 +1,7 @@
+from decimal import Decimal
+
+
+class AsyncScorerHttpClient:
+
+    async def evaluate(self, path, method, body) -> Decimal:
+        pass
@@ -5,3 +5,16 @@ class Request(typing.NamedTuple):
     path: str
     method: str
     body: str  # an empty body is represented as ''
+
+    @classmethod
+    def from_requests(cls, request: typing.Any) -> 'Request':
+        """
+        Adapt a requests.Request, sharing its url, method and json objects rather than copying them. A request
+        without a JSON body keeps json=None as the body, exactly as the services would pass it to the scorer.
+        """
+        return cls(request.url, request.method, request.json)
+
+    @classmethod
+    def from_dict(cls, data: typing.Mapping[str, typing.Any]) -> 'Request':
+        """Adapt a raw mapping, e.g. a parsed line of JSONL traffic, with 'path', 'method' and optional 'body' keys"""
+        return cls(data['path'], data['method'], data.get('body', ''))
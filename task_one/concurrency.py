@@ -0,0 +1,130 @@
+import queue
+import threading
+import typing
+
+
+class AdaptiveLimit:
+    """
+    AIMD (additive increase, multiplicative decrease) limit on the number of scorer calls in flight, driven by the
+    latency and failures of the calls themselves - much like TCP congestion control.
+
+    Every call which completes in under `tolerance` times the baseline latency grows the limit by 1/limit, i.e. by
+    one for each limit's worth of good calls. A failed call, or one slower than that, shrinks the limit by the
+    `backoff` factor - at most once per limit's worth of completions, so that a burst of slow calls caused by one
+    overload only counts once.
+
+    The baseline tracks the best latency seen: it drops straight down to any faster call, and creeps up only slowly
+    (by `drift` of the difference per call), so a scorer which gets slower for good is eventually accepted as the
+    new normal rather than throttled forever.
+    """
+
+    def __init__(
+            self,
+            initial: int = 4,
+            minimum: int = 1,
+            maximum: int = 64,
+            tolerance: float = 2.0,
+            backoff: float = 0.75,
+            drift: float = 0.01,
+    ):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(f"Need 1 <= minimum <= initial <= maximum, got {minimum}, {initial}, {maximum}")
+
+        if not 0 < backoff < 1:
+            raise ValueError(f"backoff must be between 0 and 1, got {backoff}")
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.drift = drift
+
+        self.baseline: typing.Optional[float] = None
+        self.in_flight = 0
+        self.decreases = 0
+
+        self._limit = float(initial)
+        self._since_decrease = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self, timeout: typing.Optional[float] = None) -> bool:
+        """Wait for a free slot under the current limit, returning False if none came up within the timeout"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self._limit), timeout):
+                return False
+
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: typing.Optional[float] = None, failed: bool = False):
+        """
+        Give back a slot, reporting how the call went. A latency of None (e.g. a call cancelled before it started)
+        frees the slot without adjusting the limit
+        """
+        with self._condition:
+            self.in_flight -= 1
+
+            if latency is not None:
+                self._adjust(latency, failed)
+
+            self._condition.notify_all()
+
+    def _adjust(self, latency: float, failed: bool):
+        self._since_decrease += 1
+
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * self.drift
+
+        if failed or latency > self.tolerance * self.baseline:
+            if self._since_decrease >= self._limit:
+                self._limit = max(float(self.minimum), self._limit * self.backoff)
+                self._since_decrease = 0
+                self.decreases += 1
+
+        else:
+            self._limit = min(float(self.maximum), self._limit + 1 / self._limit)
+
+
+class RequestQueue:
+    """
+    Bounded hand-over from producer threads to a consumer evaluating the requests, e.g.
+    `service.evaluate_into(queue, sink)`: put() blocks once maxsize requests are waiting, pushing back on the
+    producers rather than buffering an unbounded backlog whenever the scorer slows down.
+
+    Iterating yields requests until close() is called and everything put before it has been handed over; after that,
+    any further iteration (e.g. by a second consumer) finishes straight away.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize: int = 1000):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, got {maxsize}")
+
+        self._queue: queue.Queue = queue.Queue(maxsize)
+
+    def put(self, request: typing.Any, timeout: typing.Optional[float] = None):
+        """Add a request, waiting for room if the queue is full. Raises queue.Full if none came up within timeout"""
+        self._queue.put(request, timeout=timeout)
+
+    def close(self):
+        """Let the consumer finish once it has caught up: the marker waits for room like any other request"""
+        self._queue.put(self._CLOSED)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        while True:
+            request = self._queue.get()
+            if request is self._CLOSED:
+                # put the marker back for anyone else iterating - there's room, as it was just taken out
+                self._queue.put_nowait(self._CLOSED)
+                return
+            yield request
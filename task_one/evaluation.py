@@ -1,5 +1,132 @@
+import array
+import collections.abc
+import decimal
+import math
+import typing
+
+
 class Evaluation:
 
-    def __init__(self, typical_requests: list, anomalous_requests: list):
+    def __init__(
+            self, typical_requests: list, anomalous_requests: list, unscored_requests: typing.Optional[list] = None,
+    ):
         self.typical_requests = typical_requests
         self.anomalous_requests = anomalous_requests
+        # requests the scorer couldn't score, when the service is set to keep them separate
+        self.unscored_requests = [] if unscored_requests is None else unscored_requests
+
+
+class RequestsView(collections.abc.Sequence):
+    """
+    Read-only, list-like view of either the typical or the anomalous requests in a CompactEvaluation, reading
+    straight from the evaluated input rather than holding copies of the requests.
+
+    Iteration walks the bitmap; positions for random access are only worked out on the first indexing call.
+    """
+    __slots__ = ('_requests', '_flags', '_anomalous', '_positions')
+
+    def __init__(self, requests: typing.Sequence, flags: bytes, anomalous: bool):
+        self._requests = requests
+        self._flags = flags
+        self._anomalous = anomalous
+        self._positions: typing.Optional[typing.List[int]] = None
+
+    def __iter__(self) -> typing.Iterator:
+        flags = self._flags
+        for i, request in enumerate(self._requests):
+            if bool(flags[i >> 3] & (1 << (i & 7))) is self._anomalous:
+                yield request
+
+    def __len__(self) -> int:
+        anomalous = bin(int.from_bytes(self._flags, 'little')).count('1')
+        return anomalous if self._anomalous else len(self._requests) - anomalous
+
+    def __getitem__(self, index):
+        if self._positions is None:
+            flags = self._flags
+            self._positions = [
+                i for i in range(len(self._requests)) if bool(flags[i >> 3] & (1 << (i & 7))) is self._anomalous
+            ]
+
+        if isinstance(index, slice):
+            return [self._requests[i] for i in self._positions[index]]
+
+        return self._requests[self._positions[index]]
+
+    def __eq__(self, other: typing.Any) -> bool:
+        # compare like a list, so existing callers checking e.g. `evaluation.typical_requests == []` keep working
+        if not isinstance(other, collections.abc.Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class CompactEvaluation:
+    """
+    Memory-light alternative to Evaluation for big batches: rather than two lists of requests, it keeps a reference to
+    the evaluated input and one bit per request marking the anomalous ones - 1/64th of the size of the two lists of
+    references. Optionally the scores can be kept too, packed into a float64 array.
+
+    typical_requests and anomalous_requests are lazy, read-only views which behave like the lists on Evaluation.
+    The partition itself comes from the exact Decimal scores; the packed scores are for inspection only, and are
+    rounded to the nearest float to avoid holding a Decimal object per request.
+    """
+    __slots__ = ('requests', 'anomalous_flags', 'scores')
+
+    def __init__(
+            self, requests: typing.Sequence, anomalous_flags: bytes, scores: typing.Optional[typing.Sequence[float]],
+    ):
+        self.requests = requests
+        self.anomalous_flags = anomalous_flags
+        self.scores = scores
+
+    @classmethod
+    def from_scores(
+            cls,
+            requests: typing.Sequence,
+            scores: typing.Iterable[typing.Optional[decimal.Decimal]],
+            keep_scores: bool = False,
+            **kwargs
+    ):
+        results = ((score, None if score is None else score <= 0) for score in scores)
+        return cls.from_results(requests, results, keep_scores, **kwargs)
+
+    @classmethod
+    def from_results(
+            cls,
+            requests: typing.Sequence,
+            results: typing.Iterable[typing.Tuple[typing.Optional[decimal.Decimal], typing.Optional[bool]]],
+            keep_scores: bool = False,
+            **kwargs
+    ):
+        """
+        Build from (score, is_anomalous) pairs as yielded by evaluate_iter. A missing score is kept as NaN; there's
+        no separate bucket for unscored requests (is_anomalous None) here, so they are flagged as anomalous
+        """
+        flags = bytearray((len(requests) + 7) // 8)
+        packed = array.array('d') if keep_scores else None
+        for i, (score, is_anomalous) in enumerate(results):
+            if keep_scores:
+                packed.append(math.nan if score is None else score)
+
+            if is_anomalous is not False:
+                flags[i >> 3] |= 1 << (i & 7)
+
+        return cls(requests, bytes(flags), packed, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def is_anomalous(self, index: int) -> bool:
+        return bool(self.anomalous_flags[index >> 3] & (1 << (index & 7)))
+
+    @property
+    def typical_requests(self) -> RequestsView:
+        return RequestsView(self.requests, self.anomalous_flags, anomalous=False)
+
+    @property
+    def anomalous_requests(self) -> RequestsView:
+        return RequestsView(self.requests, self.anomalous_flags, anomalous=True)
@@ -1,13 +1,102 @@
 import abc
+import collections
+import collections.abc
+import concurrent.futures
+import itertools
+import threading
+import time
 import typing
 import requests as requests_lib  # template code already defines a variable named "requests"
 import decimal
 
+import task_one.common
+import task_one.concurrency
 import task_one.evaluation
+import task_one.instrumentation
+import task_one.process_pool
+import task_one.resilience
+import task_one.rules
+import task_one.score_cache
+import task_one.score_store
 import task_one.scorer_http_client
 
 # using absolute imports for better immediate readability
 
+DEFAULT_BATCH_SIZE = 100
+
+# most distinct requests remembered for deduplication within one evaluate call
+DEDUP_WINDOW = 100000
+
+# what to do with requests the scorer couldn't score: see EvaluationServiceInterface.__init__
+UNSCORED_POLICIES = ('raise', 'anomalous', 'separate')
+
+
+class DedupStats(typing.NamedTuple):
+    requests: int  # requests which went through deduplication
+    unique: int  # of which were passed on to the cache, store or scorer
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of requests which were duplicates and didn't need scoring, 0 if there weren't any requests"""
+        return 1 - self.unique / self.requests if self.requests else 0.0
+
+
+# anything evaluate accepts as a request
+AnyRequest = typing.Union[requests_lib.Request, task_one.common.Request]
+
+
+def check_request(request: typing.Any):
+    if not isinstance(request, (requests_lib.Request, task_one.common.Request)):
+        raise TypeError(
+            f"Instance of type {type(request)} not recognised, expected requests.Request or "
+            f"task_one.common.Request object"
+        )
+
+
+def as_common_requests(requests: typing.List[AnyRequest]) -> typing.List[task_one.common.Request]:
+    """
+    Validate a batch of requests and adapt it to a list of task_one.common.Request tuples, the form the scorer
+    is called with.
+
+    Types are checked once per batch rather than once per element where possible: a batch which is already all
+    common.Request tuples is returned as is, without copying.
+    """
+    types = set(map(type, requests))
+
+    if types == {task_one.common.Request}:
+        return requests
+
+    if all(issubclass(t, requests_lib.Request) for t in types):
+        return [task_one.common.Request(request.url, request.method, request.json) for request in requests]
+
+    # mixed batch, or something unrecognised - fall back to checking (and adapting) each element
+    adapted = []
+    for request in requests:
+        check_request(request)
+        adapted.append(
+            request if isinstance(request, task_one.common.Request) else task_one.common.Request.from_requests(request)
+        )
+
+    return adapted
+
+
+def check_score(score: typing.Any):
+    if not isinstance(score, decimal.Decimal):
+        raise TypeError(f"'{score}' not recognised: expected a decimal.Decimal object, got {type(score)}")
+
+
+def partition(evaluation: task_one.evaluation.Evaluation, request: AnyRequest, is_anomalous: typing.Optional[bool]):
+    """
+    File the request under anomalous or typical, as given by its score (zero or negative scores being anomalous),
+    or under unscored if is_anomalous is None
+    """
+    if is_anomalous is None:
+        evaluation.unscored_requests.append(request)
+    elif is_anomalous:
+        evaluation.anomalous_requests.append(request)
+    else:
+        evaluation.typical_requests.append(request)
+
 
 class EvaluationServiceInterface(abc.ABC):
     """
@@ -25,41 +114,574 @@ class EvaluationServiceInterface(abc.ABC):
 
     N.B. Do not implement ScorerHttpClient. This interface is provided for mocking purposes.
     """
-    def __init__(self):
-        self.scorer = task_one.scorer_http_client.ScorerHttpClient()
+    compact_evaluation_class = task_one.evaluation.CompactEvaluation
+
+    def __init__(
+            self,
+            max_in_flight: int = 1,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            cache: typing.Optional[task_one.score_cache.ScoreCache] = None,
+            processes: typing.Optional[int] = None,
+            scorer_factory: typing.Optional[typing.Callable[[], task_one.scorer_http_client.ScorerHttpClient]] = None,
+            instrumentation: typing.Optional[task_one.instrumentation.Instrumentation] = None,
+            resilience: typing.Optional[task_one.resilience.ResiliencePolicy] = None,
+            deadline: typing.Optional[float] = None,
+            unscored: str = 'raise',
+            rules: typing.Optional[task_one.rules.RuleIndex] = None,
+            store: typing.Optional[task_one.score_store.ScoreStore] = None,
+            concurrency: typing.Optional[task_one.concurrency.AdaptiveLimit] = None,
+            dedup: bool = False,
+    ):
+        """
+        :param max_in_flight: maximum number of scorer calls allowed to be outstanding at once. The default of 1
+            scores requests sequentially on the calling thread; anything higher fans the calls out over a thread
+            pool, which is worthwhile when the scorer is an HTTP round-trip rather than CPU-bound work
+        :param batch_size: maximum number of requests sent to the scorer's evaluate_batch in one call. A batch size
+            of 1 sends every request through the single-item evaluate call, as does a scorer with no evaluate_batch
+            of its own (see scorer_http_client.has_batch_call) - which, with max_in_flight > 1, is sent one request
+            per call so that max_in_flight still bounds the requests being scored at once
+        :param cache: optional ScoreCache consulted before calling the scorer. Only cache misses are sent to the
+            scorer, and their scores are added to the cache
+        :param processes: shard scoring across this many worker processes, each with its own scorer built by
+            scorer_factory - for CPU-bound local scorers. max_in_flight is raised to at least this, so that every
+            worker has a batch to work on. Call close() (or use the service as a context manager) to stop the workers
+        :param instrumentation: optional hooks told about batch, request, validation, scorer and statistics timings
+            and any errors, e.g. a task_one.instrumentation.MetricsRecorder. Without it none of that is timed at all
+        :param resilience: wrap the scorer in a task_one.resilience.ResilientScorer with this policy - call
+            timeouts, hedged calls for stragglers and a circuit breaker. A scorer assigned to service.scorer later on
+            is wrapped the same way
+        :param deadline: seconds an evaluate (or evaluate_iter) call may spend scoring. Batches not yet sent when it
+            passes are left unscored, as are any still outstanding when max_in_flight > 1. A call which is already
+            under way on the calling thread (max_in_flight = 1) is only cut short by the resilience call_timeout
+        :param unscored: what to do with requests that couldn't be scored in time, or at all, once the scorer raises
+            ScorerUnavailable (or the deadline passes). 'raise' propagates the error; 'anomalous' treats them as
+            anomalous; 'separate' puts them in the evaluation's unscored_requests. Unscored requests come out of
+            evaluate_iter with a score of None, and don't count towards any score statistics.
+            CompactEvaluation has no separate bucket, and always files them as anomalous
+        :param rules: a RuleIndex classifying requests up front, without the scorer - only requests matching none of
+            its rules are sent to the scorer (or looked up in the cache). Requests settled by a rule without a score
+            come out of evaluate_iter with a score of None, and don't count towards any score statistics
+        :param store: a persistent ScoreStore consulted after the cache (if any) and before the scorer, which every
+            new score is written to. A cache is warmed with the most recent stored scores straight away
+        :param concurrency: an AdaptiveLimit to work out how many calls to have in flight from the scorer's latency
+            and failures, in place of the fixed max_in_flight. Input is only read once a slot is free, so a slow
+            scorer pushes back on whatever feeds the service - see task_one.concurrency.RequestQueue
+        :param dedup: score identical requests (same fingerprint: URL, method and canonical JSON body) only once per
+            evaluate call, fanning the score back out to every copy. Copies in the same chunk are always caught;
+            across chunks, up to DEDUP_WINDOW distinct requests are remembered, though copies in chunks which are in
+            flight at the same time may both be scored. Every copy still comes out of evaluate_iter (and counts
+            towards any score statistics) in its own place. See dedup_stats for the savings
+        """
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+
+        if unscored not in UNSCORED_POLICIES:
+            raise ValueError(f"unscored must be one of {UNSCORED_POLICIES}, got {unscored!r}")
+
+        if processes is None:
+            scorer = task_one.scorer_http_client.ScorerHttpClient()
+
+        elif scorer_factory is None:
+            raise ValueError("A scorer_factory is needed to build a scorer in each worker process")
+
+        else:
+            scorer = task_one.process_pool.ScorerProcessPool(processes, scorer_factory)
+            max_in_flight = max(max_in_flight, processes)
+
+        self.max_in_flight = max_in_flight
+        self.concurrency = concurrency
+        self.resilience = resilience
+        self.scorer = scorer
+        self.batch_size = batch_size
+        self.cache = cache
+        self.deadline = deadline
+        self.unscored = unscored
+        self._unscored_verdict = True if unscored == 'anomalous' else None
+        self.rules = rules
+
+        self.dedup = dedup
+        self._dedup_requests = 0
+        self._dedup_unique = 0
+        self._dedup_lock = threading.Lock()
+
+        self.store = store
+        if store is not None and cache is not None:
+            store.load_into(cache)
+
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self)
 
     @abc.abstractmethod
-    def evaluate(self, requests: typing.List[requests_lib.Request]) -> task_one.evaluation.Evaluation:
+    def evaluate(self, requests: typing.List[AnyRequest]) -> task_one.evaluation.Evaluation:
         """
         The interface to the requests objects is not documented in the task, so I have assumed a list of
         requests.Request objects.
 
         These are easily + cheaply constructed if the request object arrives in raw JSON or some other form instead,
         and provide a dependable interface to allow replacing of the underlying implementation if necessary.
+
+        The lighter task_one.common.Request tuple is accepted too, and is cheaper still: see Request.from_dict for
+        adapting raw JSON without going through requests.Request at all.
         """
         pass
 
+    def evaluate_iter(
+            self, requests: typing.Iterable[AnyRequest]
+    ) -> typing.Iterator[typing.Tuple[AnyRequest, decimal.Decimal, bool]]:
+        """
+        Lazily evaluate any iterable of requests - e.g. a generator reading a log tail - yielding
+        (request, score, is_anomalous) in input order as each result becomes available.
+
+        Only the requests currently being scored (at most max_in_flight batches) are held in memory, so this works
+        on streams which wouldn't fit in a list.
+
+        The score is None for requests left unscored, or settled by a rule without a score.
+        """
+        if self.instrumentation is None:
+            for request, score in self._scored(requests):
+                if not isinstance(score, decimal.Decimal):
+                    yield request, None, self._verdict(score)
+                    continue
+
+                self._observe(score)
+                yield request, score, score <= 0
+            return
+
+        yield from self._instrumented_iter(requests)
+
+    def evaluate_into(
+            self,
+            requests: typing.Iterable[AnyRequest],
+            sink: typing.Callable[[AnyRequest, decimal.Decimal, bool], typing.Any],
+    ) -> int:
+        """
+        Push-based version of evaluate_iter: call sink(request, score, is_anomalous) for every request in the
+        stream, e.g. to write results straight out to a file, and return the number of requests evaluated.
+        """
+        count = 0
+        for result in self.evaluate_iter(requests):
+            sink(*result)
+            count += 1
+
+        return count
+
+    def evaluate_compact(
+            self, requests: typing.Sequence[AnyRequest], keep_scores: bool = False,
+    ) -> task_one.evaluation.CompactEvaluation:
+        """
+        Evaluate the requests like evaluate, but return a CompactEvaluation: a bitmap of anomalous positions (and,
+        with keep_scores, the scores as floats), with typical/anomalous views reading from the input sequence rather
+        than copying the requests into new lists. Anything other than a sequence is read into a list first, since the
+        views need random access.
+        """
+        if not isinstance(requests, collections.abc.Sequence):
+            requests = list(requests)
+
+        results = ((score, is_anomalous) for _, score, is_anomalous in self.evaluate_iter(requests))
+        evaluation = self.compact_evaluation_class.from_results(requests, results, keep_scores)
+        self._finish(evaluation)
+
+        return evaluation
+
+    @property
+    def scorer(self) -> typing.Any:
+        return self._scorer
+
+    @scorer.setter
+    def scorer(self, scorer: typing.Any):
+        # swapping in the real scorer after construction is the usual pattern, so the resilience policy is applied
+        # here rather than once in __init__ - where it would only ever wrap the default stub
+        if self.resilience is not None and not isinstance(scorer, task_one.resilience.ResilientScorer):
+            # an adaptive limit can let calls in flight go all the way up to its maximum
+            in_flight = self.max_in_flight if self.concurrency is None else \
+                max(self.max_in_flight, self.concurrency.maximum)
+            # room for a hedged duplicate of every call in flight
+            scorer = task_one.resilience.ResilientScorer(scorer, self.resilience, max_workers=2 * in_flight)
+
+        self._scorer = scorer
+
+    @property
+    def dedup_stats(self) -> DedupStats:
+        """How many requests have gone through deduplication, and how many of them were sent on to be scored"""
+        with self._dedup_lock:
+            return DedupStats(self._dedup_requests, self._dedup_unique)
+
+    def close(self):
+        """Release anything held by the scorer, e.g. worker processes"""
+        close = getattr(self.scorer, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _instrumented_iter(
+            self, requests: typing.Iterable[AnyRequest]
+    ) -> typing.Iterator[typing.Tuple[AnyRequest, decimal.Decimal, bool]]:
+        """evaluate_iter with timings reported to self.instrumentation, kept apart so the plain loop stays lean"""
+        instrumentation = self.instrumentation
+        count = 0
+        elapsed = 0.0
+        scored = self._scored(requests)
+        try:
+            while True:
+                # only time spent in here counts, not time the caller spends between results
+                started = time.perf_counter()
+                try:
+                    request, score = next(scored)
+                except StopIteration:
+                    break
+                if not isinstance(score, decimal.Decimal):
+                    score, is_anomalous = None, self._verdict(score)
+                else:
+                    self._observe(score)
+                    is_anomalous = score <= 0
+                taken = time.perf_counter() - started
+
+                elapsed += taken
+                count += 1
+                instrumentation.request_evaluated(is_anomalous, taken)
+                yield request, score, is_anomalous
+
+        except Exception as error:
+            instrumentation.error(error)
+            raise
+
+        instrumentation.batch_finished(count, elapsed)
+
+    def _finish(self, evaluation: typing.Any):
+        """Summarise a finished evaluation, timing it if instrumented"""
+        if self.instrumentation is None:
+            self._summarise(evaluation)
+            return
+
+        started = time.perf_counter()
+        self._summarise(evaluation)
+        self.instrumentation.statistics_computed(time.perf_counter() - started)
+
+    def _verdict(self, outcome: typing.Optional[task_one.rules.Rule]) -> typing.Optional[bool]:
+        """is_anomalous for a request without a score: either unscored (None), or settled by a rule"""
+        return self._unscored_verdict if outcome is None else outcome.anomalous
+
+    def _summarise(self, evaluation: typing.Any):
+        """Hook for subclasses to add whatever else they report onto a finished evaluation"""
+        pass
+
+    def _observe(self, score: decimal.Decimal):
+        """Hook for subclasses which keep state across requests, called once for every score in input order"""
+        pass
+
+    def _scored(
+            self, requests: typing.Iterable[AnyRequest]
+    ) -> typing.Iterator[typing.Tuple[AnyRequest, decimal.Decimal]]:
+        """
+        Send the requests to the scorer in chunks of up to batch_size and yield (request, score) pairs in input order.
+
+        Both services partition on the back of this, so the scoring strategy (sequential or concurrent, single or
+        batched) lives in one place. Requests are validated before they are sent anywhere and scores are validated
+        as they come back, so a bad object raises TypeError regardless of max_in_flight and batch_size.
+
+        Requests which couldn't be scored (see the unscored policy) come out with a score of None, and requests
+        settled by a rule without a score come out with the rule in place of a score.
+        """
+        limit = self.concurrency
+        concurrent_calls = self.max_in_flight > 1 or limit is not None
+
+        # a scorer without a batch call of its own would only score a chunk one request after another, so hand the
+        # pool single requests instead
+        batch_size = self.batch_size
+        if concurrent_calls and not task_one.scorer_http_client.has_batch_call(self.scorer):
+            batch_size = 1
+
+        chunks = self._chunks(requests, batch_size)
+        expires = None if self.deadline is None else time.monotonic() + self.deadline
+        # scores already seen during this call, for deduplication
+        seen = task_one.score_cache.ScoreCache(max_entries=DEDUP_WINDOW) if self.dedup else None
+
+        if not concurrent_calls:
+            for chunk, adapted in chunks:
+                yield from zip(chunk, self._score_chunk(adapted, expires, seen))
+            return
+
+        # keep a FIFO window of at most max_in_flight outstanding calls: results are consumed from the head, so
+        # output order always matches input order, and the input iterable is never read further ahead than needed
+        window = self.max_in_flight if limit is None else limit.maximum
+        in_flight: typing.Deque[typing.Tuple[list, concurrent.futures.Future]] = collections.deque()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=window)
+        abandoned = False
+        try:
+            for chunk, adapted in chunks:
+                if len(in_flight) >= window:
+                    results, timed_out = self._pop_result(in_flight, expires)
+                    abandoned |= timed_out
+                    yield from results
+
+                if limit is None:
+                    future = executor.submit(self._score_chunk, adapted, expires, seen)
+
+                elif limit.acquire(None if expires is None else max(0.0, expires - time.monotonic())):
+                    future = executor.submit(self._score_chunk_limited, adapted, expires, seen)
+
+                else:
+                    # the deadline passed waiting for a slot
+                    future = concurrent.futures.Future()
+                    error = task_one.resilience.DeadlineExceeded(f"Evaluation deadline of {self.deadline}s has passed")
+                    future.set_result(self._give_up(len(adapted), error))
+
+                in_flight.append((chunk, future))
+
+            while in_flight:
+                results, timed_out = self._pop_result(in_flight, expires)
+                abandoned |= timed_out
+                yield from results
+
+        finally:
+            # on an error (or the caller abandoning the generator) don't leave queued scorer calls behind
+            for _, future in in_flight:
+                if future.cancel() and limit is not None:
+                    limit.release()
+            # nor wait on a straggler which has already been given up on
+            executor.shutdown(wait=not abandoned)
+
+    def _chunks(
+            self, requests: typing.Iterable[AnyRequest], batch_size: int,
+    ) -> typing.Iterator[typing.Tuple[typing.List[AnyRequest], typing.List[task_one.common.Request]]]:
+        """
+        Lazily split the input into lists of at most batch_size requests, each paired with the validated
+        task_one.common.Request form of the same requests
+        """
+        requests = iter(requests)
+        while True:
+            chunk = list(itertools.islice(requests, batch_size))
+            if not chunk:
+                return
+
+            if self.instrumentation is None:
+                yield chunk, as_common_requests(chunk)
+                continue
+
+            started = time.perf_counter()
+            adapted = as_common_requests(chunk)
+            self.instrumentation.validated(len(chunk), time.perf_counter() - started)
+            yield chunk, adapted
+
+    def _score_chunk_limited(
+            self,
+            chunk: typing.List[task_one.common.Request],
+            expires: typing.Optional[float],
+            seen: typing.Optional[task_one.score_cache.ScoreCache],
+    ) -> typing.List[typing.Union[decimal.Decimal, task_one.rules.Rule, None]]:
+        """_score_chunk, reporting its latency - and whether it failed, or left anything unscored - to the limit"""
+        started = time.perf_counter()
+        failed = True
+        try:
+            scores = self._score_chunk(chunk, expires, seen)
+            failed = None in scores
+            return scores
+
+        finally:
+            self.concurrency.release(time.perf_counter() - started, failed)
+
+    def _score_chunk(
+            self,
+            chunk: typing.List[task_one.common.Request],
+            expires: typing.Optional[float] = None,
+            seen: typing.Optional[task_one.score_cache.ScoreCache] = None,
+    ) -> typing.List[typing.Union[decimal.Decimal, task_one.rules.Rule, None]]:
+        if self.rules is None:
+            return self._score_unmatched(chunk, expires, seen)
+
+        outcomes: typing.List[typing.Union[decimal.Decimal, task_one.rules.Rule, None]] = []
+        unmatched = []
+        for i, request in enumerate(chunk):
+            rule = self.rules.lookup(request.method, request.path)
+            if rule is None:
+                unmatched.append(i)
+            outcomes.append(rule if rule is None or rule.score is None else rule.score)
+
+        if self.instrumentation is not None:
+            self.instrumentation.rules_matched(len(chunk), len(chunk) - len(unmatched))
+
+        if unmatched:
+            for i, score in zip(unmatched, self._score_unmatched([chunk[i] for i in unmatched], expires, seen)):
+                outcomes[i] = score
+
+        return outcomes
+
+    def _score_unmatched(
+            self,
+            chunk: typing.List[task_one.common.Request],
+            expires: typing.Optional[float],
+            seen: typing.Optional[task_one.score_cache.ScoreCache] = None,
+    ) -> typing.List[typing.Optional[decimal.Decimal]]:
+        if seen is not None:
+            return self._score_deduplicated(chunk, expires, seen)
+
+        if self.cache is None and self.store is None:
+            return self._score_or_give_up(chunk, expires)
+
+        return self._score_keyed(chunk, [task_one.score_cache.fingerprint(*request) for request in chunk], expires)
+
+    def _score_deduplicated(
+            self,
+            chunk: typing.List[task_one.common.Request],
+            expires: typing.Optional[float],
+            seen: task_one.score_cache.ScoreCache,
+    ) -> typing.List[typing.Optional[decimal.Decimal]]:
+        """
+        Score each distinct request in the chunk once - and not at all if it was already scored earlier in the same
+        evaluate call - then hand the score back to every copy, in the chunk's order
+        """
+        keys = [task_one.score_cache.fingerprint(*request) for request in chunk]
+
+        # first occurrence of each distinct request which hasn't been seen before
+        by_key: typing.Dict[bytes, typing.Optional[decimal.Decimal]] = {}
+        unique: typing.Dict[bytes, int] = {}
+        for i, key in enumerate(keys):
+            if key not in by_key and key not in unique:
+                score = seen.get(key)
+                if score is None:
+                    unique[key] = i
+                else:
+                    by_key[key] = score
+
+        if unique:
+            first = list(unique.values())
+            fresh = self._score_keyed([chunk[i] for i in first], [keys[i] for i in first], expires)
+            for key, score in zip(unique, fresh):
+                by_key[key] = score
+                # unscored requests aren't remembered, so a later copy gets another try
+                if score is not None:
+                    seen.put(key, score)
+
+        with self._dedup_lock:
+            self._dedup_requests += len(chunk)
+            self._dedup_unique += len(unique)
+
+        if self.instrumentation is not None:
+            self.instrumentation.deduplicated(len(chunk), len(unique))
+
+        return [by_key[key] for key in keys]
+
+    def _score_keyed(
+            self,
+            chunk: typing.List[task_one.common.Request],
+            keys: typing.List[bytes],
+            expires: typing.Optional[float],
+    ) -> typing.List[typing.Optional[decimal.Decimal]]:
+        """Score the chunk through the cache and store, if any, given each request's fingerprint"""
+        if self.cache is None and self.store is None:
+            return self._score_or_give_up(chunk, expires)
+
+        scores = [None] * len(chunk) if self.cache is None else [self.cache.get(key) for key in keys]
+        misses = [i for i, score in enumerate(scores) if score is None]
+
+        if misses and self.store is not None:
+            stored = self.store.get_many([keys[i] for i in misses])
+            if stored:
+                for i in misses:
+                    scores[i] = stored.get(keys[i])
+                    if scores[i] is not None and self.cache is not None:
+                        self.cache.put(keys[i], scores[i])
+
+                misses = [i for i in misses if scores[i] is None]
+
+        if misses:
+            fresh = []
+            for i, score in zip(misses, self._score_or_give_up([chunk[i] for i in misses], expires)):
+                scores[i] = score
+                if score is not None:
+                    fresh.append((keys[i], score))
+                    if self.cache is not None:
+                        self.cache.put(keys[i], score)
+
+            if fresh and self.store is not None:
+                self.store.put_many(fresh)
+
+        return scores
+
+    def _score_or_give_up(
+            self, chunk: typing.List[task_one.common.Request], expires: typing.Optional[float],
+    ) -> typing.List[typing.Optional[decimal.Decimal]]:
+        try:
+            if expires is not None and time.monotonic() >= expires:
+                raise task_one.resilience.DeadlineExceeded(f"Evaluation deadline of {self.deadline}s has passed")
+
+            return self._call_scorer(chunk)
+
+        except task_one.resilience.ScorerUnavailable as error:
+            return self._give_up(len(chunk), error)
+
+    def _give_up(self, count: int, error: Exception) -> typing.List[None]:
+        """Apply the unscored policy to `count` requests the scorer couldn't score"""
+        if self.unscored == 'raise':
+            raise error
+
+        if self.instrumentation is not None:
+            self.instrumentation.error(error)
+
+        return [None] * count
+
+    def _call_scorer(self, chunk: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        if self.instrumentation is None:
+            return self._call_scorer_uninstrumented(chunk)
+
+        started = time.perf_counter()
+        scores = self._call_scorer_uninstrumented(chunk)
+        self.instrumentation.scorer_called(len(chunk), time.perf_counter() - started)
+
+        return scores
+
+    def _call_scorer_uninstrumented(self, chunk: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        # scorers which don't follow the ScorerHttpClient interface may not have a batch call at all, and the
+        # ScorerHttpClient default is no better than calling evaluate here
+        if len(chunk) == 1 or not task_one.scorer_http_client.has_batch_call(self.scorer):
+            scores = [self.scorer.evaluate(*request) for request in chunk]
+        else:
+            scores = self.scorer.evaluate_batch(chunk)
+            if len(scores) != len(chunk):
+                raise ValueError(f"Scorer returned {len(scores)} scores for a batch of {len(chunk)} requests")
+
+        for score in scores:
+            check_score(score)
+
+        return scores
+
+    def _pop_result(
+            self,
+            in_flight: typing.Deque[typing.Tuple[list, concurrent.futures.Future]],
+            expires: typing.Optional[float],
+    ) -> typing.Tuple[typing.Iterator[typing.Tuple[AnyRequest, typing.Optional[decimal.Decimal]]], bool]:
+        """Results of the oldest call in flight, and whether it had to be abandoned because the deadline passed"""
+        chunk, future = in_flight.popleft()
+        if expires is None:
+            return zip(chunk, future.result()), False
+
+        try:
+            return zip(chunk, future.result(timeout=max(0.0, expires - time.monotonic()))), False
+
+        except concurrent.futures.TimeoutError:
+            if future.cancel() and self.concurrency is not None:
+                self.concurrency.release()
+            error = task_one.resilience.DeadlineExceeded(f"Evaluation deadline of {self.deadline}s has passed")
+            return zip(chunk, self._give_up(len(chunk), error)), True
+
 
 class EvaluationService(EvaluationServiceInterface):
 
-    def evaluate(self, requests: typing.List[requests_lib.Request]) -> task_one.evaluation.Evaluation:
+    def evaluate(self, requests: typing.List[AnyRequest]) -> task_one.evaluation.Evaluation:
         # rather than building up two potentially long lists of objects, and then instantiating a
         # new object with copies of those lists, create a stateful instance here and append to it
         # while processing requests
         evaluation = task_one.evaluation.Evaluation([], [])
-        for request in requests:
-
-            if not isinstance(request, requests_lib.Request):
-                raise TypeError(f"Instance of type {type(request)} not recognised, expected requests.Request object")
-
-            score = self.scorer.evaluate(request.url, request.method, request.json)
-
-            if not isinstance(score, decimal.Decimal):
-                raise TypeError(f"'{score}' not recognised: expected a decimal.Decimal object, got {type(score)}")
-
-            if score <= 0:
-                evaluation.anomalous_requests.append(request)
-            else:
-                evaluation.typical_requests.append(request)
+        for request, _, is_anomalous in self.evaluate_iter(requests):
+            partition(evaluation, request, is_anomalous)
 
         return evaluation
@@ -0,0 +1,103 @@
+import decimal
+import http.server
+import json
+import threading
+import time
+import typing
+
+import task_one.fake_scorers
+
+# using absolute imports for better immediate readability
+
+
+class FakeScorerServer:
+    """
+    Local stand-in for the scorer service, speaking the JSON protocol PooledScorerHttpClient expects. Runs an HTTP/1.1
+    server (so connections are kept alive) on a background thread, and counts the connections it accepts so tests can
+    check they're being reused.
+
+    Usage:
+        with FakeScorerServer(latency=0.01) as server:
+            client = PooledScorerHttpClient(server.url)
+    """
+
+    def __init__(
+            self,
+            score_fn: task_one.fake_scorers.ScoreFunction = task_one.fake_scorers.always_typical,
+            latency: float = 0.0,
+            host: str = '127.0.0.1',
+            port: int = 0,
+    ):
+        self.score_fn = score_fn
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeScorerServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakeScorerServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _score(self, request: dict) -> str:
+        # scores go out as strings, so no precision is lost on the way back either
+        return str(self.score_fn(request['path'], request['method'], request['body']))
+
+    def _handler_class(self) -> typing.Type[http.server.BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])), parse_float=decimal.Decimal)
+                with fake._lock:
+                    fake.requests += 1
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                if self.path == '/score':
+                    response = {'score': fake._score(payload)}
+                elif self.path == '/score_batch':
+                    response = {'scores': [fake._score(request) for request in payload['requests']]}
+                else:
+                    self.send_error(404)
+                    return
+
+                content = json.dumps(response).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
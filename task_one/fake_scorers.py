@@ -0,0 +1,116 @@
+import asyncio
+import decimal
+import hashlib
+import threading
+import time
+import typing
+
+import task_one.async_scorer_http_client
+import task_one.scorer_http_client
+
+# using absolute imports for better immediate readability
+
+ScoreFunction = typing.Callable[[str, str, typing.Any], decimal.Decimal]
+
+
+def always_typical(path: str, method: str, body: typing.Any) -> decimal.Decimal:
+    return decimal.Decimal(1)
+
+
+class LatencyScorer(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    In-process stand-in for the scorer service which sleeps for a fixed time on every call, to mimic the
+    network round-trip without needing a network. Useful for showing off (and testing) concurrent scoring.
+    """
+
+    def __init__(self, latency: float = 0.01, score_fn: ScoreFunction = always_typical):
+        self.latency = latency
+        self.score_fn = score_fn
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        time.sleep(self.latency)
+        return self.score_fn(path, method, body)
+
+
+class AsyncLatencyScorer(task_one.async_scorer_http_client.AsyncScorerHttpClient):
+    """asyncio version of LatencyScorer: awaits a fixed delay on every call before scoring"""
+
+    def __init__(self, latency: float = 0.01, score_fn: ScoreFunction = always_typical):
+        self.latency = latency
+        self.score_fn = score_fn
+
+    async def evaluate(self, path, method, body) -> decimal.Decimal:
+        await asyncio.sleep(self.latency)
+        return self.score_fn(path, method, body)
+
+
+class CpuBoundScorer(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    Stand-in for a local model: burns CPU by hashing the request `rounds` times, then derives a repeatable score in
+    [-1, 1) from the digest. Picklable, so it can be used as the scorer_factory for a process pool.
+    """
+
+    def __init__(self, rounds: int = 1000):
+        self.rounds = rounds
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        digest = f'{method} {path} {body}'.encode('utf-8')
+        for _ in range(self.rounds):
+            digest = hashlib.sha256(digest).digest()
+
+        return decimal.Decimal(int.from_bytes(digest[:2], 'big') - 2 ** 15) / 2 ** 15
+
+
+class CapacityScorer(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    Simulated scorer service with `capacity` workers, each taking `latency` seconds per request. Calls beyond
+    capacity queue for a free worker, so latency climbs once the scorer is overloaded, and give up with a
+    ConnectionError after max_queue_time seconds in the queue. Capacity can be changed while calls are running, to
+    mimic a deploy or a GC pause.
+    """
+
+    def __init__(
+            self,
+            capacity: int = 8,
+            latency: float = 0.01,
+            max_queue_time: typing.Optional[float] = None,
+            score_fn: ScoreFunction = always_typical,
+    ):
+        self.capacity = capacity
+        self.latency = latency
+        self.max_queue_time = max_queue_time
+        self.score_fn = score_fn
+
+        self.served = 0
+        self.rejected = 0
+        self.busy = 0
+        self._condition = threading.Condition()
+
+    def set_capacity(self, capacity: int):
+        with self._condition:
+            self.capacity = capacity
+            self._condition.notify_all()
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        self._work(1)
+        return self.score_fn(path, method, body)
+
+    def evaluate_batch(self, requests):
+        # a batch occupies one worker for as long as its requests would take one at a time
+        self._work(len(requests))
+        return [self.score_fn(*request) for request in requests]
+
+    def _work(self, requests: int):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.busy < self.capacity, self.max_queue_time):
+                self.rejected += requests
+                raise ConnectionError("Scorer overloaded")
+            self.busy += 1
+
+        try:
+            time.sleep(self.latency * requests)
+        finally:
+            with self._condition:
+                self.busy -= 1
+                self.served += requests
+                self._condition.notify()
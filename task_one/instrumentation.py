@@ -0,0 +1,216 @@
+import bisect
+import collections
+import threading
+import typing
+
+import task_one.score_cache
+
+# using absolute imports for better immediate readability
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'),
+)
+
+
+class Instrumentation:
+    """
+    Hooks called from the evaluation services' shared scoring loop. Every hook is a no-op here: subclass and override
+    the ones of interest, e.g. to forward timings to a metrics library. A service without instrumentation skips the
+    hooks (and the timing calls behind them) entirely.
+
+    Scorer calls may be made from worker threads when max_in_flight > 1, so scorer_called must be thread-safe.
+    """
+
+    def attach(self, service: typing.Any):
+        """Called once with the service this instrumentation has been given to"""
+        pass
+
+    def batch_finished(self, requests: int, seconds: float):
+        """One evaluate/evaluate_iter run over `requests` requests has finished, taking `seconds` in total"""
+        pass
+
+    def request_evaluated(self, is_anomalous: bool, seconds: float):
+        """
+        A single request came out of the loop, `seconds` after the previous one (excluding time in the caller).
+        is_anomalous is None for a request which couldn't be scored, under the 'separate' unscored policy
+        """
+        pass
+
+    def validated(self, requests: int, seconds: float):
+        pass
+
+    def rules_matched(self, requests: int, matched: int):
+        """`matched` of a chunk of `requests` requests were settled by the service's rules, bypassing the scorer"""
+        pass
+
+    def deduplicated(self, requests: int, unique: int):
+        """A chunk of `requests` requests held `unique` ones which hadn't been scored yet, the rest being duplicates"""
+        pass
+
+    def scorer_called(self, requests: int, seconds: float):
+        """The scorer was called with `requests` requests (1 for the single-item call), and answered in `seconds`"""
+        pass
+
+    def statistics_computed(self, seconds: float):
+        """Time spent working out any statistics reported on an evaluation, e.g. task_two's std dev"""
+        pass
+
+    def error(self, error: Exception):
+        pass
+
+
+class Histogram(typing.NamedTuple):
+    bounds: typing.Tuple[float, ...]
+    counts: typing.Tuple[int, ...]
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given quantile - coarse, but cheap to keep"""
+        total = sum(self.counts)
+        if not total:
+            return float('nan')
+
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            if running >= fraction * total:
+                return bound
+
+        return self.bounds[-1]
+
+
+class MetricsSnapshot(typing.NamedTuple):
+    batches: int
+    requests: int
+    typical: int
+    anomalous: int
+    unscored: int
+    errors: typing.Dict[str, int]
+    batch_seconds: float
+    request_latency: Histogram
+    validation_seconds: float
+    rule_matches: int
+    dedup_requests: int
+    dedup_unique: int
+    scorer_calls: int
+    scorer_requests: int
+    # summed over calls, so this can exceed batch_seconds when calls overlap
+    scorer_seconds: float
+    scorer_latency: Histogram
+    statistics_seconds: float
+    cache: typing.Optional[task_one.score_cache.CacheStats]
+
+    @property
+    def mean_scorer_batch(self) -> float:
+        return self.scorer_requests / self.scorer_calls if self.scorer_calls else float('nan')
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of deduplicated requests which were duplicates, and so never reached the scorer"""
+        return 1 - self.dedup_unique / self.dedup_requests if self.dedup_requests else 0.0
+
+
+class MetricsRecorder(Instrumentation):
+    """
+    Instrumentation which accumulates counters, timings and latency histograms, readable at any time through
+    snapshot(). on_batch, if given, is called with a fresh snapshot after every batch.
+    """
+
+    def __init__(self, on_batch: typing.Optional[typing.Callable[[MetricsSnapshot], typing.Any]] = None):
+        self.on_batch = on_batch
+        self._cache: typing.Optional[task_one.score_cache.ScoreCache] = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._batches = 0
+            self._requests = 0
+            self._typical = 0
+            self._anomalous = 0
+            self._unscored = 0
+            self._errors: typing.Counter[str] = collections.Counter()
+            self._batch_seconds = 0.0
+            self._request_buckets = [0] * len(LATENCY_BUCKETS)
+            self._validation_seconds = 0.0
+            self._rule_matches = 0
+            self._dedup_requests = 0
+            self._dedup_unique = 0
+            self._scorer_calls = 0
+            self._scorer_requests = 0
+            self._scorer_seconds = 0.0
+            self._scorer_buckets = [0] * len(LATENCY_BUCKETS)
+            self._statistics_seconds = 0.0
+
+    def attach(self, service: typing.Any):
+        self._cache = getattr(service, 'cache', None)
+
+    def batch_finished(self, requests: int, seconds: float):
+        with self._lock:
+            self._batches += 1
+            self._batch_seconds += seconds
+
+        if self.on_batch is not None:
+            self.on_batch(self.snapshot())
+
+    def request_evaluated(self, is_anomalous: bool, seconds: float):
+        with self._lock:
+            self._requests += 1
+            if is_anomalous is None:
+                self._unscored += 1
+            elif is_anomalous:
+                self._anomalous += 1
+            else:
+                self._typical += 1
+            self._request_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def validated(self, requests: int, seconds: float):
+        with self._lock:
+            self._validation_seconds += seconds
+
+    def rules_matched(self, requests: int, matched: int):
+        with self._lock:
+            self._rule_matches += matched
+
+    def deduplicated(self, requests: int, unique: int):
+        with self._lock:
+            self._dedup_requests += requests
+            self._dedup_unique += unique
+
+    def scorer_called(self, requests: int, seconds: float):
+        with self._lock:
+            self._scorer_calls += 1
+            self._scorer_requests += requests
+            self._scorer_seconds += seconds
+            self._scorer_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def statistics_computed(self, seconds: float):
+        with self._lock:
+            self._statistics_seconds += seconds
+
+    def error(self, error: Exception):
+        with self._lock:
+            self._errors[type(error).__name__] += 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        with self._lock:
+            return MetricsSnapshot(
+                batches=self._batches,
+                requests=self._requests,
+                typical=self._typical,
+                anomalous=self._anomalous,
+                unscored=self._unscored,
+                errors=dict(self._errors),
+                batch_seconds=self._batch_seconds,
+                request_latency=Histogram(LATENCY_BUCKETS, tuple(self._request_buckets)),
+                validation_seconds=self._validation_seconds,
+                rule_matches=self._rule_matches,
+                dedup_requests=self._dedup_requests,
+                dedup_unique=self._dedup_unique,
+                scorer_calls=self._scorer_calls,
+                scorer_requests=self._scorer_requests,
+                scorer_seconds=self._scorer_seconds,
+                scorer_latency=Histogram(LATENCY_BUCKETS, tuple(self._scorer_buckets)),
+                statistics_seconds=self._statistics_seconds,
+                cache=None if self._cache is None else self._cache.stats,
+            )
@@ -0,0 +1,88 @@
+import decimal
+import json
+import threading
+import typing
+
+import requests as requests_lib  # evaluate_batch's interface already defines a variable named "requests"
+
+import task_one.common
+import task_one.scorer_http_client
+
+# using absolute imports for better immediate readability
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+
+
+def parse_score(value: typing.Any) -> decimal.Decimal:
+    """Scores may arrive as JSON numbers or strings - either way go straight to Decimal, never via float"""
+    if isinstance(value, decimal.Decimal):
+        return value
+
+    if isinstance(value, str):
+        return decimal.Decimal(value)
+
+    raise TypeError(f"'{value}' not recognised: expected a number or numeric string score, got {type(value)}")
+
+
+class PooledScorerHttpClient(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    ScorerHttpClient which talks to a scorer service over HTTP, reusing keep-alive connections from a shared
+    urllib3 connection pool rather than paying for a new TCP/TLS handshake per request.
+
+    The wire format is JSON:
+        POST {base_url}/score        {"path": ..., "method": ..., "body": ...}   ->  {"score": 0.5}
+        POST {base_url}/score_batch  {"requests": [{"path": ...}, ...]}          ->  {"scores": [0.5, ...]}
+
+    Response numbers are parsed straight into Decimal. requests.Session isn't guaranteed thread-safe, so every
+    thread gets its own session, but all of them are mounted on the same adapter and so share one connection pool -
+    which makes a single client safe to share across the evaluation service's worker threads.
+    """
+
+    def __init__(
+            self,
+            base_url: str,
+            pool_size: int = DEFAULT_POOL_SIZE,
+            timeout: typing.Union[float, typing.Tuple[float, float]] = DEFAULT_TIMEOUT,
+            retries: int = 0,
+    ):
+        """
+        :param base_url: root URL of the scorer service, e.g. http://scorer:8080
+        :param pool_size: maximum number of connections kept open to the scorer. Calls beyond this block until a
+            connection is free, rather than opening (and then throwing away) extra ones - size it to max_in_flight
+        :param timeout: per-request timeout in seconds, either one value or a (connect, read) pair
+        :param retries: number of times to retry failed connections (not failed responses)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._adapter = requests_lib.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=retries,
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests_lib.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests_lib.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+
+        return session
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        response = self._post('/score', {'path': path, 'method': method, 'body': body})
+        return parse_score(response['score'])
+
+    def evaluate_batch(self, requests: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        response = self._post('/score_batch', {'requests': [request._asdict() for request in requests]})
+        return [parse_score(score) for score in response['scores']]
+
+    def close(self):
+        self._adapter.close()
+
+    def _post(self, endpoint: str, payload: dict) -> dict:
+        response = self.session.post(self.base_url + endpoint, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return json.loads(response.content, parse_float=decimal.Decimal, parse_int=decimal.Decimal)
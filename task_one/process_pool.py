@@ -0,0 +1,76 @@
+import concurrent.futures
+import decimal
+import typing
+
+import task_one.common
+import task_one.scorer_http_client
+
+# using absolute imports for better immediate readability
+
+# each worker process builds its own scorer once, at start-up, and keeps it here
+_worker_scorer: typing.Any = None
+
+
+def _initialise_worker(scorer_factory: typing.Callable[[], task_one.scorer_http_client.ScorerHttpClient]):
+    global _worker_scorer
+    _worker_scorer = scorer_factory()
+
+
+def pack_scores(scores: typing.Iterable[decimal.Decimal]) -> str:
+    """
+    Scores are sent back from the workers as a single space-separated string: cheaper to pickle than a list of
+    Decimal objects, and the string form round-trips a Decimal exactly
+    """
+    return ' '.join(map(str, scores))
+
+
+def unpack_scores(packed: str) -> typing.List[decimal.Decimal]:
+    return [decimal.Decimal(score) for score in packed.split()]
+
+
+def _score_in_worker(requests: typing.List[task_one.common.Request]) -> str:
+    evaluate_batch = getattr(_worker_scorer, 'evaluate_batch', None)
+    if evaluate_batch is None:
+        scores = [_worker_scorer.evaluate(*request) for request in requests]
+    else:
+        scores = evaluate_batch(requests)
+
+    for score in scores:
+        # must be checked here, as the string form of e.g. None doesn't survive the trip back to the parent
+        if not isinstance(score, decimal.Decimal):
+            raise TypeError(f"'{score}' not recognised: expected a decimal.Decimal object, got {type(score)}")
+
+    return pack_scores(scores)
+
+
+class ScorerProcessPool(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    Scorer which shards batches across a pool of worker processes, each holding its own scorer instance built by
+    scorer_factory. Intended for local, CPU-bound scorers (e.g. a model) which would otherwise be pinned to one core.
+
+    scorer_factory is sent to the workers, so it must be picklable - e.g. a class or a module-level function.
+    Each call blocks until its batch is scored, so keep max_in_flight on the service at least as high as the number
+    of processes to keep every worker busy.
+    """
+
+    def __init__(
+            self,
+            processes: int,
+            scorer_factory: typing.Callable[[], task_one.scorer_http_client.ScorerHttpClient],
+    ):
+        if processes < 1:
+            raise ValueError(f"processes must be at least 1, got {processes}")
+
+        self.processes = processes
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_initialise_worker, initargs=(scorer_factory,),
+        )
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        return self.evaluate_batch([task_one.common.Request(path, method, body)])[0]
+
+    def evaluate_batch(self, requests: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        return unpack_scores(self._executor.submit(_score_in_worker, list(requests)).result())
+
+    def close(self):
+        self._executor.shutdown(wait=True)
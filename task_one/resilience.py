@@ -0,0 +1,250 @@
+import bisect
+import collections
+import concurrent.futures
+import decimal
+import threading
+import time
+import typing
+
+import task_one.common
+import task_one.scorer_http_client
+
+# using absolute imports for better immediate readability
+
+
+class ScorerUnavailable(Exception):
+    """The scorer couldn't produce a score in time, or at all"""
+    pass
+
+
+class ScorerTimeout(ScorerUnavailable):
+    pass
+
+
+class CircuitOpen(ScorerUnavailable):
+    pass
+
+
+class DeadlineExceeded(ScorerUnavailable):
+    pass
+
+
+class ResiliencePolicy(typing.NamedTuple):
+    """
+    How a ResilientScorer guards calls to the scorer it wraps. Every protection is off by default.
+
+    call_timeout: seconds to wait for any one scorer call (a single request, or a batch) before giving up on it
+    hedge_quantile: once a call has been outstanding for longer than this quantile (e.g. 0.95) of recent call
+        latencies, send a duplicate and take whichever answers first. Only starts after hedge_min_samples calls
+    failure_threshold: consecutive failures after which the circuit breaker opens, failing calls straight away
+        without touching the scorer. After reset_after seconds one trial call is let through to test the water
+    """
+    call_timeout: typing.Optional[float] = None
+    hedge_quantile: typing.Optional[float] = None
+    hedge_min_samples: int = 20
+    failure_threshold: typing.Optional[int] = None
+    reset_after: float = 30.0
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(
+            self, failure_threshold: int, reset_after: float, clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1, got {failure_threshold}")
+
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_after:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go ahead. While half-open, only a single trial call is let through"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_after:
+                # this caller makes the trial call; anyone else gets CircuitOpen until it succeeds
+                self._state = self.HALF_OPEN
+                return
+
+            raise CircuitOpen(f"Scorer circuit is {self._state} after {self._failures} consecutive failures")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class LatencyWindow:
+    """The most recent call latencies, kept sorted alongside arrival order so quantiles are cheap to read"""
+
+    def __init__(self, size: int = 100):
+        self._recent: typing.Deque[float] = collections.deque()
+        self._sorted: typing.List[float] = []
+        self._size = size
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def record(self, seconds: float):
+        with self._lock:
+            if len(self._recent) == self._size:
+                del self._sorted[bisect.bisect_left(self._sorted, self._recent.popleft())]
+
+            self._recent.append(seconds)
+            bisect.insort(self._sorted, seconds)
+
+    def quantile(self, fraction: float) -> float:
+        with self._lock:
+            if not self._sorted:
+                return float('nan')
+            return self._sorted[min(int(fraction * len(self._sorted)), len(self._sorted) - 1)]
+
+
+class ResilientScorer(task_one.scorer_http_client.ScorerHttpClient):
+    """
+    Wraps a scorer so that a slow or failing scorer can't hold up evaluation indefinitely: calls are bounded by a
+    timeout, stragglers are hedged with a duplicate call, and a circuit breaker stops calling a scorer which keeps
+    failing. Any failure surfaces as ScorerUnavailable (chained to the original error where there is one), which the
+    evaluation services can treat according to their `unscored` policy.
+
+    Timed out calls can't be interrupted, only abandoned: they carry on in the background on one of max_workers
+    threads. Latencies for hedging are tracked separately for single and batch calls.
+
+    clock times everything: call latencies, timeouts and the circuit breaker's reset_after. Calls are waited on in
+    real time, so anything other than the default time.monotonic should still count real seconds.
+    """
+
+    def __init__(
+            self,
+            scorer: typing.Any,
+            policy: ResiliencePolicy = ResiliencePolicy(),
+            max_workers: int = 8,
+            clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.scorer = scorer
+        self.policy = policy
+        self.breaker = None if policy.failure_threshold is None else \
+            CircuitBreaker(policy.failure_threshold, policy.reset_after, clock)
+        self.hedged = 0  # how many duplicate calls have been sent
+
+        self._latencies = {'evaluate': LatencyWindow(), 'evaluate_batch': LatencyWindow()}
+        self._clock = clock
+
+        # only needed to put a bound on calls, or to race them against each other
+        self._executor = None
+        if policy.call_timeout is not None or policy.hedge_quantile is not None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        return self._call('evaluate', self.scorer.evaluate, path, method, body)
+
+    def evaluate_batch(self, requests: typing.List[task_one.common.Request]) -> typing.List[decimal.Decimal]:
+        evaluate_batch = getattr(self.scorer, 'evaluate_batch', None)
+        if evaluate_batch is None:
+            return [self.evaluate(*request) for request in requests]
+
+        return self._call('evaluate_batch', evaluate_batch, requests)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+        close = getattr(self.scorer, 'close', None)
+        if close is not None:
+            close()
+
+    def _call(self, kind: str, function: typing.Callable, *args) -> typing.Any:
+        if self.breaker is not None:
+            self.breaker.before_call()
+
+        started = self._clock()
+        try:
+            result = function(*args) if self._executor is None else self._race(kind, function, args)
+
+        except Exception as error:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+
+            if isinstance(error, ScorerUnavailable):
+                raise
+            raise ScorerUnavailable(f"Scorer call failed: {error!r}") from error
+
+        if self.breaker is not None:
+            self.breaker.record_success()
+        self._latencies[kind].record(self._clock() - started)
+
+        return result
+
+    def _race(self, kind: str, function: typing.Callable, args: tuple) -> typing.Any:
+        timeout = self.policy.call_timeout
+        expires = None if timeout is None else self._clock() + timeout
+
+        def remaining() -> typing.Optional[float]:
+            return None if expires is None else max(0.0, expires - self._clock())
+
+        pending = {self._executor.submit(function, *args)}
+
+        hedge_after = self._hedge_after(kind)
+        if hedge_after is not None:
+            if expires is not None:
+                hedge_after = min(hedge_after, remaining())
+
+            done, _ = concurrent.futures.wait(pending, timeout=hedge_after)
+            if not done:
+                self.hedged += 1
+                pending.add(self._executor.submit(function, *args))
+
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, timeout=remaining(), return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+
+                error = future.exception()
+
+        if not pending:
+            raise error
+
+        for future in pending:
+            future.cancel()
+        raise ScorerTimeout(f"No response from the scorer within {timeout}s")
+
+    def _hedge_after(self, kind: str) -> typing.Optional[float]:
+        latencies = self._latencies[kind]
+        if self.policy.hedge_quantile is None or len(latencies) < self.policy.hedge_min_samples:
+            return None
+
+        return latencies.quantile(self.policy.hedge_quantile)
@@ -0,0 +1,144 @@
+import decimal
+import typing
+import urllib.parse
+
+
+class Rule(typing.NamedTuple):
+    """
+    Classify every request whose URL path starts with `prefix` (and whose method is `method`, or any method if that's
+    None) without asking the scorer.
+
+    Prefixes match whole path segments: '/static' covers '/static' and '/static/app.js', but not '/staticky/evil'.
+
+    With a score, matching requests are treated exactly as if the scorer had returned it, including in task_two's
+    statistics; without one, they are filed by `anomalous` alone and don't count towards the statistics at all.
+    """
+    prefix: str
+    anomalous: bool
+    method: typing.Optional[str] = None
+    score: typing.Optional[decimal.Decimal] = None
+
+    @classmethod
+    def from_dict(cls, data: typing.Mapping[str, typing.Any]) -> 'Rule':
+        """
+        Adapt a raw mapping, e.g. a parsed line of a JSONL rules file, with 'prefix', 'verdict' ('typical' or
+        'anomalous') and optional 'method' and 'score' keys
+        """
+        verdict = data['verdict']
+        if verdict not in ('typical', 'anomalous'):
+            raise ValueError(f"verdict must be 'typical' or 'anomalous', got {verdict!r}")
+
+        score = data.get('score')
+        return cls(
+            data['prefix'],
+            verdict == 'anomalous',
+            data.get('method'),
+            None if score is None else as_score(score),
+        )
+
+
+def as_score(score: typing.Any) -> decimal.Decimal:
+    """A rule's score as a finite Decimal, going through str so that a float converts as it reads"""
+    if isinstance(score, bool):
+        raise ValueError(f"Rule score must be a number, got {score!r}")
+
+    try:
+        converted = score if isinstance(score, decimal.Decimal) else decimal.Decimal(str(score))
+    except decimal.InvalidOperation:
+        raise ValueError(f"Rule score must be a number, got {score!r}") from None
+
+    if not converted.is_finite():
+        raise ValueError(f"Rule score must be finite, got {score!r}")
+
+    return converted
+
+
+def path_of(url: str) -> str:
+    """
+    The path part of a URL (or of a bare path), without any query string or fragment - a '/' inside either of those
+    doesn't start the path
+    """
+    return urllib.parse.urlsplit(url).path or '/'
+
+
+def has_dot_segments(path: str) -> bool:
+    """
+    Whether the path climbs about with '.' or '..' segments, percent-encoded or not (and taking a backslash as a
+    separator too, as some servers do), so that where it ends up can't be told from its prefix
+    """
+    decoded = urllib.parse.unquote(path).replace('\\', '/')
+    return any(segment in ('.', '..') for segment in decoded.split('/'))
+
+
+# key marking a node where a rule's prefix ends - can't clash with the single characters keying child nodes
+_RULE = ''
+
+
+class RuleIndex:
+    """
+    Rules compiled into a character trie over path prefixes, one per method plus one for rules covering any method.
+
+    A lookup walks each of the two relevant tries at most once along the path, so it costs O(path length) however many
+    rules there are. A prefix only matches where a path segment ends - at a '/', or the end of the path - so a
+    known-good rule can't be stretched over a neighbouring path which happens to share its first few characters.
+    Paths with dot segments ('/static/../admin') match no rules at all, and are left to the scorer.
+    The longest matching prefix wins; between equally long prefixes, a rule for the specific method wins over one
+    for any method. Adding a rule for the same method and prefix as an existing one replaces it.
+    """
+
+    def __init__(self, rules: typing.Iterable[Rule] = ()):
+        self._tries: typing.Dict[typing.Optional[str], dict] = {}
+        self._count = 0
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, rule: Rule):
+        if rule.score is not None:
+            # the services only take a Decimal for a score, so convert ints, floats and strings the way from_dict does
+            rule = rule._replace(score=as_score(rule.score))
+            if (rule.score <= 0) != rule.anomalous:
+                raise ValueError(f"Score {rule.score} contradicts the verdict of rule {rule}")
+
+        method = None if rule.method is None else rule.method.upper()
+        node = self._tries.setdefault(method, {})
+        for character in rule.prefix:
+            node = node.setdefault(character, {})
+
+        if _RULE not in node:
+            self._count += 1
+        node[_RULE] = rule
+
+    def lookup(self, method: typing.Optional[str], url: str) -> typing.Optional[Rule]:
+        path = path_of(url)
+        if has_dot_segments(path):
+            return None
+
+        # requests.Request leaves the method as None unless it's given, which only wildcard rules can match
+        specific, specific_length = self._longest_match(self._tries.get((method or '').upper()), path)
+        wildcard, wildcard_length = self._longest_match(self._tries.get(None), path)
+
+        if specific is not None and specific_length >= wildcard_length:
+            return specific
+
+        return wildcard
+
+    @staticmethod
+    def _longest_match(node: typing.Optional[dict], path: str) -> typing.Tuple[typing.Optional[Rule], int]:
+        if node is None:
+            return None, -1
+
+        match, length = node.get(_RULE), 0
+        for depth, character in enumerate(path, 1):
+            node = node.get(character)
+            if node is None:
+                break
+
+            rule = node.get(_RULE)
+            # only where a segment ends: the prefix ends with '/', or the path carries on with one (or not at all)
+            if rule is not None and (character == '/' or depth == len(path) or path[depth] == '/'):
+                match, length = rule, depth
+
+        return match, length if match is not None else -1
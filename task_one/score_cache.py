@@ -0,0 +1,115 @@
+import collections
+import decimal
+import hashlib
+import json
+import sys
+import threading
+import time
+import typing
+
+
+def fingerprint(path: str, method: typing.Optional[str], body: typing.Any) -> bytes:
+    """
+    Canonical hash of a request's URL, method and JSON body.
+
+    Dict keys are sorted and whitespace is stripped before hashing, so bodies which only differ in key order hash
+    identically. Anything json can't serialise natively falls back to its repr. A missing method (requests.Request
+    leaves it as None unless given) hashes differently from any method name.
+    """
+    method = None if method is None else method.upper()
+    canonical = json.dumps([path, method, body], sort_keys=True, separators=(',', ':'), default=repr)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+
+class CacheStats(typing.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+class ScoreCache:
+    """
+    Thread-safe LRU cache of request fingerprint -> score, optionally bounded by number of entries, approximate
+    memory use and age.
+
+    Entries older than ttl seconds are treated as misses and dropped on lookup; the least recently used entries
+    are evicted whenever a bound is exceeded. Expired and evicted entries both count towards the eviction counter.
+    """
+
+    def __init__(
+            self,
+            max_entries: typing.Optional[int] = None,
+            max_bytes: typing.Optional[int] = None,
+            ttl: typing.Optional[float] = None,
+            clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+        # key -> (score, expiry time, approximate size in bytes), oldest first
+        self._entries: typing.MutableMapping[bytes, typing.Tuple[decimal.Decimal, float, int]] = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> typing.Optional[decimal.Decimal]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] <= self.clock():
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: bytes, score: decimal.Decimal):
+        size = sys.getsizeof(key) + sys.getsizeof(score)
+        expiry = float('inf') if self.ttl is None else self.clock() + self.ttl
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (score, expiry, size)
+            self.bytes += size
+
+            while self._entries and self._over_capacity():
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.evictions, len(self._entries), self.bytes)
+
+    def _over_capacity(self) -> bool:
+        return (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        )
+
+    def _remove(self, key: bytes):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
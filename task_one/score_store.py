@@ -0,0 +1,214 @@
+import contextlib
+import decimal
+import json
+import sqlite3
+import threading
+import typing
+
+import task_one.score_cache
+
+# using absolute imports for better immediate readability
+
+# SQLite's limit on parameters in one statement is 999 in older builds
+_MAX_PARAMETERS = 900
+
+_SCHEMA = (
+    # key is UNIQUE rather than the primary key so that the implicit rowid is kept: INSERT OR REPLACE gives a
+    # replaced row a new, higher rowid, so rowid order is the order in which scores were last written
+    "CREATE TABLE IF NOT EXISTS scores (key BLOB NOT NULL UNIQUE, score TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value BLOB NOT NULL)",
+)
+
+
+class ScoreStore:
+    """
+    Persistent request fingerprint -> score store, backed by a SQLite database in WAL mode, so that scores (and
+    e.g. task_two's statistics) survive a restart of the service.
+
+    Any number of threads and worker processes on the same host can share the file: each call borrows a connection
+    of its own from a pool, WAL lets readers carry on while another process writes, and writers wait up to
+    `timeout` seconds for each other. At most pool_size idle connections are kept open between calls, however many
+    threads have used the store. Scores are stored as text, so they round-trip as the exact same Decimal.
+
+    With max_entries, the store is compacted back down to the most recently written max_entries scores each time
+    roughly a tenth of that many new scores have been written.
+    """
+
+    def __init__(
+            self, path: str, max_entries: typing.Optional[int] = None, timeout: float = 5.0, pool_size: int = 4,
+    ):
+        if pool_size < 1:
+            raise ValueError(f"pool_size must be at least 1, got {pool_size}")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        self._idle: typing.List[sqlite3.Connection] = []
+        self._open = 0  # idle or borrowed
+        self._generation = 0  # bumped by close(), so connections borrowed before it aren't pooled again
+        self._lock = threading.Lock()
+        self._written = 0  # since the last compaction
+
+        with self._connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+
+    @contextlib.contextmanager
+    def _connection(self) -> typing.Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the duration of the with block. Rather than one per thread, which would leave a
+        connection behind for every short-lived worker thread, connections go back to the pool afterwards - or are
+        closed if it's already full
+        """
+        with self._lock:
+            generation = self._generation
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self._open += 1
+
+        if connection is None:
+            try:
+                connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+                # losing the last few writes in a power cut only costs a few scorer calls, so don't fsync every commit
+                connection.execute("PRAGMA synchronous=NORMAL")
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+
+        try:
+            yield connection
+
+        finally:
+            with self._lock:
+                keep = generation == self._generation and len(self._idle) < self.pool_size
+                if keep:
+                    self._idle.append(connection)
+                else:
+                    self._open -= 1
+
+            if not keep:
+                connection.close()
+
+    def __len__(self) -> int:
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get(self, key: bytes) -> typing.Optional[decimal.Decimal]:
+        with self._connection() as connection:
+            row = connection.execute("SELECT score FROM scores WHERE key = ?", (key,)).fetchone()
+        return None if row is None else decimal.Decimal(row[0])
+
+    def get_many(self, keys: typing.Sequence[bytes]) -> typing.Dict[bytes, decimal.Decimal]:
+        """Scores for whichever of the keys are stored, looked up a whole batch per query"""
+        found = {}
+        with self._connection() as connection:
+            for start in range(0, len(keys), _MAX_PARAMETERS):
+                batch = keys[start:start + _MAX_PARAMETERS]
+                rows = connection.execute(
+                    f"SELECT key, score FROM scores WHERE key IN ({','.join('?' * len(batch))})", batch,
+                )
+                found.update((key, decimal.Decimal(score)) for key, score in rows)
+
+        return found
+
+    def put(self, key: bytes, score: decimal.Decimal):
+        self.put_many([(key, score)])
+
+    def put_many(self, items: typing.Sequence[typing.Tuple[bytes, decimal.Decimal]]):
+        """Write a batch of scores in a single transaction"""
+        with self._connection() as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)",
+                ((key, str(score)) for key, score in items),
+            )
+
+        if self.max_entries is None:
+            return
+
+        with self._lock:
+            self._written += len(items)
+            due = self._written >= max(self.max_entries // 10, 1)
+            if due:
+                self._written = 0
+
+        if due:
+            self.compact()
+
+    def load(self, limit: typing.Optional[int] = None) -> typing.Iterator[typing.Tuple[bytes, decimal.Decimal]]:
+        """Bulk read the most recently written `limit` scores (or all of them), oldest first"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT key, score FROM (SELECT rowid, key, score FROM scores ORDER BY rowid DESC LIMIT ?) "
+                "ORDER BY rowid",
+                (-1 if limit is None else limit,),
+            )
+            for key, score in rows:
+                yield key, decimal.Decimal(score)
+
+    def load_into(self, cache: task_one.score_cache.ScoreCache) -> int:
+        """Warm a ScoreCache with as many of the most recent scores as it will hold, returning how many were loaded"""
+        count = 0
+        for key, score in self.load(cache.max_entries):
+            cache.put(key, score)
+            count += 1
+
+        return count
+
+    def compact(self, max_entries: typing.Optional[int] = None, vacuum: bool = False):
+        """
+        Drop all but the most recently written max_entries scores (the store's own bound by default), and truncate
+        the write-ahead log. vacuum also rebuilds the database file to give the freed pages back to the filesystem,
+        which locks out every other connection while it runs.
+        """
+        max_entries = self.max_entries if max_entries is None else max_entries
+
+        with self._connection() as connection:
+            if max_entries is not None:
+                with connection:
+                    connection.execute(
+                        "DELETE FROM scores WHERE rowid <= "
+                        "(SELECT rowid FROM scores ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                        (max_entries,),
+                    )
+
+            if vacuum:
+                connection.execute("VACUUM")
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def save_state(self, name: str, value: typing.Any):
+        """Persist anything json can encode, e.g. the output of ScoreStatistics.to_state(), under a name"""
+        with self._connection() as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)", (name, json.dumps(value)),
+            )
+
+    def load_state(self, name: str, default: typing.Any = None) -> typing.Any:
+        with self._connection() as connection:
+            row = connection.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def load_states(self, prefix: str) -> typing.Dict[str, typing.Any]:
+        """Every state saved under a name starting with prefix, e.g. one per worker process sharing the store"""
+        with self._connection() as connection:
+            rows = connection.execute(
+                "SELECT name, value FROM state WHERE substr(name, 1, ?) = ? ORDER BY name", (len(prefix), prefix),
+            ).fetchall()
+        return {name: json.loads(value) for name, value in rows}
+
+    def close(self):
+        """
+        Close the idle connections, and any borrowed ones as they're given back. The store can still be used
+        afterwards, opening new connections as needed
+        """
+        with self._lock:
+            self._generation += 1
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+
+        for connection in idle:
+            connection.close()
@@ -1,7 +1,42 @@
 from decimal import Decimal
+from types import FunctionType, MethodType
+from typing import Any, List
+
+from task_one.common import Request
 
 
 class ScorerHttpClient:
 
     def evaluate(self, path, method, body) -> Decimal:
         pass
+
+    def evaluate_batch(self, requests: List[Request]) -> List[Decimal]:
+        """
+        Score several requests in one call, returning one score per request in the same order.
+
+        Scorers which can take a batch in a single round-trip should override this; the default falls back to
+        one evaluate() call per request.
+        """
+        return [self.evaluate(request.path, request.method, request.body) for request in requests]
+
+
+def has_batch_call(scorer: Any) -> bool:
+    """
+    Whether the scorer can take a batch in one call of its own, rather than through the one-at-a-time fallback
+    above - in which case callers are better off making the single calls themselves, concurrently if they can.
+
+    Only a real function counts as a batch call, so a mock scorer which only sets up evaluate isn't sent batches; a
+    ResilientScorer answers for the scorer it wraps.
+    """
+    # imported here as the resilience module builds on this one
+    from task_one.resilience import ResilientScorer
+
+    if isinstance(scorer, ResilientScorer):
+        return has_batch_call(scorer.scorer)
+
+    evaluate_batch = getattr(scorer, 'evaluate_batch', None)
+    if type(evaluate_batch) is MethodType:
+        return evaluate_batch.__func__ is not ScorerHttpClient.evaluate_batch
+
+    # a function set on the instance itself; type() rather than isinstance, which a mock's spec can fool
+    return type(evaluate_batch) is FunctionType
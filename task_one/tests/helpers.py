@@ -0,0 +1,36 @@
+"""Small fakes and request generators shared by the task_one and task_two tests"""
+import decimal
+import typing
+
+import requests
+
+import task_one.common
+
+# using absolute imports for better immediate readability
+
+
+def gen_requests(num: int = 10) -> typing.List[task_one.common.Request]:
+    return [task_one.common.Request(f'https://test-request/{i}', 'GET', '') for i in range(num)]
+
+
+def gen_http_requests(num: int = 10, body: bool = False) -> typing.List[requests.Request]:
+    """As gen_requests, but as requests.Request objects - POSTs with a small JSON body each if body is set"""
+    if body:
+        return [requests.Request('POST', f'https://test-request/{i}', json={'i': i}) for i in range(num)]
+
+    return [requests.Request('GET', f'https://test-request/{i}') for i in range(num)]
+
+
+def alternating(path: str, method: str, body: typing.Any) -> decimal.Decimal:
+    """Scorer for the requests above: even-numbered requests are typical, odd-numbered ones are anomalous"""
+    return decimal.Decimal(-1) if int(path.rsplit('/', 1)[-1]) % 2 else decimal.Decimal(1)
+
+
+class FakeClock:
+    """Stands in for time.monotonic: only moves when a test sets now"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
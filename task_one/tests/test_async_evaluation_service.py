@@ -0,0 +1,59 @@
+import asyncio
+import decimal
+import time
+import typing
+
+import pytest
+import requests
+
+import task_one.async_evaluation_service
+import task_one.fake_scorers
+import task_one.tests.helpers
+
+
+def get_service(latency: float = 0.0, max_in_flight: int = 8, score_fn=task_one.tests.helpers.alternating):
+    service = task_one.async_evaluation_service.AsyncEvaluationService(max_in_flight=max_in_flight)
+    service.scorer = task_one.fake_scorers.AsyncLatencyScorer(latency, score_fn)
+    return service
+
+
+def test_partitions_in_input_order():
+    reqs = task_one.tests.helpers.gen_http_requests(20)
+    evaluation = asyncio.run(get_service().evaluate(reqs))
+
+    assert evaluation.typical_requests == reqs[0::2]
+    assert evaluation.anomalous_requests == reqs[1::2]
+
+
+def test_empty_list():
+    evaluation = asyncio.run(get_service().evaluate([]))
+    assert evaluation.typical_requests == []
+    assert evaluation.anomalous_requests == []
+
+
+def test_concurrency_gain():
+    """
+    With a 20ms fake scorer, 40 requests would take at least 800ms one at a time - at 8 in flight it
+    should take roughly a tenth of that
+    """
+    service = get_service(latency=0.02, max_in_flight=8)
+
+    start = time.perf_counter()
+    evaluation = asyncio.run(service.evaluate(task_one.tests.helpers.gen_http_requests(40)))
+    elapsed = time.perf_counter() - start
+
+    assert len(evaluation.typical_requests) + len(evaluation.anomalous_requests) == 40
+    assert elapsed < 0.4, f"40 requests took {elapsed:.3f}s, expected them to overlap"
+
+
+@pytest.mark.parametrize('obj', ['abc', {}, decimal.Decimal])
+def test_unrecognized_objects_raises_type_error(obj: typing.Any):
+    with pytest.raises(TypeError):
+        asyncio.run(get_service().evaluate(task_one.tests.helpers.gen_http_requests() + [obj]))
+
+
+@pytest.mark.parametrize('score', [None, 'foo'])
+def test_unrecognized_scores_raises_type_error(score: typing.Any):
+    service = get_service(score_fn=lambda *x: score)
+    with pytest.raises(TypeError):
+        asyncio.run(service.evaluate(task_one.tests.helpers.gen_http_requests()))
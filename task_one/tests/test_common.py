@@ -0,0 +1,18 @@
+import requests
+
+import task_one.common
+
+
+def test_from_requests_shares_fields():
+    body = {'a': [1, 2]}
+    request = requests.Request('POST', 'https://test-post-request/0', json=body)
+    adapted = task_one.common.Request.from_requests(request)
+
+    assert adapted == ('https://test-post-request/0', 'POST', body)
+    assert adapted.body is body
+
+
+def test_from_dict():
+    adapted = task_one.common.Request.from_dict({'path': '/a', 'method': 'PUT', 'body': {'x': 1}})
+    assert adapted == ('/a', 'PUT', {'x': 1})
+    assert task_one.common.Request.from_dict({'path': '/a', 'method': 'GET'}).body == ''
@@ -0,0 +1,159 @@
+import decimal
+import queue
+import threading
+import time
+
+import pytest
+
+import task_one.concurrency
+import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.resilience
+import task_one.tests.helpers
+
+
+def complete(limit: task_one.concurrency.AdaptiveLimit, latency: float, failed: bool = False, times: int = 1):
+    for _ in range(times):
+        assert limit.acquire(timeout=0)
+        limit.release(latency, failed)
+
+
+def test_limit_grows_while_latency_holds():
+    limit = task_one.concurrency.AdaptiveLimit(initial=2, maximum=10)
+    complete(limit, 0.01, times=2)
+    assert limit.limit == 2  # +1/limit per call: one more for every limit's worth of good calls
+
+    complete(limit, 0.01, times=200)
+    assert limit.limit == 10
+
+
+def test_limit_backs_off_on_failures_and_slow_calls():
+    limit = task_one.concurrency.AdaptiveLimit(initial=8, maximum=8, backoff=0.5)
+    complete(limit, 0.01, times=8)
+
+    complete(limit, 0.05)
+    assert limit.limit == 4
+
+    # the rest of the same burst doesn't count again
+    complete(limit, 0.05, times=3)
+    assert limit.limit == 4
+
+    # the fourth call since the last decrease starts a new window
+    complete(limit, 0.01, failed=True)
+    assert limit.limit == 2
+    assert limit.decreases == 2
+
+    complete(limit, 0.01, failed=True, times=100)
+    assert limit.limit == 1
+
+
+def test_baseline_drifts_up_to_a_slower_normal():
+    limit = task_one.concurrency.AdaptiveLimit(initial=1, maximum=1, drift=0.1)
+    complete(limit, 0.01)
+    complete(limit, 0.015, times=100)
+    assert limit.baseline == pytest.approx(0.015, rel=0.01)
+    complete(limit, 0.001)
+    assert limit.baseline == 0.001
+
+
+def test_acquire_waits_for_a_free_slot():
+    limit = task_one.concurrency.AdaptiveLimit(initial=1, maximum=1)
+    assert limit.acquire(timeout=0)
+    assert not limit.acquire(timeout=0.01)
+
+    limit.release()
+    assert limit.acquire(timeout=0)
+    assert limit.baseline is None  # releasing without a latency doesn't count as a sample
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        task_one.concurrency.AdaptiveLimit(initial=10, maximum=5)
+    with pytest.raises(ValueError):
+        task_one.concurrency.AdaptiveLimit(backoff=1.5)
+
+
+def test_request_queue_pushes_back():
+    feed = task_one.concurrency.RequestQueue(maxsize=2)
+    feed.put(1)
+    feed.put(2)
+    with pytest.raises(queue.Full):
+        feed.put(3, timeout=0.01)
+
+    consumed = []
+    consumer = threading.Thread(target=lambda: consumed.extend(feed))
+    consumer.start()
+    feed.put(3)
+    feed.close()
+    consumer.join(5)
+
+    assert consumed == [1, 2, 3]
+    assert list(feed) == []
+
+
+@pytest.mark.parametrize('batch_size', [1, 3])
+def test_adaptive_service_preserves_order(batch_size: int):
+    def score(path, method, body) -> decimal.Decimal:
+        return decimal.Decimal(1 if int(path.rsplit('/', 1)[1]) % 3 else -1)
+
+    scorer = task_one.fake_scorers.CapacityScorer(capacity=4, latency=0.001, score_fn=score)
+    limit = task_one.concurrency.AdaptiveLimit(initial=1, maximum=8)
+    service = task_one.evaluation_service.EvaluationService(batch_size=batch_size, concurrency=limit)
+    service.scorer = scorer
+
+    requests = task_one.tests.helpers.gen_requests(60)
+    evaluation = service.evaluate(requests)
+
+    assert evaluation.anomalous_requests == requests[::3]
+    assert len(evaluation.typical_requests) == 40
+    assert limit.in_flight == 0
+    assert limit.limit > 1
+
+
+def test_resilience_pool_keeps_up_with_the_limit():
+    """With a call_timeout every call runs on the ResilientScorer's own pool, which mustn't cap the limit"""
+    limit = task_one.concurrency.AdaptiveLimit(initial=16, maximum=16)
+    service = task_one.evaluation_service.EvaluationService(
+        batch_size=1, concurrency=limit, resilience=task_one.resilience.ResiliencePolicy(call_timeout=1.0),
+    )
+
+    lock = threading.Lock()
+    counts = {'current': 0, 'peak': 0}
+
+    def slow(path, method, body) -> decimal.Decimal:
+        with lock:
+            counts['current'] += 1
+            counts['peak'] = max(counts['peak'], counts['current'])
+        time.sleep(0.02)
+        with lock:
+            counts['current'] -= 1
+        return decimal.Decimal(1)
+
+    service.scorer = task_one.fake_scorers.LatencyScorer(0, slow)
+    evaluation = service.evaluate(task_one.tests.helpers.gen_requests(64))
+
+    assert len(evaluation.typical_requests) == 64
+    assert counts['peak'] > 8
+
+
+def test_abandoned_stream_gives_back_its_slots():
+    limit = task_one.concurrency.AdaptiveLimit(initial=4, maximum=4)
+    service = task_one.evaluation_service.EvaluationService(batch_size=1, concurrency=limit)
+    service.scorer = task_one.fake_scorers.CapacityScorer(capacity=1, latency=0.005)
+
+    results = service.evaluate_iter(task_one.tests.helpers.gen_requests(20))
+    next(results)
+    results.close()
+
+    assert limit.in_flight == 0
+
+
+def test_capacity_scorer_rejects_when_overloaded():
+    scorer = task_one.fake_scorers.CapacityScorer(capacity=0, max_queue_time=0.01)
+    with pytest.raises(ConnectionError):
+        scorer.evaluate('/', 'GET', '')
+    assert scorer.rejected == 1
+
+    scorer.set_capacity(1)
+    assert scorer.evaluate('/', 'GET', '') == 1
+    assert scorer.served == 1
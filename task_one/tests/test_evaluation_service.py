@@ -1,11 +1,22 @@
 import pytest
 import requests
 import decimal
+import itertools
+import json
 import typing
+import threading
+import time
+import unittest.mock
 
 import hypothesis
 
+import task_one.common
 import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.instrumentation
+import task_one.resilience
+import task_one.score_cache
+import task_one.scorer_http_client
 
 
 @pytest.fixture()
@@ -138,3 +149,431 @@ def test_unrecognized_scores_raises_type_error(monkeypatch: typing.Any, score: t
     monkeypatch.setattr(service.scorer, 'evaluate', (lambda *x, **y: score))
     with pytest.raises(TypeError):
         service.evaluate([requests.Request('GET', 'https://test-get-request/0')])
+
+
+@pytest.mark.parametrize('max_in_flight', [2, 4, 16])
+@pytest.mark.parametrize('batch_size', [1, 3])
+def test_concurrent_scoring_preserves_order(max_in_flight: int, batch_size: int, monkeypatch: typing.Any):
+    """
+    Scores come back out of order when the scorer is called concurrently, make sure the partitioned lists
+    still follow the input order
+    """
+    n_requests = 50
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight, batch_size=batch_size)
+
+    def jittery(path, method, body):
+        """Later requests return sooner, and odd-numbered requests are anomalous"""
+        i = int(path.rsplit('/', 1)[-1])
+        time.sleep((n_requests - i) * 1e-4)
+        return decimal.Decimal(-1) if i % 2 else decimal.Decimal(1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', jittery)
+
+    reqs = [requests.Request('GET', f'https://test-get-request/{i}') for i in range(n_requests)]
+    evaluation = service.evaluate(reqs)
+
+    assert evaluation.typical_requests == reqs[0::2]
+    assert evaluation.anomalous_requests == reqs[1::2]
+
+
+def test_concurrent_scoring_respects_max_in_flight(monkeypatch: typing.Any):
+    """The scorer should see more than one call at a time, but never more than max_in_flight"""
+    max_in_flight = 4
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight, batch_size=1)
+
+    lock = threading.Lock()
+    counts = {'current': 0, 'peak': 0}
+
+    def slow(*args, **kwargs):
+        with lock:
+            counts['current'] += 1
+            counts['peak'] = max(counts['peak'], counts['current'])
+        time.sleep(0.01)
+        with lock:
+            counts['current'] -= 1
+        return decimal.Decimal(1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', slow)
+    evaluation = service.evaluate([requests.Request('GET', f'https://test-get-request/{i}') for i in range(20)])
+
+    assert len(evaluation.typical_requests) == 20
+    assert 1 < counts['peak'] <= max_in_flight
+
+
+def test_default_batch_size_keeps_single_item_scorers_concurrent(monkeypatch: typing.Any):
+    """
+    A scorer without a batch call of its own is still called max_in_flight requests at a time, rather than one
+    request after another within a chunk of the default batch size
+    """
+    max_in_flight = 4
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight)
+
+    lock = threading.Lock()
+    counts = {'current': 0, 'peak': 0, 'calls': 0}
+
+    def slow(*args, **kwargs):
+        with lock:
+            counts['calls'] += 1
+            counts['current'] += 1
+            counts['peak'] = max(counts['peak'], counts['current'])
+        time.sleep(0.01)
+        with lock:
+            counts['current'] -= 1
+        return decimal.Decimal(1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', slow)
+    evaluation = service.evaluate([requests.Request('GET', f'https://test-get-request/{i}') for i in range(20)])
+
+    assert len(evaluation.typical_requests) == 20
+    assert counts['calls'] == 20
+    assert 1 < counts['peak'] <= max_in_flight
+
+
+def test_scorers_with_a_batch_call_still_get_batches(monkeypatch: typing.Any):
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=4, batch_size=5)
+    batches = []
+    lock = threading.Lock()
+
+    def evaluate_batch(reqs):
+        with lock:
+            batches.append(len(reqs))
+        return [decimal.Decimal(1) for _ in reqs]
+
+    monkeypatch.setattr(service.scorer, 'evaluate_batch', evaluate_batch)
+    service.evaluate([requests.Request('GET', f'https://test-get-request/{i}') for i in range(20)])
+
+    assert batches == [5] * 4
+
+
+def test_has_batch_call():
+    class Batching(task_one.scorer_http_client.ScorerHttpClient):
+        def evaluate_batch(self, requests):
+            return []
+
+    assert not task_one.scorer_http_client.has_batch_call(task_one.scorer_http_client.ScorerHttpClient())
+    assert task_one.scorer_http_client.has_batch_call(Batching())
+    assert not task_one.scorer_http_client.has_batch_call(object())
+    assert task_one.scorer_http_client.has_batch_call(Batching()) is True
+
+    # wrappers answer for the scorer they wrap
+    assert task_one.scorer_http_client.has_batch_call(task_one.resilience.ResilientScorer(Batching()))
+    assert not task_one.scorer_http_client.has_batch_call(
+        task_one.resilience.ResilientScorer(task_one.scorer_http_client.ScorerHttpClient())
+    )
+
+
+@pytest.mark.parametrize('make_scorer', [
+    lambda: unittest.mock.create_autospec(task_one.scorer_http_client.ScorerHttpClient, instance=True),
+    unittest.mock.Mock,
+])
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_mock_scorers_are_called_one_request_at_a_time(
+        make_scorer: typing.Callable[[], typing.Any], max_in_flight: int, get_requests: typing.List[requests.Request]
+):
+    """A mock scorer which only sets up evaluate shouldn't be taken for one with a batch call"""
+    scorer = make_scorer()
+    scorer.evaluate.side_effect = lambda path, method, body: decimal.Decimal(not path.endswith('3'))
+    assert task_one.scorer_http_client.has_batch_call(scorer) is False
+
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight)
+    service.scorer = scorer
+    evaluation = service.evaluate(get_requests)
+
+    assert (len(evaluation.typical_requests), len(evaluation.anomalous_requests)) == (9, 1)
+    assert scorer.evaluate.call_count == len(get_requests)
+
+
+@pytest.mark.parametrize('obj', ['abc', {}, decimal.Decimal])
+def test_concurrent_unrecognized_objects_raises_type_error(
+        obj: typing.Any, get_requests: typing.List[requests.Request], monkeypatch: typing.Any,
+):
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=4)
+    monkeypatch.setattr(service.scorer, 'evaluate', (lambda *x, **y: decimal.Decimal(1)))
+    with pytest.raises(TypeError):
+        service.evaluate(get_requests + [obj] + get_requests)
+
+
+@pytest.mark.parametrize('score', [None, 'foo'])
+def test_concurrent_unrecognized_scores_raises_type_error(
+        monkeypatch: typing.Any, score: typing.Any, get_requests: typing.List[requests.Request],
+):
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=4)
+    monkeypatch.setattr(service.scorer, 'evaluate', (lambda *x, **y: score))
+    with pytest.raises(TypeError):
+        service.evaluate(get_requests)
+
+
+def test_invalid_max_in_flight():
+    with pytest.raises(ValueError):
+        task_one.evaluation_service.EvaluationService(max_in_flight=0)
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 10, 100])
+def test_batches_are_chunked(batch_size: int, monkeypatch: typing.Any):
+    """Requests should reach evaluate_batch in order, in chunks no bigger than batch_size"""
+    n_requests = 25
+    service = task_one.evaluation_service.EvaluationService(batch_size=batch_size)
+    batches = []
+
+    def evaluate_batch(reqs):
+        batches.append(reqs)
+        return [decimal.Decimal(1) for _ in reqs]
+
+    monkeypatch.setattr(service.scorer, 'evaluate_batch', evaluate_batch)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x: evaluate_batch([x])[0])
+
+    reqs = [requests.Request('POST', f'https://test-post-request/{i}', json={'i': i}) for i in range(n_requests)]
+    evaluation = service.evaluate(reqs)
+
+    assert evaluation.typical_requests == reqs
+    assert len(batches) == -(-n_requests // batch_size)
+    assert all(len(batch) <= batch_size for batch in batches)
+    assert [tuple(r) for batch in batches for r in batch] == [(r.url, r.method, r.json) for r in reqs]
+
+
+def test_scorer_without_batch_call_falls_back_to_evaluate(get_requests: typing.List[requests.Request]):
+    """A scorer which only offers the single-item call should still work when batching is enabled"""
+
+    class SingleItemScorer:
+        def evaluate(self, path, method, body):
+            return decimal.Decimal(1)
+
+    service = task_one.evaluation_service.EvaluationService(batch_size=4)
+    service.scorer = SingleItemScorer()
+    evaluation = service.evaluate(get_requests)
+
+    assert evaluation.typical_requests == get_requests
+
+
+def test_batch_with_wrong_number_of_scores_raises(
+        monkeypatch: typing.Any, get_requests: typing.List[requests.Request],
+):
+    service = task_one.evaluation_service.EvaluationService(batch_size=4)
+    monkeypatch.setattr(service.scorer, 'evaluate_batch', lambda reqs: [decimal.Decimal(1)])
+    with pytest.raises(ValueError):
+        service.evaluate(get_requests)
+
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        task_one.evaluation_service.EvaluationService(batch_size=0)
+
+
+def test_cache_skips_scorer_for_repeated_requests(monkeypatch: typing.Any):
+    cache = task_one.score_cache.ScoreCache()
+    service = task_one.evaluation_service.EvaluationService(batch_size=2, cache=cache)
+    scored = []
+
+    def record(path, method, body):
+        scored.append(path)
+        return decimal.Decimal(1) if body is None else decimal.Decimal(-1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', record)
+
+    reqs = [requests.Request('GET', f'https://test-get-request/{i % 3}') for i in range(9)]
+    reqs.append(requests.Request('POST', 'https://test-get-request/0', json={'a': 1, 'b': 2}))
+    first = service.evaluate(reqs)
+    second = service.evaluate(reqs + [requests.Request('POST', 'https://test-get-request/0', json={'b': 2, 'a': 1})])
+
+    assert first.typical_requests == reqs[:9]
+    assert len(second.anomalous_requests) == 2
+    assert sorted(scored) == [f'https://test-get-request/{i}' for i in [0, 0, 1, 2]]
+    assert cache.stats.misses == len(scored)
+    assert cache.stats.hits == 21 - len(scored)
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_evaluate_iter_is_lazy(max_in_flight: int, monkeypatch: typing.Any):
+    """evaluate_iter should work on an endless stream, only reading as far ahead as it needs to"""
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight, batch_size=5)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]) - 5)
+
+    consumed = []
+
+    def endless():
+        for i in itertools.count():
+            consumed.append(i)
+            yield requests.Request('GET', f'https://test-get-request/{i}')
+
+    results = list(itertools.islice(service.evaluate_iter(endless()), 12))
+
+    assert [r.url for r, _, _ in results] == [f'https://test-get-request/{i}' for i in range(12)]
+    assert [is_anomalous for _, _, is_anomalous in results] == [int(str(i)[-1]) <= 5 for i in range(12)]
+    # whole batches are read, and up to max_in_flight batches can be in flight behind the one being consumed
+    assert len(consumed) <= 15 + max_in_flight * 5
+
+
+def test_evaluate_into_sink(monkeypatch: typing.Any, get_requests: typing.List[requests.Request]):
+    service = task_one.evaluation_service.EvaluationService()
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: decimal.Decimal(0))
+    received = []
+
+    count = service.evaluate_into(iter(get_requests), lambda *result: received.append(result))
+
+    assert count == len(get_requests)
+    assert received == [(r, decimal.Decimal(0), True) for r in get_requests]
+
+
+def test_evaluate_compact(monkeypatch: typing.Any):
+    """The compact evaluation's views should look just like the lists on a normal Evaluation"""
+    service = task_one.evaluation_service.EvaluationService(batch_size=3)
+    monkeypatch.setattr(
+        service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(int(path.rsplit('/', 1)[-1]) % 3 - 1)
+    )
+
+    reqs = [requests.Request('GET', f'https://test-get-request/{i}') for i in range(20)]
+    evaluation = service.evaluate(reqs)
+    compact = service.evaluate_compact(reqs, keep_scores=True)
+
+    assert compact.typical_requests == evaluation.typical_requests
+    assert compact.anomalous_requests == evaluation.anomalous_requests
+    assert list(compact.anomalous_requests) == evaluation.anomalous_requests
+    assert len(compact.typical_requests) == len(evaluation.typical_requests)
+    assert compact.typical_requests[-1] is evaluation.typical_requests[-1]
+    assert compact.anomalous_requests[1:3] == evaluation.anomalous_requests[1:3]
+    assert [compact.is_anomalous(i) for i in range(len(reqs))] == [i % 3 < 2 for i in range(len(reqs))]
+    assert list(compact.scores) == [i % 3 - 1 for i in range(len(reqs))]
+    assert compact.requests is reqs
+    assert len(compact.anomalous_flags) == 3
+
+
+def test_evaluate_compact_empty():
+    evaluation = task_one.evaluation_service.EvaluationService().evaluate_compact(iter([]))
+    assert evaluation.typical_requests == []
+    assert evaluation.anomalous_requests == []
+    assert len(evaluation) == 0
+
+
+def test_evaluate_compact_drops_scores_by_default(get_requests: typing.List[requests.Request], monkeypatch: typing.Any):
+    service = task_one.evaluation_service.EvaluationService()
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: decimal.Decimal(1))
+    evaluation = service.evaluate_compact(get_requests)
+
+    assert evaluation.scores is None
+    assert evaluation.typical_requests == get_requests
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_common_requests_are_accepted(max_in_flight: int, monkeypatch: typing.Any):
+    """Lightweight common.Request tuples, and mixtures of them with requests.Request, should evaluate the same"""
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=max_in_flight, batch_size=3)
+    seen = []
+
+    def record(path, method, body):
+        seen.append((path, method, body))
+        return decimal.Decimal(1) if method == 'GET' else decimal.Decimal(-1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', record)
+
+    reqs = [
+        task_one.common.Request('https://test-request/0', 'GET', ''),
+        task_one.common.Request.from_dict({'path': 'https://test-request/1', 'method': 'POST', 'body': {'a': 1}}),
+        requests.Request('GET', 'https://test-request/2'),
+        task_one.common.Request('https://test-request/3', 'DELETE', ''),
+    ]
+    evaluation = service.evaluate(reqs)
+
+    assert evaluation.typical_requests == [reqs[0], reqs[2]]
+    assert evaluation.anomalous_requests == [reqs[1], reqs[3]]
+    expected = [tuple(reqs[0]), tuple(reqs[1]), ('https://test-request/2', 'GET', None), tuple(reqs[3])]
+    assert sorted(seen, key=str) == sorted(expected, key=str)
+
+
+def test_homogeneous_common_requests_are_not_copied():
+    reqs = [task_one.common.Request(f'https://test-request/{i}', 'GET', '') for i in range(3)]
+    assert task_one.evaluation_service.as_common_requests(reqs) is reqs
+
+
+@pytest.mark.parametrize('obj', ['abc', {}, ('https://test-request/0', 'GET', '')])
+def test_unrecognized_objects_in_common_batch_raise_type_error(obj: typing.Any):
+    reqs = [task_one.common.Request(f'https://test-request/{i}', 'GET', '') for i in range(3)]
+    with pytest.raises(TypeError):
+        task_one.evaluation_service.EvaluationService().evaluate(reqs + [obj])
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+@pytest.mark.parametrize('batch_size', [1, 3])
+def test_duplicates_are_scored_once(max_in_flight: int, batch_size: int, monkeypatch: typing.Any):
+    service = task_one.evaluation_service.EvaluationService(
+        max_in_flight=max_in_flight, batch_size=batch_size, dedup=True,
+    )
+    calls = []
+    lock = threading.Lock()
+
+    def record(path, method, body):
+        with lock:
+            calls.append((path, method, json.dumps(body, sort_keys=True)))
+        return decimal.Decimal(int(path[-1]) - 1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', record)
+
+    # body key order doesn't matter, but the method does
+    reqs = [
+        task_one.common.Request('https://test-request/0', 'POST', {'a': 1, 'b': 2}),
+        task_one.common.Request('https://test-request/2', 'GET', None),
+        task_one.common.Request('https://test-request/0', 'POST', {'b': 2, 'a': 1}),
+        task_one.common.Request('https://test-request/2', 'GET', None),
+        task_one.common.Request('https://test-request/2', 'PUT', None),
+        task_one.common.Request('https://test-request/0', 'POST', {'a': 1, 'b': 2}),
+    ]
+    results = list(service.evaluate_iter(reqs))
+
+    assert [request for request, _, _ in results] == reqs
+    assert [score for _, score, _ in results] == [decimal.Decimal(n) for n in (-1, 1, -1, 1, 1, -1)]
+    assert [is_anomalous for _, _, is_anomalous in results] == [True, False, True, False, False, True]
+
+    # chunks in flight at the same time may each score a copy, but nothing is scored twice one chunk at a time
+    if max_in_flight == 1:
+        assert len(calls) == 3
+    assert len(set(calls)) == 3
+    assert service.dedup_stats.requests == 6
+    assert service.dedup_stats.unique == len(calls)
+
+
+def test_dedup_ratio_is_reported(get_requests: typing.List[requests.Request], monkeypatch: typing.Any):
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_one.evaluation_service.EvaluationService(batch_size=5, dedup=True, instrumentation=recorder)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: decimal.Decimal(1))
+
+    # ten distinct requests, each sent four times
+    evaluation = service.evaluate(get_requests * 4)
+
+    assert len(evaluation.typical_requests) == 40
+    assert service.dedup_stats == (40, 10)
+    assert service.dedup_stats.ratio == 0.75
+    snapshot = recorder.snapshot()
+    assert (snapshot.dedup_requests, snapshot.dedup_unique, snapshot.scorer_requests) == (40, 10, 10)
+    assert snapshot.dedup_ratio == 0.75
+
+
+def test_dedup_off_scores_every_copy(get_requests: typing.List[requests.Request], monkeypatch: typing.Any):
+    service = task_one.evaluation_service.EvaluationService()
+    calls = []
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: calls.append(x) or decimal.Decimal(1))
+
+    service.evaluate(get_requests * 2)
+
+    assert len(calls) == 20
+    assert service.dedup_stats.ratio == 0.0
+
+
+def test_unscored_duplicates_are_retried(monkeypatch: typing.Any):
+    service = task_one.evaluation_service.EvaluationService(
+        batch_size=1, dedup=True, resilience=task_one.resilience.ResiliencePolicy(), unscored='separate',
+    )
+    outcomes = iter([ConnectionError("scorer down"), decimal.Decimal(1)])
+
+    def flaky(path, method, body):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    service.scorer = task_one.fake_scorers.LatencyScorer(0, flaky)
+    request = task_one.common.Request('https://test-request/0', 'GET', None)
+
+    evaluation = service.evaluate([request] * 3)
+
+    # the first copy goes unscored, the second gets through, and the third reuses its score
+    assert evaluation.unscored_requests == [request]
+    assert evaluation.typical_requests == [request] * 2
@@ -0,0 +1,127 @@
+import typing
+
+import pytest
+import requests
+
+import task_one.evaluation_service
+import task_one.instrumentation
+import task_one.score_cache
+import task_one.tests.helpers
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_metrics_snapshot(max_in_flight: int, monkeypatch: typing.Any):
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_one.evaluation_service.EvaluationService(
+        max_in_flight=max_in_flight, batch_size=3, instrumentation=recorder,
+    )
+    monkeypatch.setattr(service.scorer, 'evaluate', task_one.tests.helpers.alternating)
+    monkeypatch.setattr(
+        service.scorer, 'evaluate_batch', lambda requests: [task_one.tests.helpers.alternating(*r) for r in requests],
+    )
+
+    service.evaluate(task_one.tests.helpers.gen_requests(10))
+    snapshot = recorder.snapshot()
+
+    assert snapshot.batches == 1
+    assert snapshot.requests == 10
+    assert (snapshot.typical, snapshot.anomalous) == (5, 5)
+    assert snapshot.errors == {}
+
+    # 10 requests in batches of 3
+    assert snapshot.scorer_calls == 4
+    assert snapshot.scorer_requests == 10
+    assert snapshot.mean_scorer_batch == 2.5
+    assert sum(snapshot.scorer_latency.counts) == 4
+    assert sum(snapshot.request_latency.counts) == 10
+
+    assert snapshot.batch_seconds > 0
+    assert snapshot.cache is None
+
+
+def test_cache_stats_are_included(monkeypatch: typing.Any):
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_one.evaluation_service.EvaluationService(
+        batch_size=4, cache=task_one.score_cache.ScoreCache(), instrumentation=recorder,
+    )
+    monkeypatch.setattr(service.scorer, 'evaluate', task_one.tests.helpers.alternating)
+
+    service.evaluate(task_one.tests.helpers.gen_requests(4) * 2)
+    snapshot = recorder.snapshot()
+
+    assert snapshot.cache.misses == 4
+    assert snapshot.cache.hits == 4
+    assert snapshot.scorer_requests == 4
+    assert snapshot.requests == 8
+
+
+def test_errors_are_counted_by_type(monkeypatch: typing.Any):
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_one.evaluation_service.EvaluationService(instrumentation=recorder)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: 'not a score')
+
+    with pytest.raises(TypeError):
+        service.evaluate(task_one.tests.helpers.gen_requests(2))
+
+    with pytest.raises(TypeError):
+        service.evaluate(['not a request'])
+
+    snapshot = recorder.snapshot()
+    assert snapshot.errors == {'TypeError': 2}
+    assert snapshot.batches == 0
+
+
+def test_on_batch_callback(monkeypatch: typing.Any):
+    snapshots = []
+    recorder = task_one.instrumentation.MetricsRecorder(on_batch=snapshots.append)
+    service = task_one.evaluation_service.EvaluationService(instrumentation=recorder)
+    monkeypatch.setattr(service.scorer, 'evaluate', task_one.tests.helpers.alternating)
+
+    service.evaluate(task_one.tests.helpers.gen_requests(4))
+    service.evaluate(task_one.tests.helpers.gen_requests(6))
+
+    assert [snapshot.requests for snapshot in snapshots] == [4, 10]
+    assert [snapshot.batches for snapshot in snapshots] == [1, 2]
+
+    recorder.reset()
+    assert recorder.snapshot().requests == 0
+
+
+def test_custom_instrumentation_hooks(monkeypatch: typing.Any):
+    class Recording(task_one.instrumentation.Instrumentation):
+        def __init__(self):
+            self.calls = []
+
+        def attach(self, service):
+            self.calls.append('attach')
+
+        def validated(self, requests, seconds):
+            self.calls.append(('validated', requests))
+
+        def scorer_called(self, requests, seconds):
+            self.calls.append(('scorer_called', requests))
+
+        def batch_finished(self, requests, seconds):
+            self.calls.append(('batch_finished', requests))
+
+    instrumentation = Recording()
+    service = task_one.evaluation_service.EvaluationService(batch_size=2, instrumentation=instrumentation)
+    monkeypatch.setattr(service.scorer, 'evaluate', task_one.tests.helpers.alternating)
+
+    service.evaluate([requests.Request('GET', f'https://test-request/{i}') for i in range(3)])
+
+    assert instrumentation.calls == [
+        'attach',
+        ('validated', 2), ('scorer_called', 2),
+        ('validated', 1), ('scorer_called', 1),
+        ('batch_finished', 3),
+    ]
+
+
+def test_histogram_quantile():
+    histogram = task_one.instrumentation.Histogram((0.1, 1.0, float('inf')), (8, 1, 1))
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.9) == 1.0
+    assert histogram.quantile(0.99) == float('inf')
+    assert task_one.instrumentation.Histogram((1.0,), (0,)).quantile(0.5) != \
+        task_one.instrumentation.Histogram((1.0,), (0,)).quantile(0.5)  # NaN
@@ -0,0 +1,82 @@
+import decimal
+import typing
+
+import pytest
+import requests
+
+import task_one.common
+import task_one.evaluation_service
+import task_one.fake_scorer_server
+import task_one.pooled_scorer_http_client
+
+
+def by_last_digit(path: str, method: str, body: typing.Any) -> decimal.Decimal:
+    """Scores with more precision than a float can hold, so any trip through float would show"""
+    return decimal.Decimal(path[-1]) - decimal.Decimal('4.99999999999999999999999')
+
+
+@pytest.fixture()
+def server():
+    with task_one.fake_scorer_server.FakeScorerServer(by_last_digit) as server:
+        yield server
+
+
+def test_evaluate_keeps_decimal_precision(server: task_one.fake_scorer_server.FakeScorerServer):
+    client = task_one.pooled_scorer_http_client.PooledScorerHttpClient(server.url)
+    score = client.evaluate('https://test-request/7', 'POST', {'a': [1, 2.5]})
+
+    assert score == decimal.Decimal('2.00000000000000000000001')
+    client.close()
+
+
+def test_evaluate_batch(server: task_one.fake_scorer_server.FakeScorerServer):
+    client = task_one.pooled_scorer_http_client.PooledScorerHttpClient(server.url)
+    reqs = [task_one.common.Request(f'https://test-request/{i}', 'GET', '') for i in range(10)]
+
+    assert client.evaluate_batch(reqs) == [by_last_digit(*r) for r in reqs]
+    assert server.requests == 1
+    client.close()
+
+
+def test_connections_are_reused_across_threads(server: task_one.fake_scorer_server.FakeScorerServer):
+    """A concurrent service sharing one client should only ever open up to pool_size connections"""
+    client = task_one.pooled_scorer_http_client.PooledScorerHttpClient(server.url, pool_size=4)
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=4, batch_size=1)
+    service.scorer = client
+
+    reqs = [requests.Request('GET', f'https://test-request/{i}') for i in range(100)]
+    evaluation = service.evaluate(reqs)
+
+    assert evaluation.typical_requests == [r for r in reqs if by_last_digit(r.url, '', None) > 0]
+    assert server.requests == 100
+    assert server.connections <= 4
+    client.close()
+
+
+def test_timeout():
+    with task_one.fake_scorer_server.FakeScorerServer(latency=0.5) as server:
+        client = task_one.pooled_scorer_http_client.PooledScorerHttpClient(server.url, timeout=0.05)
+        with pytest.raises(requests.Timeout):
+            client.evaluate('https://test-request/0', 'GET', None)
+        client.close()
+
+
+def test_http_errors_are_raised(server: task_one.fake_scorer_server.FakeScorerServer):
+    client = task_one.pooled_scorer_http_client.PooledScorerHttpClient(server.url + '/missing')
+    with pytest.raises(requests.HTTPError):
+        client.evaluate('https://test-request/0', 'GET', None)
+    client.close()
+
+
+@pytest.mark.parametrize('value, expected', [
+    (decimal.Decimal('1.5'), decimal.Decimal('1.5')),
+    ('-0.100000000000000000000001', decimal.Decimal('-0.100000000000000000000001')),
+])
+def test_parse_score(value: typing.Any, expected: decimal.Decimal):
+    assert task_one.pooled_scorer_http_client.parse_score(value) == expected
+
+
+@pytest.mark.parametrize('value', [None, True, [1]])
+def test_parse_score_rejects_non_numbers(value: typing.Any):
+    with pytest.raises(TypeError):
+        task_one.pooled_scorer_http_client.parse_score(value)
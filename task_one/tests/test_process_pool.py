@@ -0,0 +1,53 @@
+import decimal
+import functools
+
+import pytest
+
+import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.process_pool
+import task_one.scorer_http_client
+import task_one.tests.helpers
+
+
+class BadScorer(task_one.scorer_http_client.ScorerHttpClient):
+    def evaluate(self, path, method, body):
+        return 'foo'
+
+
+@pytest.mark.parametrize('batch_size', [1, 7])
+def test_process_pool_matches_in_process_scoring(batch_size: int):
+    reqs = task_one.tests.helpers.gen_http_requests(50, body=True)
+    factory = functools.partial(task_one.fake_scorers.CpuBoundScorer, 10)
+
+    local = task_one.evaluation_service.EvaluationService(batch_size=batch_size)
+    local.scorer = factory()
+    expected = local.evaluate(reqs)
+
+    with task_one.evaluation_service.EvaluationService(
+            batch_size=batch_size, processes=2, scorer_factory=factory,
+    ) as service:
+        assert service.max_in_flight == 2
+        evaluation = service.evaluate(reqs)
+        # the pool is reused across calls
+        assert service.evaluate(reqs[:5]).typical_requests == [r for r in expected.typical_requests if r in reqs[:5]]
+
+    assert evaluation.typical_requests == expected.typical_requests
+    assert evaluation.anomalous_requests == expected.anomalous_requests
+
+
+def test_bad_scores_raise_type_error_from_workers():
+    with task_one.evaluation_service.EvaluationService(processes=1, scorer_factory=BadScorer) as service:
+        with pytest.raises(TypeError):
+            service.evaluate(task_one.tests.helpers.gen_http_requests(3, body=True))
+
+
+def test_processes_need_a_scorer_factory():
+    with pytest.raises(ValueError):
+        task_one.evaluation_service.EvaluationService(processes=2)
+
+
+def test_pack_scores_round_trips_exactly():
+    scores = [decimal.Decimal('1E-40'), decimal.Decimal('-0'), decimal.Decimal('123.4500'), decimal.Decimal(-7)]
+    unpacked = task_one.process_pool.unpack_scores(task_one.process_pool.pack_scores(scores))
+    assert [s.as_tuple() for s in unpacked] == [s.as_tuple() for s in scores]
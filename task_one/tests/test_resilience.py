@@ -0,0 +1,180 @@
+import decimal
+import threading
+import time
+import typing
+
+import pytest
+
+import task_one.evaluation_service
+import task_one.resilience
+import task_one.tests.helpers
+
+
+class FlakyScorer:
+    """Scores 1 unless told to fail or stall; counts how often it is called"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+        self.stall: typing.Optional[threading.Event] = None
+        self._lock = threading.Lock()
+
+    def evaluate(self, path, method, body) -> decimal.Decimal:
+        with self._lock:
+            self.calls += 1
+            stall, self.stall = self.stall, None  # only the one call stalls, so a hedge gets through
+
+        if stall is not None:
+            stall.wait(5)
+
+        if self.fail:
+            raise ConnectionError("scorer down")
+
+        return decimal.Decimal(1)
+
+
+def test_circuit_breaker_opens_and_recovers():
+    clock = task_one.tests.helpers.FakeClock()
+    inner = FlakyScorer()
+    scorer = task_one.resilience.ResilientScorer(
+        inner, task_one.resilience.ResiliencePolicy(failure_threshold=3, reset_after=10), clock=clock,
+    )
+
+    inner.fail = True
+    for _ in range(3):
+        with pytest.raises(task_one.resilience.ScorerUnavailable) as raised:
+            scorer.evaluate('/', 'GET', '')
+        assert isinstance(raised.value.__cause__, ConnectionError)
+
+    assert scorer.breaker.state == 'open'
+
+    # fails fast, without bothering the scorer
+    with pytest.raises(task_one.resilience.CircuitOpen):
+        scorer.evaluate('/', 'GET', '')
+    assert inner.calls == 3
+
+    # a failed trial call opens the circuit again
+    clock.now = 10
+    assert scorer.breaker.state == 'half-open'
+    with pytest.raises(task_one.resilience.ScorerUnavailable):
+        scorer.evaluate('/', 'GET', '')
+    assert scorer.breaker.state == 'open'
+
+    clock.now = 20
+    inner.fail = False
+    assert scorer.evaluate('/', 'GET', '') == 1
+    assert scorer.breaker.state == 'closed'
+
+
+def test_call_timeout():
+    inner = FlakyScorer()
+    stall = inner.stall = threading.Event()
+    scorer = task_one.resilience.ResilientScorer(inner, task_one.resilience.ResiliencePolicy(call_timeout=0.05))
+
+    started = time.monotonic()
+    with pytest.raises(task_one.resilience.ScorerTimeout):
+        scorer.evaluate('/', 'GET', '')
+    assert time.monotonic() - started < 1
+
+    stall.set()
+    scorer.close()
+
+
+def test_hedged_call_beats_straggler():
+    inner = FlakyScorer()
+    scorer = task_one.resilience.ResilientScorer(
+        inner, task_one.resilience.ResiliencePolicy(hedge_quantile=0.9, hedge_min_samples=5),
+    )
+    for _ in range(5):
+        scorer.evaluate('/', 'GET', '')
+    assert scorer.hedged == 0
+
+    stall = inner.stall = threading.Event()
+    started = time.monotonic()
+    assert scorer.evaluate('/', 'GET', '') == 1
+    assert time.monotonic() - started < 1
+    assert scorer.hedged == 1
+    assert inner.calls == 7
+
+    stall.set()
+    scorer.close()
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_unscored_policies(max_in_flight: int):
+    def make_service(unscored: str) -> task_one.evaluation_service.EvaluationService:
+        service = task_one.evaluation_service.EvaluationService(
+            max_in_flight=max_in_flight,
+            batch_size=2,
+            resilience=task_one.resilience.ResiliencePolicy(failure_threshold=1, reset_after=60),
+            unscored=unscored,
+        )
+        scorer = FlakyScorer()
+        scorer.fail = True
+        service.scorer = scorer
+        return service
+
+    with pytest.raises(task_one.resilience.ScorerUnavailable):
+        make_service('raise').evaluate(task_one.tests.helpers.gen_requests(6))
+
+    evaluation = make_service('anomalous').evaluate(task_one.tests.helpers.gen_requests(6))
+    assert evaluation.anomalous_requests == task_one.tests.helpers.gen_requests(6)
+    assert evaluation.unscored_requests == []
+
+    service = make_service('separate')
+    evaluation = service.evaluate(task_one.tests.helpers.gen_requests(6))
+    assert evaluation.unscored_requests == task_one.tests.helpers.gen_requests(6)
+    assert evaluation.anomalous_requests == evaluation.typical_requests == []
+    assert [score for _, score, _ in service.evaluate_iter(task_one.tests.helpers.gen_requests(2))] == [None, None]
+
+    compact = make_service('separate').evaluate_compact(task_one.tests.helpers.gen_requests(3))
+    assert list(compact.anomalous_requests) == task_one.tests.helpers.gen_requests(3)
+
+
+def test_deadline_abandons_stragglers():
+    service = task_one.evaluation_service.EvaluationService(
+        max_in_flight=4, batch_size=1, deadline=0.1, unscored='separate',
+    )
+    inner = FlakyScorer()
+    stall = inner.stall = threading.Event()
+    service.scorer = inner
+
+    started = time.monotonic()
+    evaluation = service.evaluate(task_one.tests.helpers.gen_requests(4))
+    assert time.monotonic() - started < 1
+
+    assert evaluation.unscored_requests == task_one.tests.helpers.gen_requests(1)
+    assert evaluation.typical_requests == task_one.tests.helpers.gen_requests(4)[1:]
+    stall.set()
+
+
+def test_invalid_unscored_policy():
+    with pytest.raises(ValueError):
+        task_one.evaluation_service.EvaluationService(unscored='ignore')
+
+
+def test_assigned_scorers_are_wrapped():
+    """The resilience policy applies to a scorer swapped in after construction, not just the default stub"""
+    policy = task_one.resilience.ResiliencePolicy(failure_threshold=2, reset_after=60)
+    service = task_one.evaluation_service.EvaluationService(batch_size=1, resilience=policy, unscored='separate')
+    inner = FlakyScorer()
+    inner.fail = True
+    service.scorer = inner
+
+    assert isinstance(service.scorer, task_one.resilience.ResilientScorer)
+    assert service.scorer.scorer is inner
+    assert service.scorer.policy == policy
+
+    evaluation = service.evaluate(task_one.tests.helpers.gen_requests(5))
+    assert evaluation.unscored_requests == task_one.tests.helpers.gen_requests(5)
+    assert inner.calls == 2  # the breaker opened after two failures
+
+    # a scorer which is already wrapped isn't wrapped again
+    wrapped = service.scorer
+    service.scorer = wrapped
+    assert service.scorer is wrapped
+
+    # and without a policy, scorers are used as they are
+    plain = task_one.evaluation_service.EvaluationService()
+    plain.scorer = inner
+    assert plain.scorer is inner
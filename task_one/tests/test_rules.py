@@ -0,0 +1,183 @@
+import decimal
+import typing
+
+import pytest
+
+import task_one.common
+import task_one.evaluation_service
+import task_one.instrumentation
+import task_one.rules
+
+
+@pytest.mark.parametrize('url, path', [
+    ('https://test-request/static/a.css?v=1', '/static/a.css'),
+    ('https://test-request', '/'),
+    ('/api/users#top', '/api/users'),
+    ('/', '/'),
+    ('http://h?x=/static/a', '/'),
+    ('http://h#/static', '/'),
+    ('http://h/api?next=/static/a#/static', '/api'),
+])
+def test_path_of(url: str, path: str):
+    assert task_one.rules.path_of(url) == path
+
+
+def test_longest_prefix_wins():
+    index = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/static/', anomalous=False),
+        task_one.rules.Rule('/static/private/', anomalous=True),
+        task_one.rules.Rule('/static/private/', anomalous=False, method='GET'),
+        task_one.rules.Rule('/admin', anomalous=True, method='delete'),
+    ])
+    assert len(index) == 4
+
+    assert index.lookup('POST', 'https://host/static/img.png').prefix == '/static/'
+    assert index.lookup('POST', 'https://host/static/private/x').anomalous
+    # same prefix length: the method-specific rule wins
+    assert not index.lookup('GET', 'https://host/static/private/x').anomalous
+    assert index.lookup('DELETE', '/admin/users').anomalous
+
+    assert index.lookup('GET', '/admin/users') is None
+    assert index.lookup('GET', '/stat') is None
+
+
+def test_prefixes_match_whole_segments():
+    index = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/static', anomalous=False),
+        task_one.rules.Rule('/api/', anomalous=True),
+    ])
+
+    assert index.lookup('GET', 'http://h/static').prefix == '/static'
+    assert index.lookup('GET', 'http://h/static/app.js').prefix == '/static'
+    assert index.lookup('GET', 'http://h/static?v=1').prefix == '/static'
+    assert index.lookup('GET', 'http://h/staticky/evil') is None
+    assert index.lookup('GET', 'http://h/static.css') is None
+
+    assert index.lookup('GET', 'http://h/api/users').prefix == '/api/'
+    assert index.lookup('GET', 'http://h/api') is None
+    assert index.lookup('GET', 'http://h/apis/') is None
+
+
+@pytest.mark.parametrize('url', [
+    'http://h?x=/static/a',
+    'http://h#/static',
+    '/?/static',
+    'http://h/static/../admin',
+    'http://h/static/%2e%2e/admin',
+    'http://h/static/%2E%2E%2Fadmin',
+    'http://h/static/..%5cadmin',
+    'http://h/static/./app.js',
+])
+def test_query_fragment_and_dot_segments_dont_match(url: str):
+    """A prefix only counts in the path proper, and only if the path can't climb back out of it"""
+    index = task_one.rules.RuleIndex([task_one.rules.Rule('/static', anomalous=False)])
+    assert index.lookup('GET', url) is None
+
+
+def test_dotted_names_still_match():
+    index = task_one.rules.RuleIndex([task_one.rules.Rule('/static', anomalous=False)])
+    assert index.lookup('GET', 'http://h/static/..app/.hidden/a...b').prefix == '/static'
+
+
+def test_missing_method_only_matches_wildcard_rules():
+    index = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/a', anomalous=True, method='GET'),
+        task_one.rules.Rule('/b', anomalous=False),
+    ])
+
+    assert index.lookup(None, '/a') is None
+    assert index.lookup(None, '/b').prefix == '/b'
+
+
+def test_rules_for_the_same_prefix_replace_each_other():
+    index = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/a', anomalous=False),
+        task_one.rules.Rule('/a', anomalous=True),
+    ])
+    assert len(index) == 1
+    assert index.lookup('GET', '/a').anomalous
+
+
+def test_score_must_agree_with_verdict():
+    with pytest.raises(ValueError):
+        task_one.rules.RuleIndex([task_one.rules.Rule('/a', anomalous=False, score=decimal.Decimal(-1))])
+
+
+@pytest.mark.parametrize('score, expected', [(1, decimal.Decimal(1)), (0.5, decimal.Decimal('0.5')), ('2', 2)])
+def test_scores_are_converted_to_decimal(score: typing.Any, expected: decimal.Decimal, monkeypatch: typing.Any):
+    index = task_one.rules.RuleIndex([task_one.rules.Rule('/health', anomalous=False, score=score)])
+    rule = index.lookup('GET', '/health')
+    assert isinstance(rule.score, decimal.Decimal) and rule.score == expected
+
+    service = task_one.evaluation_service.EvaluationService(rules=index)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x: decimal.Decimal(-1))
+    request = task_one.common.Request('https://test-request/health', 'GET', '')
+    assert list(service.evaluate_iter([request])) == [(request, expected, False)]
+
+
+@pytest.mark.parametrize('score', ['abc', True, float('nan'), decimal.Decimal('Infinity'), [1]])
+def test_invalid_scores_are_rejected(score: typing.Any):
+    with pytest.raises(ValueError):
+        task_one.rules.RuleIndex([task_one.rules.Rule('/a', anomalous=False, score=score)])
+
+
+def test_rule_from_dict():
+    assert task_one.rules.Rule.from_dict({'prefix': '/a', 'verdict': 'typical', 'score': 0.5}) == \
+        task_one.rules.Rule('/a', False, None, decimal.Decimal('0.5'))
+    assert task_one.rules.Rule.from_dict({'prefix': '/a', 'verdict': 'anomalous', 'method': 'PUT'}) == \
+        task_one.rules.Rule('/a', True, 'PUT', None)
+
+    with pytest.raises(ValueError):
+        task_one.rules.Rule.from_dict({'prefix': '/a', 'verdict': 'maybe'})
+
+
+def test_many_rules():
+    index = task_one.rules.RuleIndex(
+        task_one.rules.Rule(f'/route/{i}/', anomalous=bool(i % 2)) for i in range(20000)
+    )
+    assert len(index) == 20000
+    assert index.lookup('GET', 'https://host/route/12345/x').anomalous
+    assert not index.lookup('GET', 'https://host/route/12344/x').anomalous
+    assert index.lookup('GET', 'https://host/route/20000/x') is None
+
+
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_matched_requests_bypass_scorer(max_in_flight: int, monkeypatch: typing.Any):
+    rules = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/static/', anomalous=False),
+        task_one.rules.Rule('/wp-admin', anomalous=True, score=decimal.Decimal(-5)),
+    ])
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_one.evaluation_service.EvaluationService(
+        max_in_flight=max_in_flight, batch_size=2, rules=rules, instrumentation=recorder,
+    )
+
+    scored = []
+
+    def score(path, method, body):
+        scored.append(path)
+        return decimal.Decimal(1)
+
+    monkeypatch.setattr(service.scorer, 'evaluate', score)
+
+    requests = [
+        task_one.common.Request('https://host/static/a.css', 'GET', ''),
+        task_one.common.Request('https://host/api/1', 'GET', ''),
+        task_one.common.Request('https://host/wp-admin/login.php', 'POST', ''),
+        task_one.common.Request('https://host/api/2', 'GET', ''),
+    ]
+    results = list(service.evaluate_iter(requests))
+
+    assert sorted(scored) == ['https://host/api/1', 'https://host/api/2']
+    assert [(score, is_anomalous) for _, score, is_anomalous in results] == [
+        (None, False), (1, False), (-5, True), (1, False),
+    ]
+
+    evaluation = service.evaluate(requests)
+    assert evaluation.anomalous_requests == [requests[2]]
+    assert evaluation.typical_requests == [requests[0], requests[1], requests[3]]
+
+    compact = service.evaluate_compact(requests)
+    assert list(compact.anomalous_requests) == [requests[2]]
+
+    assert recorder.snapshot().rule_matches == 6
@@ -0,0 +1,119 @@
+import decimal
+
+import pytest
+import requests
+
+import task_one.evaluation_service
+import task_one.fake_scorers
+import task_one.score_cache
+import task_one.tests.helpers
+
+
+def test_fingerprint_is_canonical():
+    """Key order in the body, and the case of the method, shouldn't change the fingerprint"""
+    fingerprint = task_one.score_cache.fingerprint
+    assert fingerprint('https://a/', 'post', {'x': 1, 'y': [1, 2]}) == \
+        fingerprint('https://a/', 'POST', {'y': [1, 2], 'x': 1})
+
+    assert fingerprint('https://a/', 'GET', None) != fingerprint('https://b/', 'GET', None)
+    assert fingerprint('https://a/', 'GET', None) != fingerprint('https://a/', 'PUT', None)
+    assert fingerprint('https://a/', 'POST', {'x': 1}) != fingerprint('https://a/', 'POST', {'x': 2})
+
+
+def test_fingerprint_without_a_method():
+    fingerprint = task_one.score_cache.fingerprint
+    assert fingerprint('https://a/', None, None) == fingerprint('https://a/', None, None)
+    assert fingerprint('https://a/', None, None) != fingerprint('https://a/', '', None)
+    assert fingerprint('https://a/', None, None) != fingerprint('https://a/', 'GET', None)
+
+
+@pytest.mark.parametrize('dedup', [False, True])
+def test_service_caches_requests_without_a_method(dedup: bool):
+    """requests.Request(url=...) has no method, which the scorer (and so the cache) has always accepted"""
+    service = task_one.evaluation_service.EvaluationService(cache=task_one.score_cache.ScoreCache(), dedup=dedup)
+    calls = []
+
+    def record(*request) -> decimal.Decimal:
+        calls.append(request)
+        return decimal.Decimal(1)
+
+    service.scorer = task_one.fake_scorers.LatencyScorer(0, record)
+
+    reqs = [requests.Request(url='https://a/'), requests.Request(url='https://a/')]
+    assert service.evaluate(reqs).typical_requests == reqs
+    assert service.evaluate(reqs).typical_requests == reqs
+    assert calls == [('https://a/', None, None)] * (1 if dedup else 2)
+
+
+def test_hits_and_misses():
+    cache = task_one.score_cache.ScoreCache()
+    assert cache.get(b'a') is None
+
+    cache.put(b'a', decimal.Decimal(1))
+    assert cache.get(b'a') == 1
+    assert cache.get(b'a') == 1
+
+    assert cache.stats.hits == 2
+    assert cache.stats.misses == 1
+    assert cache.stats.entries == 1
+
+
+def test_lru_eviction_by_entries():
+    cache = task_one.score_cache.ScoreCache(max_entries=2)
+    cache.put(b'a', decimal.Decimal(1))
+    cache.put(b'b', decimal.Decimal(2))
+    cache.get(b'a')  # b is now least recently used
+    cache.put(b'c', decimal.Decimal(3))
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == 1
+    assert cache.get(b'c') == 3
+    assert cache.stats.evictions == 1
+    assert len(cache) == 2
+
+
+def test_eviction_by_bytes():
+    cache = task_one.score_cache.ScoreCache()
+    cache.put(b'a', decimal.Decimal(1))
+    entry_size = cache.bytes
+
+    cache = task_one.score_cache.ScoreCache(max_bytes=3 * entry_size)
+    for key in [b'a', b'b', b'c', b'd', b'e']:
+        cache.put(key, decimal.Decimal(1))
+
+    assert len(cache) == 3
+    assert cache.bytes <= 3 * entry_size
+    assert cache.stats.evictions == 2
+    assert cache.get(b'a') is None
+
+
+def test_ttl_expiry():
+    clock = task_one.tests.helpers.FakeClock()
+    cache = task_one.score_cache.ScoreCache(ttl=10, clock=clock)
+    cache.put(b'a', decimal.Decimal(1))
+
+    clock.now = 9.9
+    assert cache.get(b'a') == 1
+
+    clock.now = 10
+    assert cache.get(b'a') is None
+    assert cache.stats.evictions == 1
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_replacing_an_entry_keeps_byte_count():
+    cache = task_one.score_cache.ScoreCache()
+    cache.put(b'a', decimal.Decimal(1))
+    size = cache.bytes
+    cache.put(b'a', decimal.Decimal(2))
+
+    assert cache.bytes == size
+    assert cache.get(b'a') == 2
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'max_entries': 1}])
+def test_clear(kwargs: dict):
+    cache = task_one.score_cache.ScoreCache(**kwargs)
+    cache.put(b'a', decimal.Decimal(1))
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes == 0
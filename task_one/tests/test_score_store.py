@@ -0,0 +1,150 @@
+import concurrent.futures
+import decimal
+import pickle
+import typing
+
+import pytest
+
+import task_one.common
+import task_one.evaluation_service
+import task_one.score_cache
+import task_one.score_store
+
+
+def read_back(path: str, keys: typing.List[bytes]) -> typing.Dict[bytes, str]:
+    """Run in another process, to check the store can be read from there"""
+    store = task_one.score_store.ScoreStore(path)
+    try:
+        return {key: str(score) for key, score in store.get_many(keys).items()}
+    finally:
+        store.close()
+
+
+@pytest.fixture()
+def store(tmp_path: typing.Any) -> typing.Iterator[task_one.score_store.ScoreStore]:
+    store = task_one.score_store.ScoreStore(str(tmp_path / 'scores.db'))
+    yield store
+    store.close()
+
+
+def test_scores_round_trip_exactly(store: task_one.score_store.ScoreStore):
+    scores = {b'a': decimal.Decimal('0.1000000000000000000000000001'), b'b': decimal.Decimal('-3E+5')}
+    store.put_many(list(scores.items()))
+
+    assert store.get(b'a') == scores[b'a']
+    assert str(store.get(b'b')) == '-3E+5'
+    assert store.get(b'c') is None
+    assert store.get_many([b'a', b'b', b'c']) == scores
+    assert len(store) == 2
+
+
+def test_get_many_large_batches(store: task_one.score_store.ScoreStore):
+    items = [(i.to_bytes(4, 'big'), decimal.Decimal(i)) for i in range(2500)]
+    store.put_many(items)
+    assert store.get_many([key for key, _ in items]) == dict(items)
+
+
+def test_compaction_keeps_most_recently_written(store: task_one.score_store.ScoreStore):
+    store.put_many([(bytes([i]), decimal.Decimal(i)) for i in range(10)])
+    store.put(bytes([0]), decimal.Decimal(100))  # rewriting makes it the most recent
+
+    store.compact(3, vacuum=True)
+    assert list(store.load()) == [(bytes([8]), 8), (bytes([9]), 9), (bytes([0]), 100)]
+
+
+def test_automatic_compaction(tmp_path: typing.Any):
+    store = task_one.score_store.ScoreStore(str(tmp_path / 'scores.db'), max_entries=20)
+    for i in range(100):
+        store.put(i.to_bytes(4, 'big'), decimal.Decimal(i))
+
+    assert len(store) <= 20
+    assert store.get((99).to_bytes(4, 'big')) == 99
+    store.close()
+
+
+def test_load_into_cache(store: task_one.score_store.ScoreStore):
+    store.put_many([(bytes([i]), decimal.Decimal(i)) for i in range(10)])
+    assert [key for key, _ in store.load(2)] == [bytes([8]), bytes([9])]
+
+    cache = task_one.score_cache.ScoreCache(max_entries=4)
+    assert store.load_into(cache) == 4
+    assert cache.get(bytes([9])) == 9
+    assert cache.get(bytes([5])) is None
+
+
+def test_state(store: task_one.score_store.ScoreStore):
+    assert store.load_state('x', default=1) == 1
+    store.save_state('x', {'count': 2})
+    assert store.load_state('x') == {'count': 2}
+
+    store.save_state('x/1', 3)
+    store.save_state('y', 4)
+    assert store.load_states('x') == {'x': {'count': 2}, 'x/1': 3}
+
+
+def test_state_is_never_unpickled(store: task_one.score_store.ScoreStore):
+    """Anyone who can write the file can write state, so it's read as JSON rather than run"""
+    with store._connection() as connection, connection:
+        connection.execute("INSERT INTO state (name, value) VALUES (?, ?)", ('x', pickle.dumps(print)))
+
+    with pytest.raises(ValueError):
+        store.load_state('x')
+
+
+def test_readers_in_other_processes(store: task_one.score_store.ScoreStore):
+    store.put_many([(b'a', decimal.Decimal('1.5')), (b'b', decimal.Decimal('-2'))])
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(read_back, [store.path] * 4, [[b'a', b'b']] * 4))
+
+    assert results == [{b'a': '1.5', b'b': '-2'}] * 4
+
+
+@pytest.mark.parametrize('with_cache', [False, True])
+def test_service_consults_store_before_scorer(with_cache: bool, tmp_path: typing.Any, monkeypatch: typing.Any):
+    path = str(tmp_path / 'scores.db')
+    requests = [task_one.common.Request(f'https://test-request/{i}', 'GET', '') for i in range(10)]
+    calls = []
+
+    def make_service() -> task_one.evaluation_service.EvaluationService:
+        service = task_one.evaluation_service.EvaluationService(
+            cache=task_one.score_cache.ScoreCache() if with_cache else None,
+            store=task_one.score_store.ScoreStore(path),
+        )
+        monkeypatch.setattr(
+            service.scorer, 'evaluate', lambda path, method, body: calls.append(path) or decimal.Decimal(path[-1]),
+        )
+        return service
+
+    first = make_service().evaluate(requests[:6])
+    assert len(calls) == 6
+
+    # a "restarted" service only needs the scorer for the requests it hasn't seen before
+    second = make_service().evaluate(requests)
+    assert len(calls) == 10
+    assert first.anomalous_requests == second.anomalous_requests == requests[:1]
+
+
+def test_connections_are_pooled_across_threads(store: task_one.score_store.ScoreStore, monkeypatch: typing.Any):
+    """Every evaluate call scores on fresh worker threads, which mustn't each leave a connection open"""
+    service = task_one.evaluation_service.EvaluationService(max_in_flight=4, batch_size=2, store=store)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]))
+
+    for i in range(20):
+        service.evaluate([task_one.common.Request(f'https://test-request/{i}/{j}', 'GET', '') for j in range(10)])
+
+    assert len(store) == 200
+    assert store._open <= store.pool_size
+
+
+def test_connections_beyond_the_pool_are_closed(store: task_one.score_store.ScoreStore):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda i: store.put(bytes([i]), decimal.Decimal(i)), range(100)))
+
+    assert len(store) == 100
+    assert store._open <= store.pool_size
+
+    # closing doesn't stop the store being used again
+    store.close()
+    assert store._open == 0
+    assert store.get(bytes([5])) == 5
@@ -0,0 +1,34 @@
+import decimal
+import typing
+
+import task_one.async_evaluation_service
+import task_one.evaluation_service
+
+import task_two.evaluation
+import task_two.evaluation_service
+import task_two.score_statistics
+
+# using absolute imports for better immediate readability
+
+
+class AsyncEvaluationService(task_one.async_evaluation_service.AsyncEvaluationServiceInterface):
+
+    def __init__(
+            self,
+            max_in_flight: int = task_one.async_evaluation_service.DEFAULT_MAX_IN_FLIGHT,
+            statistics: typing.Optional[task_two.score_statistics.ScoreStatistics] = None,
+    ):
+        super().__init__(max_in_flight)
+        self.statistics = task_two.score_statistics.RunningStatistics() if statistics is None else statistics
+
+    async def evaluate(
+            self, requests: typing.List[task_one.evaluation_service.AnyRequest]
+    ) -> task_two.evaluation.Evaluation:
+        evaluation = task_two.evaluation.Evaluation([], [], decimal.Decimal('NaN'))
+        for request, score in await self._scored(requests):
+            self.statistics.update(score)
+            task_one.evaluation_service.partition(evaluation, request, score <= 0)
+
+        task_two.evaluation_service.summarise(evaluation, self.statistics)
+
+        return evaluation
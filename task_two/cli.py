@@ -0,0 +1,184 @@
+"""
+Offline re-scoring of historical traffic stored as JSON Lines, one request per line:
+
+    {"path": "https://example.com/a", "method": "POST", "body": {"key": "value"}}
+
+Requests are streamed through the task_two EvaluationService in batches, so files far bigger than memory are fine.
+Each request is written back out, with its score, to either the typical or the anomalous output file, and the final
+statistics are written as JSON once the input is exhausted.
+
+Usage:
+    python -m task_two.cli traffic.jsonl --scorer-url http://scorer:8080 --max-in-flight 8
+    zcat traffic.jsonl.gz | python -m task_two.cli - --scorer-url http://scorer:8080 --stats-out stats.json
+"""
+import argparse
+import contextlib
+import decimal
+import json
+import mmap
+import sys
+import time
+import typing
+
+import task_one.common
+import task_one.evaluation_service
+import task_one.pooled_scorer_http_client
+
+import task_two.evaluation_service
+
+# using absolute imports for better immediate readability
+
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+
+@contextlib.contextmanager
+def open_lines(path: str, use_mmap: bool = False) -> typing.Iterator[typing.Iterator[bytes]]:
+    """Lines of the input file (or stdin for '-'), optionally read through a memory map rather than buffered reads"""
+    if path == '-':
+        yield iter(sys.stdin.buffer)
+        return
+
+    with open(path, 'rb') as file:
+        if not use_mmap:
+            yield iter(file)
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield iter(mapped.readline, b'')
+
+
+def parse_requests(lines: typing.Iterable[bytes]) -> typing.Iterator[task_one.common.Request]:
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            yield task_one.common.Request.from_dict(json.loads(line))
+        except (ValueError, KeyError) as e:
+            raise ValueError(f"Line {line_number} isn't a valid request: {e!r}") from e
+
+
+class ProgressReporter:
+    """Prints the number of requests evaluated, and the throughput, at most once every `interval` seconds"""
+
+    def __init__(self, interval: float = 5.0, stream: typing.Optional[typing.TextIO] = None):
+        self.interval = interval
+        self.stream = stream
+        self.count = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def update(self, count: int = 1):
+        self.count += count
+        now = time.perf_counter()
+        if self.interval and now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report(now)
+
+    def report(self, now: typing.Optional[float] = None):
+        stream = sys.stderr if self.stream is None else self.stream
+        print(f"{self.count} requests evaluated ({self.rate(now):.1f}/s)", file=stream)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def rate(self, now: typing.Optional[float] = None) -> float:
+        elapsed = (time.perf_counter() if now is None else now) - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+
+def _json_default(value: typing.Any) -> str:
+    # Decimals are written as strings so they keep their full precision
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+
+    raise TypeError(f"Object of type {type(value)} is not JSON serializable")
+
+
+def run(
+        requests: typing.Iterable[task_one.common.Request],
+        service: task_two.evaluation_service.EvaluationService,
+        typical_out: typing.TextIO,
+        anomalous_out: typing.TextIO,
+        progress: ProgressReporter,
+) -> dict:
+    """Evaluate the stream of requests, writing each to the relevant output, and return the final statistics"""
+    typical = anomalous = 0
+
+    for request, score, is_anomalous in service.evaluate_iter(requests):
+        record = json.dumps({**request._asdict(), 'score': score}, default=_json_default)
+        if is_anomalous:
+            anomalous_out.write(record + '\n')
+            anomalous += 1
+        else:
+            typical_out.write(record + '\n')
+            typical += 1
+
+        progress.update()
+
+    return {
+        'count': typical + anomalous,
+        'typical': typical,
+        'anomalous': anomalous,
+        'standard_deviation': service.statistics.standard_deviation,
+        'mean': service.statistics.mean,
+        'variance': service.statistics.variance,
+        'elapsed_seconds': progress.elapsed,
+        'requests_per_second': progress.rate(),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m task_two.cli', description="Re-score JSON Lines request traffic against a scorer service",
+    )
+    parser.add_argument('input', help="JSON Lines file of requests, or - to read from stdin")
+    parser.add_argument('--scorer-url', required=True, help="base URL of the scorer service")
+    parser.add_argument('--typical-out', default='typical.jsonl', help="where to write typical requests")
+    parser.add_argument('--anomalous-out', default='anomalous.jsonl', help="where to write anomalous requests")
+    parser.add_argument('--stats-out', default='stats.json', help="where to write the final statistics")
+    parser.add_argument(
+        '--batch-size', type=int, default=task_one.evaluation_service.DEFAULT_BATCH_SIZE,
+        help="requests sent to the scorer per call",
+    )
+    parser.add_argument('--max-in-flight', type=int, default=1, help="scorer calls allowed to be outstanding at once")
+    parser.add_argument('--timeout', type=float, default=10.0, help="per-call scorer timeout, in seconds")
+    parser.add_argument('--mmap', action='store_true', help="memory-map the input file rather than reading it")
+    parser.add_argument(
+        '--progress-interval', type=float, default=5.0, help="seconds between progress reports, 0 to disable",
+    )
+    return parser
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    scorer = task_one.pooled_scorer_http_client.PooledScorerHttpClient(
+        args.scorer_url, pool_size=args.max_in_flight, timeout=args.timeout,
+    )
+    service = task_two.evaluation_service.EvaluationService(
+        max_in_flight=args.max_in_flight, batch_size=args.batch_size,
+    )
+    service.scorer = scorer
+    progress = ProgressReporter(args.progress_interval)
+
+    with contextlib.ExitStack() as stack:
+        lines = stack.enter_context(open_lines(args.input, args.mmap))
+        typical_out = stack.enter_context(open(args.typical_out, 'w', buffering=OUTPUT_BUFFER_SIZE))
+        anomalous_out = stack.enter_context(open(args.anomalous_out, 'w', buffering=OUTPUT_BUFFER_SIZE))
+        stack.callback(scorer.close)
+
+        stats = run(parse_requests(lines), service, typical_out, anomalous_out, progress)
+
+    with open(args.stats_out, 'w') as stats_out:
+        json.dump(stats, stats_out, default=_json_default, indent=2)
+
+    if args.progress_interval:
+        progress.report()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,52 @@
+import typing
 from decimal import Decimal
 
+import task_one.evaluation
+
 
 class Evaluation:
 
-    def __init__(self, typical_requests: list, anomalous_requests: list, standard_deviation: Decimal):
+    def __init__(
+            self,
+            typical_requests: list,
+            anomalous_requests: list,
+            standard_deviation: Decimal,
+            mean: Decimal = Decimal('NaN'),
+            variance: Decimal = Decimal('NaN'),
+            count: int = 0,
+            unscored_requests: typing.Optional[list] = None,
+            sketch: typing.Optional[typing.Any] = None,
+    ):
         self.typical_requests = typical_requests
         self.anomalous_requests = anomalous_requests
+        self.unscored_requests = [] if unscored_requests is None else unscored_requests
+        self.standard_deviation = standard_deviation
+        # summary of the scores the service's statistics currently cover, which may be a window rather than all time
+        self.mean = mean
+        self.variance = variance
+        self.count = count
+        # snapshot of the service's KLLSketch, if it keeps one, for quantiles and histograms of the scores
+        self.sketch = sketch
+
+
+class CompactEvaluation(task_one.evaluation.CompactEvaluation):
+    """task_one.evaluation.CompactEvaluation plus the score statistics from task_two's Evaluation"""
+    __slots__ = ('standard_deviation', 'mean', 'variance', 'count', 'sketch')
+
+    def __init__(
+            self,
+            requests: typing.Sequence,
+            anomalous_flags: bytes,
+            scores: typing.Optional[typing.Sequence[float]],
+            standard_deviation: Decimal = Decimal('NaN'),
+            mean: Decimal = Decimal('NaN'),
+            variance: Decimal = Decimal('NaN'),
+            count: int = 0,
+            sketch: typing.Optional[typing.Any] = None,
+    ):
+        super().__init__(requests, anomalous_flags, scores)
         self.standard_deviation = standard_deviation
+        self.mean = mean
+        self.variance = variance
+        self.count = count
+        self.sketch = sketch
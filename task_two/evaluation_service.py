@@ -1,57 +1,280 @@
+import itertools
+import time
 import typing
-import requests as requests_lib  # template code already defines a variable named "requests"
 import decimal
-import statistics
 
+import numpy
+
+import task_one.concurrency
 import task_one.evaluation_service
+import task_one.instrumentation
+import task_one.resilience
+import task_one.rules
+import task_one.score_cache
+import task_one.score_store
 import task_one.scorer_http_client
 
 import task_two.evaluation  # the new object
+import task_two.quantile_sketch
+import task_two.score_statistics
+import task_two.vectorized
 
 # using absolute imports for better immediate readability
 
 
+# names the statistics are saved under in a ScoreStore, followed by '/' and the state_key if the service has one
+STATISTICS_STATE = 'task_two.statistics'
+SKETCH_STATE = 'task_two.sketch'
+
+AnyEvaluation = typing.Union[task_two.evaluation.Evaluation, task_two.evaluation.CompactEvaluation]
+
+
+def summarise(
+        evaluation: AnyEvaluation,
+        statistics: task_two.score_statistics.ScoreStatistics,
+        sketch: typing.Optional[task_two.quantile_sketch.KLLSketch] = None,
+):
+    """Copy the current score statistics (and a snapshot of the quantile sketch, if there is one) onto an evaluation"""
+    evaluation.standard_deviation = statistics.standard_deviation
+    evaluation.mean = statistics.mean
+    evaluation.variance = statistics.variance
+    evaluation.count = statistics.count
+    evaluation.sketch = None if sketch is None else sketch.snapshot()
+
+
+def state_name(name: str, state_key: typing.Optional[str] = None) -> str:
+    return name if state_key is None else f'{name}/{state_key}'
+
+
+def load_merged_statistics(
+        store: task_one.score_store.ScoreStore,
+) -> typing.Optional[task_two.score_statistics.RunningStatistics]:
+    """
+    Combine the statistics saved by every service sharing the store (each under its own state_key) into one
+    RunningStatistics over all of their scores, or None if nothing has been saved. Only cumulative
+    RunningStatistics can be combined exactly: anything else raises TypeError
+    """
+    merged = None
+    for state in store.load_states(STATISTICS_STATE).values():
+        if merged is None:
+            merged = task_two.score_statistics.RunningStatistics()
+        merged.merge(task_two.score_statistics.ScoreStatistics.from_state(state))
+
+    return merged
+
+
+def load_merged_sketch(store: task_one.score_store.ScoreStore) -> typing.Optional[task_two.quantile_sketch.KLLSketch]:
+    """Combine the quantile sketches saved by every service sharing the store, or None if none have been saved"""
+    merged = None
+    for state in store.load_states(SKETCH_STATE).values():
+        sketch = task_two.quantile_sketch.KLLSketch.from_state(state)
+        if merged is None:
+            merged = task_two.quantile_sketch.KLLSketch(sketch.k)
+        merged.merge(sketch)
+
+    return merged
+
+
 class EvaluationService(task_one.evaluation_service.EvaluationServiceInterface):
+    compact_evaluation_class = task_two.evaluation.CompactEvaluation
+
+    # least number of seconds between saves of the statistics to the store, which writes them out in full
+    state_save_interval = 5.0
+
+    def __init__(
+            self,
+            max_in_flight: int = 1,
+            batch_size: int = task_one.evaluation_service.DEFAULT_BATCH_SIZE,
+            cache: typing.Optional[task_one.score_cache.ScoreCache] = None,
+            statistics: typing.Optional[task_two.score_statistics.ScoreStatistics] = None,
+            vectorized: bool = False,
+            processes: typing.Optional[int] = None,
+            scorer_factory: typing.Optional[typing.Callable[[], task_one.scorer_http_client.ScorerHttpClient]] = None,
+            instrumentation: typing.Optional[task_one.instrumentation.Instrumentation] = None,
+            resilience: typing.Optional[task_one.resilience.ResiliencePolicy] = None,
+            deadline: typing.Optional[float] = None,
+            unscored: str = 'raise',
+            rules: typing.Optional[task_one.rules.RuleIndex] = None,
+            store: typing.Optional[task_one.score_store.ScoreStore] = None,
+            concurrency: typing.Optional[task_one.concurrency.AdaptiveLimit] = None,
+            sketch: typing.Optional[task_two.quantile_sketch.KLLSketch] = None,
+            dedup: bool = False,
+            state_key: typing.Optional[str] = None,
+    ):
+        """
+        :param statistics: which scores the reported std dev (and mean, variance, count) summarise. Defaults to
+            RunningStatistics, covering every score since the service started; pass a WindowedStatistics,
+            TimeWindowedStatistics or ExponentialStatistics to only track recent scorer behaviour
+        :param vectorized: partition and compute statistics with NumPy float64 arrays rather than per-element
+            Decimal arithmetic, for large offline batches. Statistics default to vectorized.FloatStatistics in this
+            mode - see task_two/vectorized.py for the precision given up in exchange
+        :param store: as for task_one, plus the statistics are saved to it after an evaluate (at most every
+            state_save_interval seconds) and on close(). If statistics isn't given, those saved by a previous run
+            with the same state_key are picked up where they left off. The same goes for the sketch
+        :param sketch: a KLLSketch to feed every score to, for quantiles and histograms of the score distribution in
+            bounded memory. Evaluations carry a snapshot of it. Like the default statistics, it covers every score
+            since the service started, and reset_statistics leaves it alone - call sketch.reset() for that
+        :param dedup: as for task_one. Only the scoring is shared between copies of a request: each copy still adds
+            its score to the statistics and sketch, so the std dev is the same as without deduplication
+        :param state_key: which worker the statistics saved to the store belong to. Services in separate processes
+            sharing a store each need their own, e.g. a worker index that stays the same across restarts, or they
+            overwrite each other's statistics. Use load_merged_statistics and load_merged_sketch for the combined view
+        """
+        super().__init__(
+            max_in_flight=max_in_flight,
+            batch_size=batch_size,
+            cache=cache,
+            processes=processes,
+            scorer_factory=scorer_factory,
+            instrumentation=instrumentation,
+            resilience=resilience,
+            deadline=deadline,
+            unscored=unscored,
+            rules=rules,
+            store=store,
+            concurrency=concurrency,
+            dedup=dedup,
+        )
+        # Originally this kept every score and ran statistics.stdev over the full history on each call, which got
+        # slower (and bigger) with every batch. The online accumulator gives an identical result in constant memory,
+        # and also means the std dev is available at any point while streaming through evaluate_iter.
+        #
+        # For higher performance could use numpy arrays, though floating point stuff would negate the use of the
+        # decimal library, so the accumulator sticks to exact integer arithmetic to preserve the decimal precision.
+        self.vectorized = vectorized
+        self.state_key = state_key
+        self._state_saved_at: typing.Optional[float] = None
+
+        if statistics is None and store is not None:
+            state = store.load_state(state_name(STATISTICS_STATE, state_key))
+            if state is not None:
+                statistics = task_two.score_statistics.ScoreStatistics.from_state(state)
+
+        if statistics is None:
+            statistics = task_two.vectorized.FloatStatistics() if vectorized else \
+                task_two.score_statistics.RunningStatistics()
 
-    def __init__(self):
-        super().__init__()
-        self.scores: typing.List[decimal.Decimal] = []
+        self.statistics = statistics
 
-    def evaluate(self, requests: typing.List[requests_lib.Request]) -> task_two.evaluation.Evaluation:
+        if sketch is None and store is not None:
+            state = store.load_state(state_name(SKETCH_STATE, state_key))
+            if state is not None:
+                sketch = task_two.quantile_sketch.KLLSketch.from_state(state)
+
+        self.sketch = sketch
+
+    def evaluate(self, requests: typing.List[task_one.evaluation_service.AnyRequest]) -> task_two.evaluation.Evaluation:
         # rather than building up two potentially long lists of objects, and then instantiating a
         # new object with copies of those lists, create a stateful instance here and append to it
         # while processing requests
         evaluation = task_two.evaluation.Evaluation([], [], decimal.Decimal('NaN'))
-        for request in requests:
+        if self.vectorized:
+            self._evaluate_vectorized(requests, evaluation)
+        else:
+            for request, _, is_anomalous in self.evaluate_iter(requests):
+                task_one.evaluation_service.partition(evaluation, request, is_anomalous)
 
-            if not isinstance(request, requests_lib.Request):
-                raise TypeError(f"Instance of type {type(request)} not recognised, expected requests.Request object")
+        self._finish(evaluation)
 
-            score = self.scorer.evaluate(request.url, request.method, request.json)
-            self.scores.append(score)
+        return evaluation
 
-            if not isinstance(score, decimal.Decimal):
-                raise TypeError(f"'{score}' not recognised: expected a decimal.Decimal object, got {type(score)}")
+    @property
+    def standard_deviation(self) -> decimal.Decimal:
+        """Running std dev of every score seen by this service, available at any point mid-stream"""
+        return self.statistics.standard_deviation
 
-            if score <= 0:
-                evaluation.anomalous_requests.append(request)
-            else:
-                evaluation.typical_requests.append(request)
+    def reset_statistics(self) -> task_two.score_statistics.ScoreStatistics:
+        """Start the running statistics again from scratch, returning a snapshot of the state they had up to now"""
+        previous = self.statistics.snapshot()
+        self.statistics.reset()
+        return previous
 
-        # Considered an "online" algorithm for updating the std dev on the fly, e.g.:
-        #     https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Welford's_online_algorithm
-        #
-        # But given that the method takes complete lists rather than lazy iterators there's no real need for that level
-        # of complexity.
-        #
-        # For higher performance could use numpy arrays, though floating point stuff would negate the use of the decimal
-        # library. Since the decimal library was part of the original skeleton code/interface I've gone for the less
-        # performant option which preserves the decimal precision.
-        if len(self.scores) >= 2:
-            evaluation.standard_deviation = statistics.stdev(self.scores)
+    def _evaluate_vectorized(
+            self,
+            requests: typing.Iterable[task_one.evaluation_service.AnyRequest],
+            evaluation: task_two.evaluation.Evaluation,
+    ):
+        started = time.perf_counter()
+        scored_requests = []
+        scores = []
+        try:
+            for request, score in self._scored(requests):
+                scored_requests.append(request)
+                scores.append(score)
+        except Exception as error:
+            if self.instrumentation is not None:
+                self.instrumentation.error(error)
+            raise
 
-        elif len(self.scores) == 1:
-            evaluation.standard_deviation = 0
-        # else: default remains as NaN
+        # requests left unscored, or settled by a rule without a score, have no score to go in the array
+        numeric = None
+        if self.rules is not None or None in scores:
+            numeric = numpy.fromiter(
+                (isinstance(score, decimal.Decimal) for score in scores), dtype=bool, count=len(scores),
+            )
+            verdicts = [self._verdict(outcome) for outcome in itertools.compress(scores, ~numeric)]
+            scores = list(itertools.compress(scores, numeric))
 
-        return evaluation
+        array = task_two.vectorized.to_array(scores)
+        anomalous = task_two.vectorized.anomalous_mask(array)
+        typical = ~anomalous
+
+        if numeric is not None:
+            # spread the masks over the scored positions back out to cover every request, filling in the rest
+            anomalous, typical = numpy.zeros_like(numeric), numpy.zeros_like(numeric)
+            anomalous[numeric] = task_two.vectorized.anomalous_mask(array)
+            typical[numeric] = ~anomalous[numeric]
+            anomalous[~numeric] = [verdict is True for verdict in verdicts]
+            typical[~numeric] = [verdict is False for verdict in verdicts]
+
+            unscored = ~(anomalous | typical)
+            if unscored.any():
+                evaluation.unscored_requests = list(itertools.compress(scored_requests, unscored))
+
+        evaluation.anomalous_requests = list(itertools.compress(scored_requests, anomalous))
+        evaluation.typical_requests = list(itertools.compress(scored_requests, typical))
+
+        statistics_started = time.perf_counter()
+        if isinstance(self.statistics, task_two.vectorized.FloatStatistics):
+            self.statistics.update_array(array)
+        else:
+            self.statistics.update_many(scores)
+
+        if self.sketch is not None:
+            self.sketch.update_many(array.tolist())
+
+        if self.instrumentation is not None:
+            finished = time.perf_counter()
+            self.instrumentation.statistics_computed(finished - statistics_started)
+
+            # requests aren't handled one at a time here, so each is reported with an even share of the batch time
+            share = (finished - started) / len(scored_requests) if scored_requests else 0.0
+            for is_anomalous, is_typical in zip(anomalous.tolist(), typical.tolist()):
+                self.instrumentation.request_evaluated(None if is_anomalous == is_typical else is_anomalous, share)
+            self.instrumentation.batch_finished(len(scored_requests), finished - started)
+
+    def close(self):
+        self._save_state()
+        super().close()
+
+    def _save_state(self):
+        if self.store is None:
+            return
+
+        self._state_saved_at = time.monotonic()
+        self.store.save_state(state_name(STATISTICS_STATE, self.state_key), self.statistics.to_state())
+        if self.sketch is not None:
+            self.store.save_state(state_name(SKETCH_STATE, self.state_key), self.sketch.to_state())
+
+    def _summarise(self, evaluation: AnyEvaluation):
+        summarise(evaluation, self.statistics, self.sketch)
+
+        # a window of scores is written out in full every time, so don't do it on every call
+        saved_at = self._state_saved_at
+        if saved_at is None or time.monotonic() - saved_at >= self.state_save_interval:
+            self._save_state()
+
+    def _observe(self, score: decimal.Decimal):
+        self.statistics.update(score)
+        if self.sketch is not None:
+            self.sketch.update(score)
@@ -0,0 +1,442 @@
+import abc
+import collections
+import copy
+import decimal
+import fractions
+import time
+import typing
+
+
+def _decimal_sqrt_of_frac(numerator: int, denominator: int) -> decimal.Decimal:
+    """
+    Square root of numerator / denominator as a Decimal, correctly rounded in the current context.
+
+    This is the same approach statistics.stdev takes for Decimal data: take the Decimal sqrt, which can be out by
+    one ulp, then check the halfway points either side using exact integer arithmetic and step if needed.
+    """
+    if numerator <= 0:
+        return decimal.Decimal('0.0')
+
+    root = (decimal.Decimal(numerator) / decimal.Decimal(denominator)).sqrt()
+    nr, dr = root.as_integer_ratio()
+
+    plus = root.next_plus()
+    np, dp = plus.as_integer_ratio()
+    if 4 * numerator * (dr * dp) ** 2 > denominator * (dr * np + dp * nr) ** 2:
+        return plus
+
+    minus = root.next_minus()
+    nm, dm = minus.as_integer_ratio()
+    if 4 * numerator * (dr * dm) ** 2 < denominator * (dr * nm + dm * nr) ** 2:
+        return minus
+
+    return root
+
+
+class ScoreStatistics(abc.ABC):
+    """
+    Interface for the summary statistics task_two keeps over the scores it has seen. Implementations differ in which
+    scores they summarise - all of them, or only recent ones - but all update in O(1) per score.
+
+    to_state and from_state convert them to and from plain JSON-compatible data, tagged with the type, for saving to
+    a ScoreStore.
+    """
+
+    # type tag -> implementation, for from_state
+    _state_types: typing.Dict[str, typing.Type['ScoreStatistics']] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        ScoreStatistics._state_types[cls.__name__] = cls
+
+    @abc.abstractmethod
+    def reset(self):
+        pass
+
+    @abc.abstractmethod
+    def update(self, score: decimal.Decimal):
+        pass
+
+    def update_many(self, scores: typing.Iterable[decimal.Decimal]):
+        for score in scores:
+            self.update(score)
+
+    def snapshot(self) -> 'ScoreStatistics':
+        """Independent copy of the current state, which won't change as further scores are added"""
+        return copy.deepcopy(self)
+
+    @abc.abstractmethod
+    def to_state(self) -> dict:
+        pass
+
+    @classmethod
+    def from_state(cls, state: dict, **kwargs) -> 'ScoreStatistics':
+        """
+        Statistics back from to_state, of whichever implementation saved them - which has to be cls or a subclass of
+        it. Keyword arguments go to its constructor, e.g. the clock of a TimeWindowedStatistics
+        """
+        state_type = ScoreStatistics._state_types.get(state.get('type'))
+        if state_type is None or not issubclass(state_type, cls):
+            raise ValueError(f"Not a saved {cls.__name__}: type {state.get('type')!r}")
+
+        return state_type._from_state(state, **kwargs)
+
+    @classmethod
+    @abc.abstractmethod
+    def _from_state(cls, state: dict, **kwargs) -> 'ScoreStatistics':
+        pass
+
+    @property
+    @abc.abstractmethod
+    def count(self) -> int:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def mean(self) -> decimal.Decimal:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def variance(self) -> decimal.Decimal:
+        pass
+
+    @property
+    @abc.abstractmethod
+    def standard_deviation(self) -> decimal.Decimal:
+        pass
+
+
+class RunningStatistics(ScoreStatistics):
+    """
+    Constant-memory accumulator for the count, mean and sample variance of a stream of Decimal scores.
+
+    Rather than Welford's update, which needs a division (and so a rounding) on every score, this keeps exact
+    integer partial sums of each score's numerator and squared numerator, grouped by denominator - the same trick
+    statistics.stdev uses internally. Every score is added exactly, so the results are identical to running
+    statistics.stdev over the full history. Memory only depends on how many distinct decimal places the scores use,
+    not on how many scores there are.
+
+    Non-finite scores (NaN or infinity) make the mean and variance NaN for as long as they're included.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._count = 0
+        self._non_finite = 0
+        # denominator -> sum of numerators, and denominator -> sum of squared numerators
+        self._sums: typing.DefaultDict[int, int] = collections.defaultdict(int)
+        self._sums_of_squares: typing.DefaultDict[int, int] = collections.defaultdict(int)
+
+    def update(self, score: decimal.Decimal):
+        self._add(self._ratio(score))
+
+    def merge(self, other: 'RunningStatistics'):
+        """
+        Fold in the scores summarised by another accumulator, e.g. one kept by a service in another process. This
+        is exact, so the merged std dev is identical to one computed over both sets of scores together.
+        """
+        if type(self) is not RunningStatistics or type(other) is not RunningStatistics:
+            raise TypeError("Only cumulative RunningStatistics can be merged, windows can't be combined")
+
+        self._count += other._count
+        self._non_finite += other._non_finite
+        for denominator, total in other._sums.items():
+            self._sums[denominator] += total
+        for denominator, total in other._sums_of_squares.items():
+            self._sums_of_squares[denominator] += total
+
+    def to_state(self) -> dict:
+        return {
+            'type': type(self).__name__,
+            'count': self._count,
+            'non_finite': self._non_finite,
+            'sums': sorted(self._sums.items()),
+            'sums_of_squares': sorted(self._sums_of_squares.items()),
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict, **kwargs) -> 'RunningStatistics':
+        statistics = cls(**kwargs)
+        statistics._count = state['count']
+        statistics._non_finite = state['non_finite']
+        statistics._sums.update((denominator, total) for denominator, total in state['sums'])
+        statistics._sums_of_squares.update((denominator, total) for denominator, total in state['sums_of_squares'])
+        return statistics
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> decimal.Decimal:
+        if self._undefined(1):
+            return decimal.Decimal('NaN')
+
+        return _to_decimal(self._sum() / self._count)
+
+    @property
+    def m2(self) -> decimal.Decimal:
+        """Sum of squared deviations from the mean, i.e. Welford's M2"""
+        if self._undefined(1):
+            return decimal.Decimal('NaN')
+
+        return _to_decimal(self._m2())
+
+    @property
+    def variance(self) -> decimal.Decimal:
+        """Sample variance, NaN for fewer than two scores"""
+        if self._undefined(2):
+            return decimal.Decimal('NaN')
+
+        return _to_decimal(self._m2() / (self._count - 1))
+
+    @property
+    def standard_deviation(self) -> decimal.Decimal:
+        """Sample standard deviation: NaN with no scores, and 0 for a single score"""
+        if self._undefined(1):
+            return decimal.Decimal('NaN')
+
+        if self._count == 1:
+            return decimal.Decimal(0)
+
+        variance = self._m2() / (self._count - 1)
+        return _decimal_sqrt_of_frac(variance.numerator, variance.denominator)
+
+    @staticmethod
+    def _ratio(score: decimal.Decimal) -> typing.Optional[typing.Tuple[int, int]]:
+        """Exact numerator and denominator of a score, or None if it isn't finite"""
+        return score.as_integer_ratio() if score.is_finite() else None
+
+    def _add(self, ratio: typing.Optional[typing.Tuple[int, int]]):
+        self._count += 1
+
+        if ratio is None:
+            self._non_finite += 1
+            return
+
+        numerator, denominator = ratio
+        self._sums[denominator] += numerator
+        self._sums_of_squares[denominator] += numerator * numerator
+
+    def _discard(self, ratio: typing.Optional[typing.Tuple[int, int]]):
+        """Exactly undo a previous _add, for subclasses which only summarise a window of scores"""
+        self._count -= 1
+
+        if ratio is None:
+            self._non_finite -= 1
+            return
+
+        numerator, denominator = ratio
+        self._sums[denominator] -= numerator
+        self._sums_of_squares[denominator] -= numerator * numerator
+
+        # a zero sum of squares means every remaining score with this denominator is zero, so it contributes nothing
+        if not self._sums_of_squares[denominator]:
+            del self._sums[denominator]
+            del self._sums_of_squares[denominator]
+
+    def _undefined(self, min_count: int) -> bool:
+        return self._count < min_count or self._non_finite > 0
+
+    def _sum(self) -> fractions.Fraction:
+        return sum((fractions.Fraction(n, d) for d, n in self._sums.items()), fractions.Fraction(0))
+
+    def _m2(self) -> fractions.Fraction:
+        """Exact M2, using sum(x^2) - sum(x)^2 / n: numerically poor for floats, but exact for fractions"""
+        total = self._sum()
+        sum_of_squares = sum(
+            (fractions.Fraction(n, d * d) for d, n in self._sums_of_squares.items()), fractions.Fraction(0)
+        )
+        return sum_of_squares - total * total / self._count
+
+
+class WindowedStatistics(RunningStatistics):
+    """
+    Exact statistics over the most recent `size` scores only.
+
+    A ring buffer holds the window, and the score falling out of it is subtracted from the running sums as each new
+    one arrives, so updates stay O(1) and results still match statistics.stdev over the same window.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError(f"Window size must be at least 1, got {size}")
+
+        self.size = size
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._window: typing.Deque[typing.Optional[typing.Tuple[int, int]]] = collections.deque()
+
+    def update(self, score: decimal.Decimal):
+        if len(self._window) == self.size:
+            self._discard(self._window.popleft())
+
+        ratio = self._ratio(score)
+        self._window.append(ratio)
+        self._add(ratio)
+
+    def to_state(self) -> dict:
+        # the sums follow from the window, so that's all that needs saving
+        return {'type': type(self).__name__, 'size': self.size, 'window': list(self._window)}
+
+    @classmethod
+    def _from_state(cls, state: dict, **kwargs) -> 'WindowedStatistics':
+        statistics = cls(state['size'], **kwargs)
+        for ratio in state['window']:
+            ratio = None if ratio is None else tuple(ratio)
+            statistics._window.append(ratio)
+            statistics._add(ratio)
+        return statistics
+
+
+class TimeWindowedStatistics(RunningStatistics):
+    """
+    Exact statistics over the scores seen in the last `seconds` seconds.
+
+    Scores are timestamped on arrival and expire from the front of a queue, both when new scores arrive and when the
+    statistics are read, so each score is added and removed exactly once (amortised O(1) per score).
+    """
+
+    def __init__(self, seconds: float, clock: typing.Callable[[], float] = time.monotonic):
+        if seconds <= 0:
+            raise ValueError(f"Window length must be positive, got {seconds}")
+
+        self.seconds = seconds
+        self.clock = clock
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._window: typing.Deque[typing.Tuple[float, typing.Optional[typing.Tuple[int, int]]]] = \
+            collections.deque()
+
+    def update(self, score: decimal.Decimal):
+        now = self.clock()
+        self._expire(now)
+
+        ratio = self._ratio(score)
+        self._window.append((now, ratio))
+        self._add(ratio)
+
+    @property
+    def count(self) -> int:
+        self._expire(self.clock())
+        return self._count
+
+    def _undefined(self, min_count: int) -> bool:
+        # every statistic checks this first, so it's the natural place to drop anything which has aged out
+        self._expire(self.clock())
+        return super()._undefined(min_count)
+
+    def _expire(self, now: float):
+        cutoff = now - self.seconds
+        while self._window and self._window[0][0] <= cutoff:
+            self._discard(self._window.popleft()[1])
+
+    def to_state(self) -> dict:
+        # arrival times from the clock (time.monotonic by default) only mean anything within this process and boot,
+        # so save each score's age instead, along with the wall-clock time it was saved at
+        now = self.clock()
+        return {
+            'type': type(self).__name__,
+            'seconds': self.seconds,
+            'saved_at': time.time(),
+            'window': [(now - arrived, ratio) for arrived, ratio in self._window],
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict, **kwargs) -> 'TimeWindowedStatistics':
+        statistics = cls(state['seconds'], **kwargs)
+
+        # whatever time has passed since saving (e.g. while the service was down) counts towards expiry
+        elapsed = max(0.0, time.time() - state['saved_at'])
+        now = statistics.clock()
+        for age, ratio in state['window']:
+            ratio = None if ratio is None else tuple(ratio)
+            statistics._window.append((now - age - elapsed, ratio))
+            statistics._add(ratio)
+
+        statistics._expire(now)
+        return statistics
+
+
+class ExponentialStatistics(ScoreStatistics):
+    """
+    Exponentially weighted mean and variance, where each new score has weight `alpha` and older scores decay by a
+    factor of (1 - alpha) per update. Only the decayed mean and variance are kept, so memory is constant.
+
+    Unlike the other implementations this can't be exact: the decay factor introduces rounding on every update, done
+    in the current decimal context. count is the number of scores seen since the last reset.
+
+    See Tony Finch, "Incremental calculation of weighted mean and variance" (2009), section 9.
+    """
+
+    def __init__(self, alpha: typing.Union[decimal.Decimal, str]):
+        alpha = decimal.Decimal(alpha)
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._count = 0
+        self._mean = decimal.Decimal('NaN')
+        self._variance = decimal.Decimal('NaN')
+
+    def update(self, score: decimal.Decimal):
+        self._count += 1
+
+        if self._count == 1:
+            self._mean = score
+            self._variance = decimal.Decimal(0)
+            return
+
+        difference = score - self._mean
+        increment = self.alpha * difference
+        self._mean += increment
+        self._variance = (1 - self.alpha) * (self._variance + difference * increment)
+
+    def to_state(self) -> dict:
+        # Decimals as strings, so that none of their digits are lost
+        return {
+            'type': type(self).__name__,
+            'alpha': str(self.alpha),
+            'count': self._count,
+            'mean': str(self._mean),
+            'variance': str(self._variance),
+        }
+
+    @classmethod
+    def _from_state(cls, state: dict, **kwargs) -> 'ExponentialStatistics':
+        statistics = cls(state['alpha'], **kwargs)
+        statistics._count = state['count']
+        statistics._mean = decimal.Decimal(state['mean'])
+        statistics._variance = decimal.Decimal(state['variance'])
+        return statistics
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> decimal.Decimal:
+        return self._mean
+
+    @property
+    def variance(self) -> decimal.Decimal:
+        return self._variance
+
+    @property
+    def standard_deviation(self) -> decimal.Decimal:
+        return self._variance.sqrt()
+
+
+def _to_decimal(value: fractions.Fraction) -> decimal.Decimal:
+    """Round an exact fraction to a Decimal in the current context, with a single rounding step"""
+    return decimal.Decimal(value.numerator) / decimal.Decimal(value.denominator)
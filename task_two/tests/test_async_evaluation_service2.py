@@ -0,0 +1,37 @@
+import asyncio
+import decimal
+import statistics
+import typing
+
+import hypothesis
+import hypothesis.strategies
+
+import task_one.fake_scorers
+import task_one.tests.helpers
+import task_two.async_evaluation_service
+
+
+@hypothesis.given(scores=hypothesis.strategies.lists(
+    hypothesis.strategies.decimals(allow_infinity=False, allow_nan=False),
+    min_size=2, max_size=50,
+))
+def test_std_dev_calculation(scores: typing.List[decimal.Decimal]):
+    by_path = {f'https://test-request/{i}': score for i, score in enumerate(scores)}
+    service = task_two.async_evaluation_service.AsyncEvaluationService(max_in_flight=8)
+    service.scorer = task_one.fake_scorers.AsyncLatencyScorer(0, lambda path, method, body: by_path[path])
+
+    reqs = task_one.tests.helpers.gen_http_requests(len(scores))
+    evaluation = asyncio.run(service.evaluate(reqs))
+
+    assert evaluation.standard_deviation == statistics.stdev(scores)
+    assert evaluation.typical_requests == [r for r, s in zip(reqs, scores) if s > 0]
+    assert evaluation.anomalous_requests == [r for r, s in zip(reqs, scores) if s <= 0]
+
+
+def test_std_dev_accumulates_across_calls():
+    service = task_two.async_evaluation_service.AsyncEvaluationService()
+    service.scorer = task_one.fake_scorers.AsyncLatencyScorer(0)
+
+    assert asyncio.run(service.evaluate([])).standard_deviation.is_nan()
+    assert asyncio.run(service.evaluate(task_one.tests.helpers.gen_http_requests(1))).standard_deviation == 0
+    assert asyncio.run(service.evaluate(task_one.tests.helpers.gen_http_requests(3))).standard_deviation == 0
@@ -0,0 +1,81 @@
+import decimal
+import json
+import pathlib
+import statistics
+import typing
+
+import pytest
+
+import task_one.fake_scorer_server
+import task_two.cli
+
+
+def score_by_index(path: str, method: str, body: typing.Any) -> decimal.Decimal:
+    """Alternate anomalous and typical, with more precision than a float would keep"""
+    i = int(path.rsplit('/', 1)[-1])
+    return decimal.Decimal(i % 2) - decimal.Decimal('0.49999999999999999999999') + i
+
+
+@pytest.fixture()
+def server():
+    with task_one.fake_scorer_server.FakeScorerServer(score_by_index) as server:
+        yield server
+
+
+def write_traffic(path: pathlib.Path, num: int) -> typing.List[dict]:
+    rows = [{'path': f'https://test-request/{i}', 'method': 'POST', 'body': {'i': i}} for i in range(num)]
+    with open(path, 'w') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+        f.write('\n')  # trailing blank lines should be ignored
+
+    return rows
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_cli_end_to_end(
+        tmp_path: pathlib.Path, server: task_one.fake_scorer_server.FakeScorerServer, use_mmap: bool,
+):
+    rows = write_traffic(tmp_path / 'traffic.jsonl', 25)
+    argv = [
+        str(tmp_path / 'traffic.jsonl'),
+        '--scorer-url', server.url,
+        '--typical-out', str(tmp_path / 'typical.jsonl'),
+        '--anomalous-out', str(tmp_path / 'anomalous.jsonl'),
+        '--stats-out', str(tmp_path / 'stats.json'),
+        '--batch-size', '4',
+        '--max-in-flight', '3',
+        '--progress-interval', '0',
+    ]
+    if use_mmap:
+        argv.append('--mmap')
+
+    assert task_two.cli.main(argv) == 0
+
+    typical = [json.loads(line) for line in open(tmp_path / 'typical.jsonl')]
+    anomalous = [json.loads(line) for line in open(tmp_path / 'anomalous.jsonl')]
+    stats = json.load(open(tmp_path / 'stats.json'))
+    scores = [score_by_index(row['path'], row['method'], row['body']) for row in rows]
+
+    assert [r['path'] for r in typical] == [row['path'] for row, s in zip(rows, scores) if s > 0]
+    assert [r['path'] for r in anomalous] == [row['path'] for row, s in zip(rows, scores) if s <= 0]
+    assert typical[0]['body'] == {'i': 1}
+    assert decimal.Decimal(typical[0]['score']) == scores[1]
+
+    assert stats['count'] == 25
+    assert stats['typical'] + stats['anomalous'] == 25
+    assert decimal.Decimal(stats['standard_deviation']) == statistics.stdev(scores)
+    assert server.requests == 7  # ceil(25 / 4) batches
+
+
+def test_invalid_lines_are_reported():
+    with pytest.raises(ValueError, match='Line 2'):
+        list(task_two.cli.parse_requests([b'{"path": "/a", "method": "GET"}\n', b'{"path": "/b"}\n']))
+
+
+def test_progress_reporter(capsys: typing.Any):
+    progress = task_two.cli.ProgressReporter(interval=0)
+    progress.update(10)
+    progress.report()
+
+    assert '10 requests evaluated' in capsys.readouterr().err
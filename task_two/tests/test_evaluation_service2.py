@@ -1,6 +1,7 @@
 import pytest
 import requests
 import decimal
+import functools
 import statistics
 import typing
 import string
@@ -8,7 +9,15 @@ import string
 import hypothesis
 import hypothesis.strategies
 
+import task_one.fake_scorers
+import task_one.instrumentation
+import task_one.resilience
+import task_one.rules
+import task_one.score_store
+import task_one.score_cache
 import task_two.evaluation_service
+import task_two.quantile_sketch
+import task_two.score_statistics
 
 
 DEFAULT_TEST_SIZE = 10  # max num. of request objects to throw into each test
@@ -238,3 +247,296 @@ def test_std_dev_no_values():
     evaluation = service.evaluate([])
 
     assert evaluation.standard_deviation.is_nan()
+
+
+@hypothesis.given(scores=hypothesis.strategies.lists(
+    hypothesis.strategies.decimals(allow_infinity=False, allow_nan=False),
+    min_size=2, max_size=50,
+))
+def test_concurrent_std_dev_calculation(monkeypatch, scores: typing.List[decimal.Decimal]):
+    """Concurrent scoring must still feed every score into the std dev, and keep the partitions in input order"""
+    service = task_two.evaluation_service.EvaluationService(max_in_flight=8)
+    by_path = {f'https://test-request/{i}': score for i, score in enumerate(scores)}
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: by_path[path])
+
+    reqs = [r for r in gen_requests(len(scores))]
+    evaluation = service.evaluate(reqs)
+
+    assert evaluation.standard_deviation == statistics.stdev(scores)
+    assert evaluation.typical_requests == [r for r, s in zip(reqs, scores) if s > 0]
+    assert evaluation.anomalous_requests == [r for r, s in zip(reqs, scores) if s <= 0]
+
+
+def test_cached_scores_count_towards_std_dev(monkeypatch: typing.Any):
+    """A cache hit still represents a scored request, so must contribute to the std dev"""
+    service = task_two.evaluation_service.EvaluationService(cache=task_one.score_cache.ScoreCache())
+    scores = iter([decimal.Decimal(1), decimal.Decimal(3)])
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: next(scores))
+
+    reqs = [r for r in gen_requests(2)]
+    service.evaluate(reqs)
+    evaluation = service.evaluate(reqs)
+
+    assert service.cache.stats.hits == 2
+    assert evaluation.standard_deviation == statistics.stdev([decimal.Decimal(x) for x in [1, 3, 1, 3]])
+
+
+def test_running_std_dev_available_mid_stream(monkeypatch: typing.Any):
+    service = get_service()
+    scores = [decimal.Decimal(x) for x in [1, -2, 3, 5]]
+    scores_iter = iter(scores)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: next(scores_iter))
+
+    running = [service.standard_deviation for _ in service.evaluate_iter(gen_requests(len(scores)))]
+
+    assert running[0] == 0
+    assert running[1:] == [statistics.stdev(scores[:i]) for i in range(2, len(scores) + 1)]
+
+
+def test_reset_statistics(monkeypatch: typing.Any):
+    service = get_service()
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: decimal.Decimal(1))
+    service.evaluate([r for r in gen_requests(3)])
+
+    previous = service.reset_statistics()
+
+    assert previous.count == 3
+    assert service.statistics.count == 0
+    assert service.standard_deviation.is_nan()
+
+
+def test_windowed_statistics(monkeypatch: typing.Any):
+    """A windowed service should only report on the most recent scores, across evaluate calls"""
+    service = task_two.evaluation_service.EvaluationService(
+        statistics=task_two.score_statistics.WindowedStatistics(3),
+    )
+    scores = iter([decimal.Decimal(x) for x in [100, -100, 1, 2, 3]])
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: next(scores))
+
+    service.evaluate([r for r in gen_requests(2)])
+    evaluation = service.evaluate([r for r in gen_requests(3)])
+
+    assert evaluation.count == 3
+    assert evaluation.mean == 2
+    assert evaluation.variance == 1
+    assert evaluation.standard_deviation == 1
+
+
+def test_evaluate_compact_includes_statistics(monkeypatch: typing.Any):
+    service = get_service()
+    scores = [decimal.Decimal(x) for x in [3, -1, 0, 7]]
+    scores_iter = iter(scores)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda *x, **y: next(scores_iter))
+
+    reqs = [r for r in gen_requests(len(scores))]
+    evaluation = service.evaluate_compact(reqs)
+
+    assert evaluation.typical_requests == [reqs[0], reqs[3]]
+    assert evaluation.anomalous_requests == [reqs[1], reqs[2]]
+    assert evaluation.standard_deviation == statistics.stdev(scores)
+    assert evaluation.count == len(scores)
+    assert not hasattr(evaluation, '__dict__')
+
+
+def test_process_pool_std_dev():
+    """Scoring in worker processes must feed exactly the same scores into the running std dev"""
+    reqs = [r for r in gen_requests(30)]
+    scorer = task_one.fake_scorers.CpuBoundScorer(5)
+    expected = [scorer.evaluate(r.url, r.method, r.json) for r in reqs]
+
+    with task_two.evaluation_service.EvaluationService(
+            batch_size=4, processes=2, scorer_factory=functools.partial(task_one.fake_scorers.CpuBoundScorer, 5),
+    ) as service:
+        evaluation = service.evaluate(reqs)
+
+    assert evaluation.standard_deviation == statistics.stdev(expected)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_instrumentation_times_statistics(vectorized: bool, monkeypatch: typing.Any):
+    recorder = task_one.instrumentation.MetricsRecorder()
+    service = task_two.evaluation_service.EvaluationService(vectorized=vectorized, instrumentation=recorder)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]) - 4)
+
+    service.evaluate(gen_requests(10))
+    snapshot = recorder.snapshot()
+
+    assert snapshot.requests == 10
+    assert (snapshot.typical, snapshot.anomalous) == (5, 5)
+    assert snapshot.batches == 1
+    assert snapshot.statistics_seconds > 0
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('unscored', ['anomalous', 'separate'])
+def test_unscored_requests_skip_statistics(vectorized: bool, unscored: str, monkeypatch: typing.Any):
+    service = task_two.evaluation_service.EvaluationService(
+        vectorized=vectorized,
+        batch_size=1,
+        resilience=task_one.resilience.ResiliencePolicy(),
+        unscored=unscored,
+    )
+
+    def score(path, method, body):
+        digit = int(path[-1])
+        if digit % 3 == 0:
+            raise ConnectionError("scorer down")
+        return decimal.Decimal(digit) - 4
+
+    service.scorer = task_one.fake_scorers.LatencyScorer(0, score)
+    evaluation = service.evaluate(list(gen_requests(10)))
+
+    # 0, 3, 6 and 9 are unscored; of the rest, 1, 2 and 4 are anomalous
+    unscored_paths = [0, 3, 6, 9]
+    if unscored == 'separate':
+        assert [r.url[-1] for r in evaluation.unscored_requests] == [str(i) for i in unscored_paths]
+        assert [r.url[-1] for r in evaluation.anomalous_requests] == ['1', '2', '4']
+    else:
+        assert evaluation.unscored_requests == []
+        assert [r.url[-1] for r in evaluation.anomalous_requests] == ['0', '1', '2', '3', '4', '6', '9']
+    assert [r.url[-1] for r in evaluation.typical_requests] == ['5', '7', '8']
+
+    expected = statistics.stdev([decimal.Decimal(i) - 4 for i in (1, 2, 4, 5, 7, 8)])
+    assert evaluation.count == 6
+    assert abs(evaluation.standard_deviation - expected) < decimal.Decimal('1e-9')
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_rules_assign_or_skip_scores(vectorized: bool, monkeypatch: typing.Any):
+    rules = task_one.rules.RuleIndex([
+        task_one.rules.Rule('/1', anomalous=True),  # no score: left out of the statistics
+        task_one.rules.Rule('/2', anomalous=False, score=decimal.Decimal(10)),
+    ])
+    service = task_two.evaluation_service.EvaluationService(vectorized=vectorized, rules=rules)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]) - 4)
+
+    evaluation = service.evaluate(list(gen_requests(10)))
+
+    assert [r.url[-1] for r in evaluation.anomalous_requests] == ['0', '1', '3', '4']
+    assert [r.url[-1] for r in evaluation.typical_requests] == ['2', '5', '6', '7', '8', '9']
+    assert evaluation.unscored_requests == []
+
+    expected = [decimal.Decimal(i) - 4 for i in (0, 3, 4, 5, 6, 7, 8, 9)] + [decimal.Decimal(10)]
+    assert evaluation.count == 9
+    assert abs(evaluation.standard_deviation - statistics.stdev(expected)) < decimal.Decimal('1e-9')
+
+
+def test_statistics_survive_restart(tmp_path: typing.Any, monkeypatch: typing.Any):
+    path = str(tmp_path / 'scores.db')
+    scores = [decimal.Decimal(i) / 3 for i in range(10)]
+
+    with task_two.evaluation_service.EvaluationService(store=task_one.score_store.ScoreStore(path)) as service:
+        monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: scores[int(path[-1])])
+        service.evaluate(list(gen_requests(5)))
+
+    service = task_two.evaluation_service.EvaluationService(store=task_one.score_store.ScoreStore(path))
+    assert service.statistics.count == 5
+
+    # the first five are served from the store, the rest from the scorer
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: scores[int(path[-1])])
+    evaluation = service.evaluate([requests.Request('GET', f'https://test-request/{i}') for i in range(5, 10)])
+
+    expected = task_two.score_statistics.RunningStatistics()
+    expected.update_many(scores)
+    assert evaluation.count == 10
+    assert evaluation.standard_deviation == expected.standard_deviation
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+def test_sketch_is_fed_by_the_evaluation_loop(vectorized: bool, tmp_path: typing.Any, monkeypatch: typing.Any):
+    store = task_one.score_store.ScoreStore(str(tmp_path / 'scores.db'))
+    service = task_two.evaluation_service.EvaluationService(
+        vectorized=vectorized, sketch=task_two.quantile_sketch.KLLSketch(), store=store,
+    )
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]) - 4)
+
+    evaluation = service.evaluate(list(gen_requests(10)))
+    assert evaluation.sketch.count == 10
+    assert evaluation.sketch.percentiles(50, 90) == {50: decimal.Decimal('0.0'), 90: decimal.Decimal('4.0')}
+
+    # the evaluation keeps a snapshot, rather than sharing the service's sketch
+    service.evaluate(list(gen_requests(10)))
+    assert evaluation.sketch.count == 10
+    service.close()
+
+    restarted = task_two.evaluation_service.EvaluationService(vectorized=vectorized, store=store)
+    assert restarted.sketch.count == 20
+
+    compact = restarted.evaluate_compact(list(gen_requests(10)))
+    assert compact.sketch.count == 30
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('max_in_flight', [1, 4])
+def test_duplicates_count_towards_statistics(vectorized: bool, max_in_flight: int, monkeypatch: typing.Any):
+    sketch = task_two.quantile_sketch.KLLSketch()
+    service = task_two.evaluation_service.EvaluationService(
+        vectorized=vectorized, max_in_flight=max_in_flight, batch_size=4, sketch=sketch, dedup=True,
+    )
+    calls = []
+    monkeypatch.setattr(
+        service.scorer, 'evaluate', lambda path, method, body: calls.append(path) or decimal.Decimal(path[-1]) - 4,
+    )
+
+    # lopsided on purpose: dropping the copies would move the std dev
+    reqs = list(gen_requests(3)) + list(gen_requests(1)) * 9
+    evaluation = service.evaluate(reqs)
+
+    assert [r.url[-1] for r in evaluation.anomalous_requests] == ['0', '1', '2'] + ['0'] * 9
+    expected = statistics.stdev([decimal.Decimal(-4)] * 10 + [decimal.Decimal(-3), decimal.Decimal(-2)])
+    assert evaluation.count == 12
+    assert abs(evaluation.standard_deviation - expected) < decimal.Decimal('1e-9')
+    assert sketch.count == 12
+
+    assert service.dedup_stats.requests == 12
+    if max_in_flight == 1:
+        assert len(calls) == 3
+        assert service.dedup_stats.ratio == 0.75
+
+
+def test_statistics_are_saved_per_worker(tmp_path: typing.Any, monkeypatch: typing.Any):
+    """Workers sharing a store keep their own statistics, which can be combined exactly"""
+    path = str(tmp_path / 'scores.db')
+    scores = {'a': [decimal.Decimal(i) / 3 for i in range(10)], 'b': [decimal.Decimal(i) * 7 for i in range(5)]}
+
+    def make_service(worker: str) -> task_two.evaluation_service.EvaluationService:
+        service = task_two.evaluation_service.EvaluationService(
+            store=task_one.score_store.ScoreStore(path), sketch=task_two.quantile_sketch.KLLSketch(), state_key=worker,
+        )
+        monkeypatch.setattr(
+            service.scorer, 'evaluate', lambda path, method, body: scores[worker][int(path.rsplit('/', 1)[1])],
+        )
+        return service
+
+    for worker in scores:
+        with make_service(worker) as service:
+            service.evaluate([requests.Request('GET', f'https://{worker}/{i}') for i in range(len(scores[worker]))])
+
+    # each worker resumes from its own statistics
+    assert make_service('a').statistics.count == 10
+    assert make_service('b').statistics.count == 5
+    assert make_service('c').statistics.count == 0
+
+    store = task_one.score_store.ScoreStore(path)
+    merged = task_two.evaluation_service.load_merged_statistics(store)
+    assert merged.count == 15
+    assert merged.standard_deviation == statistics.stdev(scores['a'] + scores['b'])
+    assert task_two.evaluation_service.load_merged_sketch(store).count == 15
+
+
+def test_statistics_saves_are_throttled(tmp_path: typing.Any, monkeypatch: typing.Any):
+    store = task_one.score_store.ScoreStore(str(tmp_path / 'scores.db'))
+    service = task_two.evaluation_service.EvaluationService(store=store)
+    monkeypatch.setattr(service.scorer, 'evaluate', lambda path, method, body: decimal.Decimal(path[-1]))
+
+    for _ in range(3):
+        service.evaluate(list(gen_requests(10)))
+
+    # only the first evaluate saved, until close() saves the rest
+    assert store.load_state(task_two.evaluation_service.STATISTICS_STATE)['count'] == 10
+    service.close()
+    assert store.load_state(task_two.evaluation_service.STATISTICS_STATE)['count'] == 30
+
+    monkeypatch.setattr(service, 'state_save_interval', 0)
+    service.evaluate(list(gen_requests(10)))
+    assert store.load_state(task_two.evaluation_service.STATISTICS_STATE)['count'] == 40
@@ -0,0 +1,141 @@
+import bisect
+import decimal
+import json
+import math
+import pickle
+import random
+import typing
+
+import hypothesis
+import hypothesis.strategies
+import pytest
+
+import task_two.quantile_sketch
+
+
+def worst_rank_error(sketch: task_two.quantile_sketch.KLLSketch, data: typing.List[float]) -> float:
+    ordered = sorted(data)
+    fractions = [i / 100 for i in range(1, 100)]
+    return max(
+        abs(bisect.bisect_left(ordered, float(value)) / len(ordered) - fraction)
+        for fraction, value in zip(fractions, sketch.quantiles(fractions))
+    )
+
+
+@hypothesis.given(
+    scores=hypothesis.strategies.lists(
+        hypothesis.strategies.floats(allow_nan=False, allow_infinity=False), min_size=1, max_size=150,
+    ),
+    fraction=hypothesis.strategies.floats(min_value=0, max_value=1),
+)
+def test_exact_while_nothing_has_been_compacted(scores: typing.List[float], fraction: float):
+    sketch = task_two.quantile_sketch.KLLSketch()
+    sketch.update_many(scores)
+
+    ordered = sorted(scores)
+    expected = ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+    assert float(sketch.quantile(fraction)) == expected
+
+
+def test_empty_sketch():
+    sketch = task_two.quantile_sketch.KLLSketch()
+    assert sketch.quantile(0.5).is_nan()
+    assert sketch.histogram() == []
+    assert sketch.count == 0
+
+
+def test_error_and_memory_bounds():
+    rng = random.Random(0)
+    data = [rng.gauss(0, 1) for _ in range(100000)]
+    sketch = task_two.quantile_sketch.KLLSketch(seed=1)
+    for score in data:
+        sketch.update(score)
+
+    assert sketch.count == len(data)
+    assert worst_rank_error(sketch, data) < 2 / sketch.k
+    assert len(sketch) <= 3 * sketch.k + 20
+    assert float(sketch.quantile(0)) == min(data)
+    assert float(sketch.quantile(1)) == max(data)
+
+
+def test_state_round_trip():
+    rng = random.Random(0)
+    sketch = task_two.quantile_sketch.KLLSketch(k=20, seed=0)
+    sketch.update_many(rng.random() for _ in range(1000))
+
+    restored = task_two.quantile_sketch.KLLSketch.from_state(json.loads(json.dumps(sketch.to_state())))
+    assert (restored.k, restored.count, len(restored)) == (sketch.k, sketch.count, len(sketch))
+    assert restored.percentiles(1, 50, 99) == sketch.percentiles(1, 50, 99)
+
+    # and it carries on from there
+    restored.update_many(rng.random() for _ in range(1000))
+    assert restored.count == 2000 and len(restored) <= 3 * restored.k + 20
+
+    empty = task_two.quantile_sketch.KLLSketch()
+    empty = task_two.quantile_sketch.KLLSketch.from_state(json.loads(json.dumps(empty.to_state())))
+    assert empty.count == 0 and empty.quantile(0.5).is_nan()
+
+    with pytest.raises(ValueError):
+        task_two.quantile_sketch.KLLSketch.from_state({'type': 'RunningStatistics'})
+
+
+def test_merge_matches_a_single_sketch():
+    rng = random.Random(0)
+    parts = [[rng.random() for _ in range(25000)] for _ in range(4)]
+
+    merged = task_two.quantile_sketch.KLLSketch(seed=0)
+    for i, part in enumerate(parts):
+        sketch = task_two.quantile_sketch.KLLSketch(seed=i + 1)
+        sketch.update_many(part)
+        # e.g. sent back from a worker process
+        merged.merge(pickle.loads(pickle.dumps(sketch)))
+
+    data = [score for part in parts for score in part]
+    assert merged.count == len(data)
+    assert merged.min == min(data) and merged.max == max(data)
+    assert worst_rank_error(merged, data) < 2 / merged.k
+    assert len(merged) <= 3 * merged.k + 20
+
+    with pytest.raises(ValueError):
+        merged.merge(task_two.quantile_sketch.KLLSketch(k=100))
+
+
+def test_reset_keeps_the_seed():
+    rng = random.Random(0)
+    data = [rng.random() for _ in range(5000)]
+    sketch = task_two.quantile_sketch.KLLSketch(k=20, seed=3)
+    sketch.update_many(data)
+    compacted = sketch.to_state()['levels']
+
+    sketch.reset()
+    assert sketch.count == 0 and len(sketch) == 0
+
+    # the same scores are compacted the same way again
+    sketch.update_many(data)
+    assert sketch.to_state()['levels'] == compacted
+
+
+def test_histogram():
+    sketch = task_two.quantile_sketch.KLLSketch(seed=0)
+    sketch.update_many(i / 1000 for i in range(10000))
+
+    histogram = sketch.histogram(bins=5)
+    assert [(float(lower), float(upper)) for lower, upper, _ in histogram] == \
+        [(0, 1.9998), (1.9998, 3.9996), (3.9996, 5.9994), (5.9994, 7.9992), (7.9992, 9.999)]
+    assert sum(count for _, _, count in histogram) == 10000
+    for _, _, count in histogram:
+        assert abs(count - 2000) < 4 / sketch.k * 10000
+
+
+def test_decimal_scores_and_percentiles():
+    sketch = task_two.quantile_sketch.KLLSketch()
+    sketch.update_many(decimal.Decimal(i) / 10 for i in range(1, 101))
+    sketch.update(decimal.Decimal('NaN'))
+
+    assert sketch.count == 100
+    assert sketch.percentiles(50, 90, 99) == {
+        50: decimal.Decimal('5.0'), 90: decimal.Decimal('9.0'), 99: decimal.Decimal('9.9'),
+    }
+
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
@@ -0,0 +1,238 @@
+import decimal
+import json
+import statistics
+import time
+import typing
+
+import hypothesis
+import hypothesis.strategies
+import pytest
+
+import task_one.tests.helpers
+import task_two.score_statistics
+
+
+DECIMALS = hypothesis.strategies.decimals(allow_infinity=False, allow_nan=False)
+
+
+def accumulate(scores: typing.Iterable[decimal.Decimal]) -> task_two.score_statistics.RunningStatistics:
+    stats = task_two.score_statistics.RunningStatistics()
+    stats.update_many(scores)
+    return stats
+
+
+@hypothesis.given(scores=hypothesis.strategies.lists(DECIMALS, min_size=2))
+def test_matches_statistics_module(scores: typing.List[decimal.Decimal]):
+    """The whole point of the exact accumulator: results must be identical to the statistics module"""
+    stats = accumulate(scores)
+
+    assert stats.count == len(scores)
+    assert stats.standard_deviation == statistics.stdev(scores)
+    assert stats.variance == statistics.variance(scores)
+    assert stats.mean == statistics.mean(scores)
+
+
+@hypothesis.given(scores=hypothesis.strategies.lists(
+    hypothesis.strategies.decimals(min_value=-1, max_value=1, places=30), min_size=2,
+))
+def test_matches_statistics_module_high_precision(scores: typing.List[decimal.Decimal]):
+    """Scores with more digits than the decimal context should still accumulate exactly"""
+    assert accumulate(scores).standard_deviation == statistics.stdev(scores)
+
+
+def test_small_counts():
+    stats = task_two.score_statistics.RunningStatistics()
+    assert stats.standard_deviation.is_nan()
+    assert stats.mean.is_nan()
+
+    stats.update(decimal.Decimal('2.5'))
+    assert stats.standard_deviation == 0
+    assert stats.variance.is_nan()
+    assert stats.mean == decimal.Decimal('2.5')
+    assert stats.m2 == 0
+
+
+def test_non_finite_scores_give_nan():
+    stats = accumulate([decimal.Decimal(1), decimal.Decimal('Infinity'), decimal.Decimal(2)])
+    assert stats.count == 3
+    assert stats.standard_deviation.is_nan()
+
+
+def test_snapshot_and_reset():
+    stats = accumulate([decimal.Decimal(1), decimal.Decimal(3)])
+    snapshot = stats.snapshot()
+
+    stats.update(decimal.Decimal(100))
+    assert snapshot.count == 2
+    assert snapshot.standard_deviation == statistics.stdev([decimal.Decimal(1), decimal.Decimal(3)])
+
+    stats.reset()
+    assert stats.count == 0
+    assert stats.standard_deviation.is_nan()
+
+
+@hypothesis.given(
+    scores=hypothesis.strategies.lists(DECIMALS, min_size=1, max_size=50),
+    size=hypothesis.strategies.integers(min_value=1, max_value=10),
+)
+def test_windowed_matches_statistics_over_window(scores: typing.List[decimal.Decimal], size: int):
+    stats = task_two.score_statistics.WindowedStatistics(size)
+    for i, score in enumerate(scores):
+        stats.update(score)
+        window = scores[max(0, i + 1 - size):i + 1]
+
+        assert stats.count == len(window)
+        assert stats.mean == statistics.mean(window)
+        if len(window) >= 2:
+            assert stats.standard_deviation == statistics.stdev(window)
+
+
+def test_windowed_forgets_non_finite_scores():
+    stats = task_two.score_statistics.WindowedStatistics(2)
+    stats.update_many([decimal.Decimal('NaN'), decimal.Decimal(1)])
+    assert stats.standard_deviation.is_nan()
+
+    stats.update(decimal.Decimal(3))
+    assert stats.standard_deviation == statistics.stdev([decimal.Decimal(1), decimal.Decimal(3)])
+
+
+def test_time_windowed_expires_old_scores():
+    clock = task_one.tests.helpers.FakeClock()
+    stats = task_two.score_statistics.TimeWindowedStatistics(10, clock=clock)
+
+    stats.update(decimal.Decimal(100))
+    clock.now = 5
+    stats.update_many([decimal.Decimal(1), decimal.Decimal(2)])
+    assert stats.count == 3
+
+    clock.now = 10  # the first score has now aged out, even without any new updates
+    assert stats.count == 2
+    assert stats.mean == decimal.Decimal('1.5')
+    assert stats.standard_deviation == statistics.stdev([decimal.Decimal(1), decimal.Decimal(2)])
+
+    clock.now = 100
+    assert stats.count == 0
+    assert stats.standard_deviation.is_nan()
+
+
+def test_exponential_statistics():
+    stats = task_two.score_statistics.ExponentialStatistics('0.5')
+    assert stats.mean.is_nan()
+
+    stats.update(decimal.Decimal(2))
+    assert stats.mean == 2 and stats.variance == 0
+
+    stats.update(decimal.Decimal(4))
+    assert stats.mean == 3
+    assert stats.variance == 1  # (1 - 0.5) * (0 + 2 * 1)
+    assert stats.standard_deviation == 1
+
+    # a constant signal decays the variance away, and pulls the mean towards it
+    stats.update_many([decimal.Decimal(10)] * 50)
+    assert abs(stats.mean - 10) < decimal.Decimal('1e-10')
+    assert stats.variance < decimal.Decimal('1e-10')
+    assert stats.count == 52
+
+
+@pytest.mark.parametrize('alpha', ['0', '-0.1', '1.5'])
+def test_exponential_statistics_rejects_bad_alpha(alpha: str):
+    with pytest.raises(ValueError):
+        task_two.score_statistics.ExponentialStatistics(alpha)
+
+
+@hypothesis.given(
+    first=hypothesis.strategies.lists(DECIMALS, max_size=20),
+    second=hypothesis.strategies.lists(DECIMALS, max_size=20),
+)
+def test_merge_is_exact(first: typing.List[decimal.Decimal], second: typing.List[decimal.Decimal]):
+    """Statistics kept separately (e.g. in different processes) should merge to exactly the combined result"""
+    merged = accumulate(first)
+    merged.merge(accumulate(second))
+    combined = accumulate(first + second)
+
+    assert merged.count == combined.count
+    assert merged.standard_deviation.compare_total(combined.standard_deviation) == 0
+    assert merged.mean.compare_total(combined.mean) == 0
+
+
+def test_windows_cannot_be_merged():
+    with pytest.raises(TypeError):
+        task_two.score_statistics.WindowedStatistics(2).merge(accumulate([]))
+
+
+def save_and_load(stats: task_two.score_statistics.ScoreStatistics, **kwargs) -> typing.Any:
+    """Round trip through JSON, as a ScoreStore does"""
+    return task_two.score_statistics.ScoreStatistics.from_state(json.loads(json.dumps(stats.to_state())), **kwargs)
+
+
+@pytest.mark.parametrize('make_stats', [
+    task_two.score_statistics.RunningStatistics,
+    lambda: task_two.score_statistics.WindowedStatistics(3),
+    lambda: task_two.score_statistics.TimeWindowedStatistics(60),
+    lambda: task_two.score_statistics.ExponentialStatistics('0.3'),
+])
+def test_state_round_trip(make_stats: typing.Callable[[], task_two.score_statistics.ScoreStatistics]):
+    stats = make_stats()
+    stats.update_many(decimal.Decimal(score) for score in ['1.5', '-2', '0.25', '1E+3'])
+    restored = save_and_load(stats)
+
+    assert type(restored) is type(stats)
+    assert restored.count == stats.count
+    assert restored.standard_deviation.compare_total(stats.standard_deviation) == 0
+
+    # and it carries on from there
+    for updated in (stats, restored):
+        updated.update_many([decimal.Decimal('NaN'), decimal.Decimal('7')])
+    assert restored.count == stats.count
+    assert restored.mean.compare_total(stats.mean) == 0
+
+
+def test_state_type_is_checked():
+    state = accumulate([decimal.Decimal(1)]).to_state()
+    assert task_two.score_statistics.RunningStatistics.from_state(state).count == 1
+
+    with pytest.raises(ValueError):
+        task_two.score_statistics.ExponentialStatistics.from_state(state)
+    with pytest.raises(ValueError):
+        task_two.score_statistics.ScoreStatistics.from_state({**state, 'type': 'os.system'})
+
+
+def test_time_windowed_survives_saving(monkeypatch: typing.Any):
+    """Ages, rather than clock readings, are saved, and time spent saved counts towards expiry"""
+    clock = task_one.tests.helpers.FakeClock()
+    clock.now = 1000.0
+    stats = task_two.score_statistics.TimeWindowedStatistics(10, clock=clock)
+    stats.update(decimal.Decimal(100))
+    clock.now = 1005.0
+    stats.update_many([decimal.Decimal(1), decimal.Decimal(2)])
+
+    state = json.dumps(stats.to_state())
+
+    # loaded six seconds later, in a process with its own clock: the first score has aged out in the meantime
+    wall = time.time()
+    monkeypatch.setattr(time, 'time', lambda: wall + 6)
+    clock = task_one.tests.helpers.FakeClock()
+    restored = task_two.score_statistics.ScoreStatistics.from_state(json.loads(state), clock=clock)
+
+    assert restored.count == 2
+    assert restored.standard_deviation == statistics.stdev([decimal.Decimal(1), decimal.Decimal(2)])
+
+    # and the rest age out four seconds later, as they would have without the restart
+    restored.clock.now += 4
+    assert restored.count == 0
+
+
+def test_time_windowed_snapshot_keeps_arrival_times():
+    clock = task_one.tests.helpers.FakeClock()
+    stats = task_two.score_statistics.TimeWindowedStatistics(10, clock=clock)
+    stats.update(decimal.Decimal(1))
+    clock.now = 9.0
+    stats.update(decimal.Decimal(2))
+
+    snapshot = stats.snapshot()
+    assert snapshot.count == 2
+
+    # the snapshot has its own copy of the clock: point it back at the shared one
+    snapshot.clock = clock
+    clock.now = 10.0
+    assert snapshot.count == stats.count == 1
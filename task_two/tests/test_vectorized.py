@@ -0,0 +1,75 @@
+import decimal
+import random
+import statistics
+import typing
+
+import hypothesis
+import hypothesis.strategies
+import numpy
+
+import task_one.tests.helpers
+import task_two.evaluation_service
+import task_two.score_statistics
+import task_two.vectorized
+
+
+def get_service(scores: typing.List[decimal.Decimal], **kwargs) -> task_two.evaluation_service.EvaluationService:
+    service = task_two.evaluation_service.EvaluationService(vectorized=True, **kwargs)
+    by_path = {f'https://test-request/{i}': score for i, score in enumerate(scores)}
+    service.scorer.evaluate = lambda path, method, body: by_path[path]
+    return service
+
+
+@hypothesis.given(scores=hypothesis.strategies.lists(
+    # positive scores below the smallest float64 subnormal are the documented exception
+    hypothesis.strategies.decimals(allow_infinity=False, allow_nan=False).filter(lambda d: d <= 0 or d > 1e-300),
+    max_size=50,
+))
+def test_partition_matches_decimal_path(scores: typing.List[decimal.Decimal]):
+    reqs = task_one.tests.helpers.gen_http_requests(len(scores))
+    evaluation = get_service(scores).evaluate(reqs)
+
+    assert evaluation.typical_requests == [r for r, s in zip(reqs, scores) if s > 0]
+    assert evaluation.anomalous_requests == [r for r, s in zip(reqs, scores) if s <= 0]
+
+
+def test_std_dev_within_documented_bound():
+    """Scores of similar magnitude, merged over several batches, should be within 1e-12 relative"""
+    rng = random.Random(0)
+    batches = [
+        [decimal.Decimal(rng.gauss(0, 5)).quantize(decimal.Decimal('1e-9')) for _ in range(rng.randint(1, 500))]
+        for _ in range(20)
+    ]
+    service = get_service([score for batch in batches for score in batch])
+
+    offset = 0
+    for batch in batches:
+        evaluation = service.evaluate(task_one.tests.helpers.gen_http_requests(offset + len(batch))[offset:])
+        offset += len(batch)
+
+    all_scores = [score for batch in batches for score in batch]
+    expected = statistics.stdev(all_scores)
+    assert abs(evaluation.standard_deviation - expected) / expected < decimal.Decimal('1e-12')
+    assert abs(evaluation.mean - statistics.mean(all_scores)) < decimal.Decimal('1e-12')
+    assert evaluation.count == len(all_scores)
+
+
+def test_float_statistics_small_counts():
+    stats = task_two.vectorized.FloatStatistics()
+    assert stats.standard_deviation.is_nan()
+    stats.update_array(numpy.array([]))
+    assert stats.count == 0
+
+    stats.update(decimal.Decimal('1.5'))
+    assert stats.standard_deviation == 0
+    assert stats.mean == decimal.Decimal('1.5')
+    assert stats.variance.is_nan()
+
+
+def test_exact_statistics_can_still_be_used():
+    """Opting into the vectorized partition shouldn't force float statistics if exact ones are passed in"""
+    scores = [decimal.Decimal('0.1'), decimal.Decimal('0.2'), decimal.Decimal('-0.3')]
+    service = get_service(scores, statistics=task_two.score_statistics.RunningStatistics())
+    evaluation = service.evaluate(task_one.tests.helpers.gen_http_requests(len(scores)))
+
+    assert evaluation.standard_deviation == statistics.stdev(scores)